@@ -32,12 +32,20 @@ REGLAS PRINCIPALES (traducidas del libro de Robson):
 ESTRUCTURA DEL CÓDIGO:
     1. Constantes astrológicas
     2. Modelos de datos (Pydantic)
-    3. Funciones de cálculo astronómico
+    3. Funciones de cálculo astronómico (por instante y vectorizadas por rango)
     4. Sistema de puntuación (scoring)
     5. Endpoints de la API
 
 MANTENIMIENTO:
-    - Los pesos del scoring están en la función calcular_puntaje_fecha()
+    - Los pesos del scoring están en el diccionario PESOS y las reglas en la
+      lista declarativa REGLAS_PUNTAJE; MotorReglas las compila una vez para
+      el cálculo escalar y el vectorizado
+    - Para agregar una regla:
+        1. Calcular su variable en variables_puntaje() (un instante) y en
+           variables_puntaje_rango() (arreglos por rango)
+        2. Agregar {"id", "si": (variable, valor), "texto", "tipo"} a REGLAS_PUNTAJE
+        3. Agregar su peso en PESOS con la misma clave que "id" (o "peso");
+           MotorReglas lanza ValueError si falta
     - Las reglas de Robson están documentadas con número de página
     - Puedes ajustar los valores según tu experiencia
 ═══════════════════════════════════════════════════════════════════════════════
@@ -46,19 +54,39 @@ MANTENIMIENTO:
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Callable, Hashable
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from numpy.polynomial import chebyshev
 import swisseph as swe
+import numpy as np
+import heapq
 import math
+import mmap
+import os
+import re
+import struct
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # CONFIGURACIÓN DE LA APLICACIÓN
 # ═══════════════════════════════════════════════════════════════════════════════
 
+@asynccontextmanager
+async def ciclo_de_vida(_: FastAPI):
+    """Arranque del servidor: precálculo de índices en segundo plano (ver iniciar_precalculo)"""
+    iniciar_precalculo()
+    yield
+
+
 app = FastAPI(
     title="Astrología Electiva API",
     version="1.0.0",
-    description="API para calcular fechas óptimas de lanzamiento empresarial"
+    description="API para calcular fechas óptimas de lanzamiento empresarial",
+    lifespan=ciclo_de_vida
 )
 
 # Permitir conexiones desde cualquier origen (CORS)
@@ -93,6 +121,9 @@ SIGNOS = [
     "Libra", "Escorpio", "Sagitario", "Capricornio", "Acuario", "Piscis"
 ]
 
+# Signos lunares favorables para comprar y vender (Robson Cap. 8, pág. 34)
+SIGNOS_FAVORABLES_LUNA = ["Tauro", "Cáncer", "Virgo", "Capricornio", "Piscis"]
+
 # Días de la semana en español
 DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
 
@@ -109,6 +140,9 @@ MESES = ["", "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
 # Orden caldeo de los planetas (para calcular horas planetarias)
 ORDEN_HORAS_PLANETARIAS = ["Saturno", "Júpiter", "Marte", "Sol", "Venus", "Mercurio", "Luna"]
 
+# Júpiter, Venus y Sol son favorables
+PLANETAS_FAVORABLES_HORAS = ["Júpiter", "Venus", "Sol"]
+
 # Regente de cada día de la semana
 REGENTES_DIAS = {
     0: "Luna",      # Lunes (Monday = Moon day)
@@ -131,6 +165,28 @@ REGENTES_DIAS = {
 VIA_COMBUSTA_INICIO = 195.0   # 15° Libra (180° + 15°)
 VIA_COMBUSTA_FIN = 225.0      # 15° Escorpio (210° + 15°)
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# ASPECTOS MAYORES Y FASES LUNARES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Definición de aspectos: ángulo -> (nombre, símbolo, orbe permitido)
+ASPECTOS = {
+    0: ("Conjunción", "☌", 8),
+    60: ("Sextil", "⚹", 6),
+    90: ("Cuadratura", "□", 7),
+    120: ("Trígono", "△", 8),
+    180: ("Oposición", "☍", 8)
+}
+
+# Aspectos que cuentan como buen aspecto (conjunción, sextil, trígono)
+ASPECTOS_FAVORABLES = (0, 60, 120)
+
+# Fases lunares en tramos de 45° de elongación Sol-Luna (índice = angulo // 45)
+FASES_LUNARES = [
+    "Nueva", "Creciente", "Cuarto Creciente", "Gibosa Creciente",
+    "Llena", "Gibosa Menguante", "Cuarto Menguante", "Menguante"
+]
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # TIPOS DE PROYECTO Y SUS SIGNIFICADORES (Robson Cap. 8 y 9)
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -206,6 +262,8 @@ PESOS = {
     "luna_conjuncion_venus": +12,
     "luna_trigono_venus": +12,
     "luna_sextil_venus": +10,
+    "luna_cuadratura_jupiter": -5,  # Tensión con un benéfico: neutral
+    "luna_oposicion_jupiter": -5,
     
     # ASPECTOS LUNA-MALÉFICOS (Robson Cap. 4, pág. 14)
     "luna_cuadratura_marte": -15,   # "Afflictions from Mars cause discord"
@@ -221,12 +279,158 @@ PESOS = {
     # SOL-LUNA (Robson Cap. 3, pág. 13)
     "sol_trigono_luna": +10,        # "Good aspect is excellent foundation"
     "sol_sextil_luna": +8,
+    
+    # SIGNIFICADORES DEL TIPO DE PROYECTO (TIPOS_PROYECTO["planetas"])
+    "luna_significador": +6,        # Luna en buen aspecto a un significador del asunto
 }
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# REGLAS DE PUNTUACIÓN (declarativas)
+# ═══════════════════════════════════════════════════════════════════════════════
+# Cada regla es un dato: si la variable "si" toma el valor indicado, se suma
+# PESOS[id] (o PESOS[peso], si la regla lo indica) y se agrega el factor
+# "texto" (formateado con las variables del instante) con su "tipo". El orden
+# de la lista es el orden de los factores.
+# MotorReglas las compila una sola vez para el cálculo escalar y el vectorizado.
+
+def _sin_acentos(texto: str) -> str:
+    """Quita los acentos de un texto en español (para las claves de PESOS)"""
+    return texto.translate(str.maketrans("áéíóúÁÉÍÓÚ", "aeiouAEIOU"))
+
+
+def _reglas_aspecto(variable: str, formato: str, tipos: Dict[int, str], sufijo: str) -> List[Dict[str, Any]]:
+    """Una regla por aspecto de ASPECTOS con clave PESOS luna_<aspecto>_<sufijo>"""
+    return [
+        {
+            "id": sufijo.format(aspecto=_sin_acentos(ASPECTOS[angulo][0].lower())),
+            "si": (variable, angulo),
+            "texto": formato.format(simbolo=ASPECTOS[angulo][1], nombre=ASPECTOS[angulo][0]),
+            "tipo": tipo
+        }
+        for angulo, tipo in tipos.items()
+    ]
+
+
+# Planetas significadores de algún tipo de proyecto, en el orden de PLANETAS
+SIGNIFICADORES = [
+    planeta for planeta in PLANETAS
+    if any(planeta in info["planetas"] for info in TIPOS_PROYECTO.values())
+]
+
+REGLAS_PUNTAJE = [
+    # REGLA 1: FASE LUNAR (Robson Cap. 3, pág. 13)
+    # "Los asuntos progresan mucho más rápido y exitosamente si se inician
+    #  cuando la Luna está creciendo en luz"
+    {"id": "luna_creciente", "si": ("creciente", True), "texto": "☽ Luna {fase}", "tipo": "positive"},
+    {"id": "luna_menguante", "si": ("creciente", False), "texto": "☽ Luna {fase}", "tipo": "negative"},
+    
+    # REGLA 2: LUNA VACÍA DE CURSO (Robson Cap. 3, pág. 15)
+    # "Cuando está vacía de curso... no forma aspectos antes de cambiar de signo.
+    #  Nada resultará del asunto."
+    {"id": "luna_vacia_curso", "si": ("vacia_curso", True), "texto": "☽ Luna Vacía de Curso", "tipo": "negative"},
+    
+    # REGLA 3: VIA COMBUSTA (Robson Cap. 3, pág. 15)
+    # "La peor posición zodiacal para la Luna es la Via Combusta,
+    #  que se extiende desde 15° Libra hasta 15° Escorpio"
+    {"id": "via_combusta", "si": ("via_combusta", True),
+     "texto": "☽ Via Combusta ({grado_luna:.0f}° {signo_luna})", "tipo": "negative"},
+    
+    # REGLA 4: MERCURIO RETRÓGRADO (Robson Cap. 4, pág. 15)
+    # "Cualquier cosa iniciada en tal momento fallará rápidamente"
+    {"id": "mercurio_retrogrado", "si": ("mercurio_retrogrado", True),
+     "texto": "☿ Mercurio Retrógrado ℞", "tipo": "negative"},
+    {"id": "mercurio_directo", "si": ("mercurio_retrogrado", False),
+     "texto": "☿ Mercurio Directo", "tipo": "positive"},
+    
+    # REGLA 5: ASPECTOS LUNA-JÚPITER/VENUS (Robson Cap. 4, pág. 14)
+    # "Prosperidad y éxito siguen a la Luna en buen aspecto o conjunción
+    #  con Júpiter o Venus"
+    *_reglas_aspecto("aspecto_jupiter", "☽ {simbolo} ♃ ({nombre})", {
+        0: "positive", 120: "positive", 60: "positive", 90: "neutral", 180: "neutral"
+    }, "luna_{aspecto}_jupiter"),
+    *_reglas_aspecto("aspecto_venus", "☽ {simbolo} ♀ ({nombre})", {
+        0: "positive", 120: "positive", 60: "positive"
+    }, "luna_{aspecto}_venus"),
+    
+    # REGLA 6: ASPECTOS LUNA-MARTE/SATURNO (Robson Cap. 4, pág. 14)
+    # "Es preferible como regla que la Luna no tenga ningún aspecto
+    #  con los maléficos"
+    *_reglas_aspecto("aspecto_marte", "☽ {simbolo} ♂ ({nombre})", {
+        0: "negative", 90: "negative", 180: "negative"
+    }, "luna_{aspecto}_marte"),
+    *_reglas_aspecto("aspecto_saturno", "☽ {simbolo} ♄ ({nombre})", {
+        0: "negative", 90: "negative", 180: "negative"
+    }, "luna_{aspecto}_saturno"),
+    
+    # REGLA 7: SIGNO LUNAR FAVORABLE (Robson Cap. 8, pág. 34)
+    # "La Luna en Tauro, Cáncer, Virgo, Capricornio o Piscis es favorable
+    #  para comprar y vender"
+    {"id": "luna_signo_favorable", "si": ("signo_favorable", True), "texto": "☽ Luna en {signo_luna}", "tipo": "positive"},
+    
+    # REGLA 8: ASPECTO SOL-LUNA (Robson Cap. 3, pág. 13)
+    # "Un buen aspecto entre la Luna y el Sol es una excelente base
+    #  para el éxito, y mejorará cualquier elección"
+    *_reglas_aspecto("aspecto_sol", "☉ {simbolo} ☽", {
+        120: "positive", 60: "positive"
+    }, "sol_{aspecto}_luna"),
+    
+    # REGLA 9: SIGNIFICADORES DEL PROYECTO
+    # Buen aspecto (conjunción, sextil o trígono) de la Luna a un planeta
+    # significador del tipo de proyecto. Solo se activa para los tipos que
+    # tienen ese planeta en TIPOS_PROYECTO["planetas"] (ver MotorReglas.activas_tipo).
+    *[
+        {
+            "id": f"significador_{_sin_acentos(PLANETAS[planeta].lower())}",
+            "si": (f"significador_{_sin_acentos(PLANETAS[planeta].lower())}", True),
+            "peso": "luna_significador",
+            "significador": planeta,
+            "texto": f"☽ Buen aspecto a {PLANETAS[planeta]} (significador)",
+            "tipo": "positive"
+        }
+        for planeta in SIGNIFICADORES
+    ],
+]
+
+# Reglas aplicadas (para mostrar al usuario)
+REGLAS_APLICADAS = [
+    "✅ Luna creciente - Favorece crecimiento y progreso (Robson pág. 13)",
+    "✅ Mercurio directo - Comunicación y contratos claros (Robson pág. 15)",
+    "✅ Júpiter/Venus en buen aspecto a Luna - Favorece negocios (Robson pág. 14)",
+    "✅ Luna en signos favorables: Tauro, Cáncer, Virgo, etc. (Robson pág. 34)",
+    "✅ Luna en buen aspecto a los significadores del proyecto",
+    "❌ Evitar Luna vacía de curso - Nada prospera (Robson pág. 15)",
+    "❌ Evitar Via Combusta: 15° Libra - 15° Escorpio (Robson pág. 15)",
+    "❌ Evitar Mercurio retrógrado - Contratos problemáticos (Robson pág. 15)",
+    "❌ Evitar aflicciones Marte/Saturno a Luna - Conflictos (Robson pág. 14)"
+]
+
+# Rango máximo de /calcular en días (el motor vectorizado escala bien a varios años;
+# el escalar evalúa día por día y se mantiene en un año)
+DIAS_MAXIMOS_RANGO = 3660
+DIAS_MAXIMOS_RANGO_ESCALAR = 366
+# Con resolución menor a un día cada día se evalúa en 24 instantes o más
+# (y se refina): el rango se mantiene en un año, como /ventanas
+DIAS_MAXIMOS_RANGO_SUBDIARIO = 366
+
+# Cantidad máxima de fechas (k) por respuesta
+MAXIMO_K = 100
+
+# Lugares máximos por solicitud en SolicitudElectiva.ubicaciones
+MAXIMO_UBICACIONES = 100
+
+# Motores de puntuación disponibles en /calcular
+MOTORES_PUNTAJE = ["vectorizado", "escalar"]
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # MODELOS DE DATOS (Pydantic)
 # ═══════════════════════════════════════════════════════════════════════════════
 
+class Ubicacion(BaseModel):
+    """Lugar adicional donde se evalúa la elección (sucursales, etc.)"""
+    nombre: Optional[str] = None
+    latitud: Optional[float] = None           # Sin coordenadas se geocodifica el nombre
+    longitud: Optional[float] = None
+
 class SolicitudElectiva(BaseModel):
     """Datos de entrada para calcular fechas electivas"""
     nombre: str
@@ -239,6 +443,13 @@ class SolicitudElectiva(BaseModel):
     ubicacion: Optional[str] = "Lima, Peru"
     latitud: Optional[float] = -12.0464       # Default: Lima
     longitud: Optional[float] = -77.0428
+    motor: Optional[str] = "vectorizado"      # vectorizado | escalar
+    reglas_desactivadas: Optional[List[str]] = None  # Ids de REGLAS_PUNTAJE (ver /reglas)
+    pesos: Optional[Dict[str, int]] = None    # Reemplaza pesos de PESOS por id de regla
+    ubicaciones: Optional[List[Ubicacion]] = None  # Otros lugares (ver MAXIMO_UBICACIONES)
+    resolucion: Optional[str] = "diaria"      # diaria | horaria | 15min | 1min (ver RESOLUCIONES)
+    k: int = 10                               # Cantidad de fechas a devolver (ver MAXIMO_K)
+    modo: Optional[str] = "completo"          # completo | rapido (poda, ver MODOS_BUSQUEDA)
 
 class ResultadoFecha(BaseModel):
     """Resultado del análisis de una fecha"""
@@ -250,6 +461,15 @@ class ResultadoFecha(BaseModel):
     nivel: str                                # excellent, good, caution, avoid
     factores: List[Dict[str, str]]
     mejores_horas: List[str]
+    hora_utc: Optional[str] = None            # Instante evaluado (HH:MM UT)
+    hora_local: Optional[str] = None          # Aproximada: UT + longitud/15
+
+class ResultadoUbicacion(BaseModel):
+    """Mejores fechas en uno de los lugares de SolicitudElectiva.ubicaciones"""
+    ubicacion: Optional[str]
+    latitud: float
+    longitud: float
+    fechas: List[ResultadoFecha]
 
 class RespuestaElectiva(BaseModel):
     """Respuesta completa del cálculo"""
@@ -259,6 +479,136 @@ class RespuestaElectiva(BaseModel):
     descripcion_tipo: str
     fechas: List[ResultadoFecha]
     reglas_aplicadas: List[str]
+    ubicaciones: Optional[List[ResultadoUbicacion]] = None
+    lugar: Optional[Dict[str, Any]] = None             # Ciudad geocodificada desde ubicacion
+    lugar_nacimiento: Optional[Dict[str, Any]] = None  # Ciudad geocodificada desde ciudad_nacimiento
+
+class SolicitudComparativa(BaseModel):
+    """Datos de entrada para comparar varios tipos de proyecto en un rango"""
+    nombre: str
+    tipos_proyecto: Optional[List[str]] = None  # Default: todos los de TIPOS_PROYECTO
+    fecha_desde: str                          # Formato: YYYY-MM-DD
+    fecha_hasta: str                          # Formato: YYYY-MM-DD
+    ubicacion: Optional[str] = "Lima, Peru"
+    latitud: Optional[float] = -12.0464       # Default: Lima
+    longitud: Optional[float] = -77.0428
+    reglas_desactivadas: Optional[List[str]] = None
+    pesos: Optional[Dict[str, int]] = None
+    k: int = 10                               # Fechas por tipo (ver MAXIMO_K)
+
+class RespuestaComparativa(BaseModel):
+    """Mejores fechas de cada tipo de proyecto"""
+    estado: str
+    nombre: str
+    comparativo: List[RespuestaElectiva]
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CACHÉ DE EFEMÉRIDES (LRU)
+# ═══════════════════════════════════════════════════════════════════════════════
+# Muchas solicitudes piden los mismos instantes (rangos de /calcular que se
+# superponen, /info-luna siempre a las 12:00 UT). Este caché, compartido por
+# todo el proceso, guarda el resultado de swe.calc_ut por
+# (día juliano, planeta, flags) y descarta lo menos usado al llenarse.
+# Los valores guardados son tuplas (inmutables): cada llamador arma su propio
+# diccionario a partir de ellas, así nadie puede alterar el resultado de otro.
+
+# Flags de Swiss Ephemeris usados en todos los cálculos (incluye velocidad)
+FLAGS_EFEMERIDES = swe.FLG_SWIEPH | swe.FLG_SPEED
+
+# Cantidad máxima de entradas del caché
+MAXIMO_CACHE_EFEMERIDES = int(os.environ.get("AE_CACHE_EFEMERIDES_MAX", "50000"))
+
+
+class CacheLRU:
+    """
+    Caché acotado con desalojo LRU, seguro para varios hilos.
+    
+    Lleva contadores de aciertos, fallos y desalojos para poder
+    dimensionarlo (ver estadisticas()).
+    
+    Con un_calculo_a_la_vez=True los valores caros (índices de eventos,
+    segmentos ajustados) se calculan de a uno: si dos hilos piden la misma
+    clave, el segundo espera y usa el valor del primero en vez de repetirlo.
+    """
+    
+    def __init__(self, maximo_entradas: int, un_calculo_a_la_vez: bool = False):
+        self.maximo_entradas = max(0, maximo_entradas)
+        self._entradas: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._candado = threading.Lock()
+        # Reentrante: un cálculo puede pedir otra clave del mismo caché
+        self._candado_calculo = threading.RLock() if un_calculo_a_la_vez else None
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+    
+    def obtener(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        """Devuelve el valor guardado para la clave o lo calcula y lo guarda"""
+        with self._candado:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave]
+            self.fallos += 1
+        
+        # El cálculo se hace fuera del candado para no bloquear a otros hilos
+        if self._candado_calculo is None:
+            return self._guardar(clave, calcular())
+        
+        with self._candado_calculo:
+            # Otro hilo pudo calcularlo mientras se esperaba el candado
+            with self._candado:
+                if clave in self._entradas:
+                    self._entradas.move_to_end(clave)
+                    return self._entradas[clave]
+            return self._guardar(clave, calcular())
+    
+    def _guardar(self, clave: Hashable, valor: Any) -> Any:
+        with self._candado:
+            if self.maximo_entradas:
+                self._entradas[clave] = valor
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.maximo_entradas:
+                    self._entradas.popitem(last=False)
+                    self.desalojos += 1
+        return valor
+    
+    def valores(self) -> List[Any]:
+        """Copia de los valores guardados"""
+        with self._candado:
+            return list(self._entradas.values())
+    
+    def limpiar(self):
+        with self._candado:
+            self._entradas.clear()
+            self.aciertos = self.fallos = self.desalojos = 0
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "maximo_entradas": self.maximo_entradas,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0
+            }
+
+
+CACHE_EFEMERIDES = CacheLRU(MAXIMO_CACHE_EFEMERIDES)
+
+
+def calcular_posicion_swe(dia_juliano: float, planeta: int, flags: int = FLAGS_EFEMERIDES) -> tuple:
+    """
+    swe.calc_ut() con caché LRU.
+    
+    Returns:
+        Tupla inmutable (longitud, latitud, distancia, vel. longitud, vel. latitud, vel. distancia)
+    """
+    return CACHE_EFEMERIDES.obtener(
+        (dia_juliano, planeta, flags),
+        lambda: tuple(swe.calc_ut(dia_juliano, planeta, flags)[0])
+    )
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # FUNCIONES DE CÁLCULO ASTRONÓMICO
@@ -281,28 +631,63 @@ def obtener_dia_juliano(anio: int, mes: int, dia: int, hora: float = 12.0) -> fl
     return swe.julday(anio, mes, dia, hora)
 
 
-def obtener_posicion_planeta(dia_juliano: float, planeta: int) -> Dict[str, Any]:
+def dia_juliano_a_datetime(dia_juliano: float) -> datetime:
+    """Convierte un día juliano (UT) a datetime, redondeado al segundo"""
+    anio, mes, dia, hora = swe.revjul(dia_juliano)
+    return datetime(anio, mes, dia) + timedelta(seconds=round(hora * 3600))
+
+
+def calcular_longitud_velocidad(dia_juliano: float, planeta: int, modo: Optional[str] = None,
+                                usar_cache: bool = True) -> tuple:
+    """
+    Longitud y velocidad de un cuerpo, según el modo de efemérides.
+    
+    Es el núcleo de obtener_posicion_planeta(); las búsquedas de eventos
+    lo usan directamente (sin caché) porque evalúan instantes que no se repiten.
+    
+    Returns:
+        Tupla (longitud 0-360°, velocidad °/día)
+    """
+    modo = validar_modo_efemerides(modo)
+    
+    if modo == "interpolado":
+        return EFEMERIDE_CHEBYSHEV.posicion(dia_juliano, planeta)
+    
+    tabla = obtener_tabla_efemerides() if modo == "auto" else None
+    if tabla is not None and tabla.cubre(dia_juliano, planeta):
+        return tabla.posicion(dia_juliano, planeta)
+    
+    if usar_cache:
+        posicion = calcular_posicion_swe(dia_juliano, planeta)
+    else:
+        posicion, _ = swe.calc_ut(dia_juliano, planeta, FLAGS_EFEMERIDES)
+    # La velocidad indica si está retrógrado (negativa = retrógrado)
+    return posicion[0], (posicion[3] if len(posicion) > 3 else 0)
+
+
+def obtener_posicion_planeta(dia_juliano: float, planeta: int, modo: Optional[str] = None) -> Dict[str, Any]:
     """
     Obtiene la posición de un planeta en un momento dado.
     
     Args:
         dia_juliano: Fecha en formato día juliano
         planeta: Código del planeta (swe.SUN, swe.MOON, etc.)
+        modo: "auto" (tabla precalculada si cubre la fecha, si no Swiss
+              Ephemeris), "exacto" (siempre Swiss Ephemeris) o "interpolado"
+              (polinomios de Chebyshev, error verificado contra ERROR_MAXIMO_CHEBYSHEV).
+              Default: MODO_EFEMERIDES
     
     Returns:
         Diccionario con: longitud, signo, grado, velocidad, retrógrado
     """
     try:
-        posicion, _ = swe.calc_ut(dia_juliano, planeta)
-        longitud = posicion[0]
+        # Un modo desconocido se trata como cualquier otro error de cálculo
+        longitud, velocidad = calcular_longitud_velocidad(dia_juliano, planeta, modo)
         
         # Calcular signo y grado dentro del signo
         numero_signo = int(longitud / 30)
         grado = longitud % 30
         
-        # La velocidad indica si está retrógrado (negativa = retrógrado)
-        velocidad = posicion[3] if len(posicion) > 3 else 0
-        
         return {
             "longitud": longitud,
             "signo": SIGNOS[numero_signo],
@@ -316,7 +701,61 @@ def obtener_posicion_planeta(dia_juliano: float, planeta: int) -> Dict[str, Any]
         return None
 
 
-def obtener_fase_lunar(dia_juliano: float) -> Dict[str, Any]:
+def diferencia_angular(angulo1, angulo2):
+    """
+    Diferencia con signo angulo1 - angulo2, normalizada a [-180°, 180°).
+    Acepta números o arreglos de NumPy.
+    """
+    return (angulo1 - angulo2 + 180.0) % 360.0 - 180.0
+
+
+class ChartSnapshot:
+    """
+    Carta del cielo en un instante: todas las posiciones de PLANETAS
+    calculadas una sola vez para un mismo día juliano.
+    
+    Las funciones de fase, vacío de curso, Via Combusta y aspectos
+    reciben esta carta para no volver a llamar a Swiss Ephemeris
+    por cada cuerpo que necesitan.
+    
+    Uso:
+        carta = ChartSnapshot(dia_juliano)
+        luna = carta[swe.MOON]       # mismo diccionario que obtener_posicion_planeta()
+    """
+    
+    __slots__ = ("dia_juliano", "posiciones")
+    
+    def __init__(self, dia_juliano: float, planetas: Optional[List[int]] = None):
+        """
+        Args:
+            dia_juliano: Instante de la carta
+            planetas: Cuerpos a calcular de entrada (default: todos los de PLANETAS).
+                      Los demás se calculan la primera vez que se piden.
+        """
+        self.dia_juliano = dia_juliano
+        self.posiciones = {
+            planeta: obtener_posicion_planeta(dia_juliano, planeta)
+            for planeta in (PLANETAS if planetas is None else planetas)
+        }
+    
+    def __getitem__(self, planeta: int) -> Optional[Dict[str, Any]]:
+        # Cuerpos no calculados todavía se obtienen al vuelo y se guardan
+        if planeta not in self.posiciones:
+            self.posiciones[planeta] = obtener_posicion_planeta(self.dia_juliano, planeta)
+        return self.posiciones[planeta]
+
+
+def _obtener_carta(dia_juliano: float, carta: Optional[ChartSnapshot]) -> ChartSnapshot:
+    """
+    Reutiliza la carta recibida si corresponde al mismo instante.
+    Si no, crea una carta vacía que solo calcula los cuerpos que se le pidan.
+    """
+    if carta is not None and carta.dia_juliano == dia_juliano:
+        return carta
+    return ChartSnapshot(dia_juliano, planetas=[])
+
+
+def obtener_fase_lunar(dia_juliano: float, carta: Optional[ChartSnapshot] = None) -> Dict[str, Any]:
     """
     Calcula la fase de la Luna.
     
@@ -326,11 +765,25 @@ def obtener_fase_lunar(dia_juliano: float) -> Dict[str, Any]:
     - 180° = Luna Llena
     - 270° = Cuarto Menguante
     
+    Con una carta, el ángulo sale de sus posiciones. Sin carta se consulta
+    la tabla de lunaciones (sin llamar a Swiss Ephemeris) y el ángulo se
+    interpola entre los dos cruces de 45° más cercanos.
+    
+    Args:
+        dia_juliano: Fecha en formato día juliano
+        carta: ChartSnapshot ya calculada para ese instante (opcional)
+    
     Returns:
         Diccionario con: fase (nombre), creciente (bool), angulo
     """
-    sol = obtener_posicion_planeta(dia_juliano, swe.SUN)
-    luna = obtener_posicion_planeta(dia_juliano, swe.MOON)
+    if carta is None or carta.dia_juliano != dia_juliano:
+        tabla = tabla_lunaciones()
+        if tabla.cubre(dia_juliano):
+            return tabla.fase(dia_juliano)
+    
+    carta = _obtener_carta(dia_juliano, carta)
+    sol = carta[swe.SUN]
+    luna = carta[swe.MOON]
     
     if not sol or not luna:
         return {"fase": "desconocida", "creciente": False}
@@ -338,31 +791,9 @@ def obtener_fase_lunar(dia_juliano: float) -> Dict[str, Any]:
     # Diferencia angular (siempre positiva, 0-360)
     diferencia = (luna["longitud"] - sol["longitud"]) % 360
     
-    # Determinar fase
-    if diferencia < 45:
-        fase = "Nueva"
-        creciente = True
-    elif diferencia < 90:
-        fase = "Creciente"
-        creciente = True
-    elif diferencia < 135:
-        fase = "Cuarto Creciente"
-        creciente = True
-    elif diferencia < 180:
-        fase = "Gibosa Creciente"
-        creciente = True
-    elif diferencia < 225:
-        fase = "Llena"
-        creciente = False
-    elif diferencia < 270:
-        fase = "Gibosa Menguante"
-        creciente = False
-    elif diferencia < 315:
-        fase = "Cuarto Menguante"
-        creciente = False
-    else:
-        fase = "Menguante"
-        creciente = False
+    # Determinar fase (tramos de 45°; creciente hasta la Luna Llena)
+    fase = FASES_LUNARES[int(diferencia // 45) % 8]
+    creciente = diferencia < 180
     
     return {
         "fase": fase,
@@ -378,40 +809,16 @@ def esta_luna_vacia_de_curso(dia_juliano: float) -> bool:
     Robson (pág. 15): "Cuando está vacía de curso, es decir, cuando no forma
     ningún aspecto antes de entrar en otro signo."
     
-    Simplificación: Si la Luna está en los últimos 3° del signo
-    y no tiene aspectos aplicativos, está VOC.
+    La Luna está vacía de curso desde su último aspecto mayor exacto con
+    Sol, Mercurio, Venus, Marte, Júpiter o Saturno hasta que entra en el
+    signo siguiente. Los intervalos se calculan una vez por mes (ver
+    indice_vacio_de_curso_mes) y la consulta es una búsqueda binaria.
     
     Returns:
         True si la Luna está vacía de curso
     """
-    luna = obtener_posicion_planeta(dia_juliano, swe.MOON)
-    if not luna:
-        return False
-    
-    grado_en_signo = luna["grado"]
-    
-    # Si está en los últimos 3 grados del signo
-    if grado_en_signo > 27:
-        # Verificar si hay aspectos aplicativos a otros planetas
-        tiene_aspecto_aplicativo = False
-        
-        for planeta in [swe.SUN, swe.MERCURY, swe.VENUS, swe.MARS, swe.JUPITER, swe.SATURN]:
-            pos_planeta = obtener_posicion_planeta(dia_juliano, planeta)
-            if pos_planeta:
-                diferencia = abs(luna["longitud"] - pos_planeta["longitud"])
-                if diferencia > 180:
-                    diferencia = 360 - diferencia
-                
-                # Aspectos mayores con orbe de 3°
-                for aspecto in [0, 60, 90, 120, 180]:
-                    if abs(diferencia - aspecto) < 3:
-                        if luna["velocidad"] > 0:  # Aplicativo
-                            tiene_aspecto_aplicativo = True
-                            break
-        
-        return not tiene_aspecto_aplicativo
-    
-    return False
+    anio, mes, _, _ = swe.revjul(dia_juliano)
+    return indice_vacio_de_curso_mes(anio, mes).contiene(dia_juliano)
 
 
 def esta_en_via_combusta(longitud: float) -> bool:
@@ -430,7 +837,8 @@ def esta_en_via_combusta(longitud: float) -> bool:
     return VIA_COMBUSTA_INICIO <= longitud <= VIA_COMBUSTA_FIN
 
 
-def calcular_aspecto(dia_juliano: float, planeta1: int, planeta2: int) -> Optional[Dict[str, Any]]:
+def calcular_aspecto(dia_juliano: float, planeta1: int, planeta2: int,
+                     carta: Optional[ChartSnapshot] = None) -> Optional[Dict[str, Any]]:
     """
     Calcula el aspecto entre dos planetas.
     
@@ -441,12 +849,16 @@ def calcular_aspecto(dia_juliano: float, planeta1: int, planeta2: int) -> Option
     - Trígono: 120° (orbe 8°)
     - Oposición: 180° (orbe 8°)
     
+    Args:
+        carta: ChartSnapshot ya calculada para ese instante (opcional)
+    
     Returns:
         Diccionario con: aspecto, simbolo, angulo, orbe
         None si no hay aspecto
     """
-    pos1 = obtener_posicion_planeta(dia_juliano, planeta1)
-    pos2 = obtener_posicion_planeta(dia_juliano, planeta2)
+    carta = _obtener_carta(dia_juliano, carta)
+    pos1 = carta[planeta1]
+    pos2 = carta[planeta2]
     
     if not pos1 or not pos2:
         return None
@@ -455,16 +867,7 @@ def calcular_aspecto(dia_juliano: float, planeta1: int, planeta2: int) -> Option
     if diferencia > 180:
         diferencia = 360 - diferencia
     
-    # Definición de aspectos: ángulo -> (nombre, símbolo, orbe permitido)
-    aspectos = {
-        0: ("Conjunción", "☌", 8),
-        60: ("Sextil", "⚹", 6),
-        90: ("Cuadratura", "□", 7),
-        120: ("Trígono", "△", 8),
-        180: ("Oposición", "☍", 8)
-    }
-    
-    for angulo, (nombre, simbolo, orbe) in aspectos.items():
+    for angulo, (nombre, simbolo, orbe) in ASPECTOS.items():
         if abs(diferencia - angulo) <= orbe:
             return {
                 "aspecto": nombre,
@@ -477,279 +880,3409 @@ def calcular_aspecto(dia_juliano: float, planeta1: int, planeta2: int) -> Option
     return None
 
 
-def obtener_horas_planetarias(fecha: datetime, latitud: float, longitud: float) -> List[Dict[str, Any]]:
+# Lugar redondeado a 0.01° (~1 km, menos de 5 segundos de diferencia en el
+# amanecer) para que las consultas de una misma ciudad compartan el caché
+DECIMALES_LUGAR_SOL = 2
+
+# Amaneceres y ocasos guardados: (año, mes, día, latitud, longitud) -> (amanecer, ocaso)
+MAXIMO_CACHE_SALIDAS_SOL = int(os.environ.get("AE_CACHE_SALIDAS_SOL_MAX", "20000"))
+CACHE_SALIDAS_SOL = CacheLRU(MAXIMO_CACHE_SALIDAS_SOL)
+
+
+def _evento_sol(dia_juliano: float, evento: int, latitud: float, longitud: float) -> Optional[float]:
+    """Próximo amanecer (swe.CALC_RISE) u ocaso (swe.CALC_SET) desde dia_juliano, o None si no ocurre"""
+    resultado, tiempos = swe.rise_trans(
+        dia_juliano, swe.SUN, evento, (longitud, latitud, 0.0),
+        PRESION_ATMOSFERICA_MBAR, TEMPERATURA_ATMOSFERICA_C
+    )
+    return tiempos[0] if resultado == 0 else None
+
+
+# ── Amanecer y ocaso vectorizados ──
+# Para muchos días y lugares a la vez (ej: /calcular de un año en varias
+# sucursales) no se llama a swe.rise_trans por cada día, lugar y evento: se
+# resuelve todo con NumPy. La longitud aparente del Sol sale de las efemérides
+# (una muestra diaria, interpolada) y la ascensión recta y la declinación de la
+# oblicuidad y nutación del día. Se busca el tránsito por el meridiano más
+# cercano al mediodía local, se suma y resta el semiarco diurno y dos pasos de
+# Newton sobre la altura corrigen el cambio de declinación durante el semiarco.
+#
+# El horizonte es el mismo que usa swe.rise_trans: borde superior del Sol
+# (semidiámetro según la distancia de ese día), refracción de Sinclair en
+# altura aparente 0° (la de swe_refrac_extended) con la presión y temperatura
+# que se le pasan explícitamente, y paralaje (rise_trans es topocéntrico).
+# verificar_salidas_sol() compara el resultado con swe.rise_trans.
+
+# Atmósfera usada en ambos cálculos: la que Swiss Ephemeris asume cuando
+# recibe 0 (presión a nivel del mar, 0 °C)
+PRESION_ATMOSFERICA_MBAR = 1013.25
+TEMPERATURA_ATMOSFERICA_C = 0.0
+
+# Semidiámetro y paralaje horizontal del Sol a 1 UA, en grados
+SEMIDIAMETRO_SOL = 959.63 / 3600
+PARALAJE_SOL = 8.794 / 3600
+
+# Grados de rotación sidérea de la Tierra por día
+GRADOS_SIDEREOS_DIA = 360.98564736629
+
+# Diferencia máxima aceptada contra swe.rise_trans en verificar_salidas_sol()
+TOLERANCIA_SALIDAS_SOL_SEGUNDOS = 5
+
+# Lugares de verificar_salidas_sol() por defecto: Lima, Madrid, Ciudad de
+# México, Oslo y Helsinki (a ~60° el error de horizonte pesa el doble)
+LUGARES_VERIFICACION_SOL = [
+    (-12.0464, -77.0428), (40.4168, -3.7038), (19.4326, -99.1332),
+    (59.9139, 10.7522), (60.1699, 24.9384)
+]
+
+
+def refraccion_horizonte(presion: float, temperatura: float) -> float:
+    """Refracción (grados) en altura aparente 0°, fórmula de Sinclair"""
+    refraccion = 34.46  # minutos de arco con 1010 mbar y 10 °C
+    return (presion - 80) / 930 / (1 + 0.00008 * (refraccion + 39) * (temperatura - 10)) * refraccion / 60
+
+
+REFRACCION_HORIZONTE_SOL = refraccion_horizonte(PRESION_ATMOSFERICA_MBAR, TEMPERATURA_ATMOSFERICA_C)
+
+
+def _longitudes_sol(dias_julianos: np.ndarray) -> Callable[[np.ndarray], np.ndarray]:
     """
-    Calcula las horas planetarias del día.
+    Longitud aparente del Sol (grados, sin reducir a 0-360) para cualquier
+    instante cercano a dias_julianos: muestras diarias de las efemérides
+    interpoladas linealmente (el error es menor a 0.0002°).
+    """
+    desde = math.floor(float(np.nanmin(dias_julianos))) - 2.5
+    hasta = math.ceil(float(np.nanmax(dias_julianos))) + 2.5
+    efemerides = calcular_efemerides_rango(desde, hasta, 1.0, [swe.SUN])
+    muestras = np.degrees(np.unwrap(np.radians(efemerides.longitud(swe.SUN))))
+    return lambda instantes: np.interp(instantes, efemerides.dias_julianos, muestras)
+
+
+def _angulo_horario_sol(dias_julianos: np.ndarray, longitudes: np.ndarray,
+                        longitud_sol: Callable[[np.ndarray], np.ndarray]) -> tuple:
+    """
+    Ángulo horario local del Sol (grados, en [-180, 180)), su declinación
+    (radianes) y la altura del horizonte de amanecer y ocaso (radianes).
+    """
+    t = (dias_julianos - 2451545.0) / 36525
+    nodo = np.radians(125.04452 - 1934.136261 * t)
+    # Nutación en longitud y oblicuidad (término principal) y oblicuidad verdadera
+    nutacion = -0.004778 * np.sin(nodo)
+    oblicuidad = np.radians(23.439291 - 0.0130042 * t + 0.002556 * np.cos(nodo))
     
-    Robson (Cap. 5): "El día astrológico comienza en el momento exacto
-    del amanecer local. La primera hora está regida por el planeta
-    que rige el día."
+    lambda_sol = np.radians(longitud_sol(dias_julianos))
+    ascension = np.degrees(np.arctan2(np.cos(oblicuidad) * np.sin(lambda_sol), np.cos(lambda_sol)))
+    declinacion = np.arcsin(np.sin(oblicuidad) * np.sin(lambda_sol))
     
-    Simplificación: Dividimos el día en 12 horas diurnas (6am-6pm)
-    y asignamos planetas según el orden caldeo.
+    # Tiempo sidéreo aparente (medio + ecuación de los equinoccios)
+    sidereo = 280.46061837 + GRADOS_SIDEREOS_DIA * (dias_julianos - 2451545.0) + nutacion * np.cos(oblicuidad)
     
-    Returns:
-        Lista de horas con su planeta regente
+    # Distancia Tierra-Sol (UA) para el semidiámetro y la paralaje del día
+    anomalia = np.radians(357.52911 + 35999.05029 * t)
+    excentricidad = 0.016708634 - 0.000042037 * t
+    centro = np.radians(1.914602 * np.sin(anomalia) + 0.019993 * np.sin(2 * anomalia))
+    distancia = 1.000001018 * (1 - excentricidad ** 2) / (1 + excentricidad * np.cos(anomalia + centro))
+    horizonte = np.radians((PARALAJE_SOL - SEMIDIAMETRO_SOL) / distancia - REFRACCION_HORIZONTE_SOL)
+    
+    return (sidereo + longitudes - ascension + 180) % 360 - 180, declinacion, horizonte
+
+
+def salidas_puestas_sol(fechas: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray) -> tuple:
     """
-    dia_semana = fecha.weekday()
-    regente_dia = REGENTES_DIAS[dia_semana]
+    Amanecer y ocaso del Sol para fechas × lugares en una sola pasada.
     
-    # Encontrar índice del regente en el orden caldeo
-    indice_inicio = ORDEN_HORAS_PLANETARIAS.index(regente_dia)
+    Args:
+        fechas: Días julianos de las 00:00 UT de cada fecha civil, forma (n,)
+        latitudes: Latitudes de los lugares, forma (m,)
+        longitudes: Longitudes de los lugares, forma (m,); cada fecha es el día
+            local según la hora local aproximada (ver desfase_horario)
     
-    horas = []
+    Returns:
+        (amaneceres, ocasos): matrices (n, m) de días julianos UT, NaN si ese
+        día el Sol no sale o no se pone (latitudes polares)
+    """
+    fechas = np.asarray(fechas, dtype=np.float64)[:, None]
+    latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))[None, :]
+    longitudes = np.asarray(longitudes, dtype=np.float64)[None, :]
+    if fechas.size == 0 or longitudes.size == 0:
+        vacio = np.empty((fechas.shape[0], longitudes.shape[1]))
+        return vacio, vacio.copy()
+    longitud_sol = _longitudes_sol(fechas)
     
-    # Generar 12 horas diurnas
-    for i in range(12):
-        indice_planeta = (indice_inicio + i) % 7
-        planeta = ORDEN_HORAS_PLANETARIAS[indice_planeta]
-        hora_inicio = 6 + i
-        
-        # Júpiter, Venus y Sol son favorables
-        favorable = planeta in ["Júpiter", "Venus", "Sol"]
-        
-        horas.append({
-            "hora_inicio": f"{hora_inicio:02d}:00",
-            "hora_fin": f"{hora_inicio+1:02d}:00",
-            "planeta": planeta,
-            "favorable": favorable,
-            "tipo": "diurna"
-        })
+    # Tránsito más cercano al mediodía local (la segunda pasada corrige el
+    # movimiento del Sol durante la primera)
+    transito = fechas + 0.5 - np.round(longitudes / 15) / 24
+    for _ in range(2):
+        angulo, declinacion, horizonte = _angulo_horario_sol(transito, longitudes, longitud_sol)
+        transito = transito - angulo / GRADOS_SIDEREOS_DIA
+    
+    coseno = ((np.sin(horizonte) - np.sin(latitudes) * np.sin(declinacion))
+              / (np.cos(latitudes) * np.cos(declinacion)))
+    semiarco = np.degrees(np.arccos(np.clip(coseno, -1, 1))) / GRADOS_SIDEREOS_DIA
+    sin_evento = np.abs(coseno) > 1
     
-    return horas
+    eventos = []
+    for estimado in (transito - semiarco, transito + semiarco):
+        evento = estimado
+        for _ in range(2):
+            # Paso de Newton: (altura - horizonte) / (d altura / dt)
+            angulo, declinacion, horizonte = _angulo_horario_sol(evento, longitudes, longitud_sol)
+            angulo = np.radians(angulo)
+            altura = np.arcsin(np.sin(latitudes) * np.sin(declinacion)
+                               + np.cos(latitudes) * np.cos(declinacion) * np.cos(angulo))
+            derivada = (-np.cos(latitudes) * np.cos(declinacion) * np.sin(angulo)
+                        * np.radians(GRADOS_SIDEREOS_DIA) / np.cos(altura))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corregido = evento - (altura - horizonte) / derivada
+            # Cerca del día polar la derivada se anula: se conserva la estimación
+            evento = np.where(np.abs(corregido - estimado) < 0.01, corregido, evento)
+        eventos.append(np.where(sin_evento, np.nan, evento))
+    return eventos[0], eventos[1]
+
+
+def _clave_salida_sol(fecha: datetime, latitud: float, longitud: float) -> tuple:
+    return (fecha.year, fecha.month, fecha.day,
+            round(latitud, DECIMALES_LUGAR_SOL), round(longitud, DECIMALES_LUGAR_SOL))
+
+
+def _salida_sol_guardada(amanecer: float, ocaso: float) -> Optional[tuple]:
+    """Valor de CACHE_SALIDAS_SOL: (amanecer, ocaso) o None"""
+    if np.isnan(amanecer) or np.isnan(ocaso):
+        return None
+    return (float(amanecer), float(ocaso))
 
-# ═══════════════════════════════════════════════════════════════════════════════
-# SISTEMA DE PUNTUACIÓN (SCORING)
-# ═══════════════════════════════════════════════════════════════════════════════
 
-def calcular_puntaje_fecha(dia_juliano: float, tipo_proyecto: str, lat: float, lon: float) -> Dict[str, Any]:
+def salida_puesta_sol(fecha: datetime, latitud: float, longitud: float) -> Optional[tuple]:
     """
-    Calcula el puntaje de una fecha para un tipo de proyecto.
-    
-    METODOLOGÍA:
-    - Puntaje base: 50 (neutro)
-    - Se suman/restan puntos según las reglas de Robson
-    - Puntaje final: 0-100
+    Amanecer y ocaso del día local de una fecha (ver salidas_puestas_sol).
     
-    NIVELES:
-    - 80-100: Excelente
-    - 60-79: Buena
-    - 40-59: Precaución
-    - 0-39: Evitar
+    El resultado queda en CACHE_SALIDAS_SOL. Para muchos días se usa
+    linea_horas_planetarias() o IndiceHorasPlanetarias.
     
     Returns:
-        Diccionario con: puntaje, nivel, factores
+        (amanecer, ocaso) en días julianos UT, o None si ese día el Sol
+        no sale o no se pone (latitudes polares)
     """
-    puntaje = 50  # Puntaje base neutro
-    factores = []
+    clave = _clave_salida_sol(fecha, latitud, longitud)
     
-    # ═══════════════════════════════════════════════════════════════════════
-    # Obtener posiciones planetarias
-    # ═══════════════════════════════════════════════════════════════════════
-    luna = obtener_posicion_planeta(dia_juliano, swe.MOON)
-    sol = obtener_posicion_planeta(dia_juliano, swe.SUN)
-    mercurio = obtener_posicion_planeta(dia_juliano, swe.MERCURY)
-    venus = obtener_posicion_planeta(dia_juliano, swe.VENUS)
-    marte = obtener_posicion_planeta(dia_juliano, swe.MARS)
-    jupiter = obtener_posicion_planeta(dia_juliano, swe.JUPITER)
-    saturno = obtener_posicion_planeta(dia_juliano, swe.SATURN)
+    def calcular():
+        amaneceres, ocasos = salidas_puestas_sol(
+            np.array([obtener_dia_juliano(fecha.year, fecha.month, fecha.day, 0.0)]),
+            np.array([clave[3]]), np.array([clave[4]])
+        )
+        return _salida_sol_guardada(amaneceres[0, 0], ocasos[0, 0])
     
-    fase_lunar = obtener_fase_lunar(dia_juliano)
+    return CACHE_SALIDAS_SOL.obtener(clave, calcular)
+
+
+def verificar_salidas_sol(fecha_inicio: datetime, n_dias: int, lugares: List[tuple]) -> Dict[str, Any]:
+    """
+    Compara salidas_puestas_sol() con swe.rise_trans (amanecer después de la
+    medianoche local y ocaso después del amanecer).
     
-    # ═══════════════════════════════════════════════════════════════════════
-    # REGLA 1: FASE LUNAR (Robson Cap. 3, pág. 13)
-    # "Los asuntos progresan mucho más rápido y exitosamente si se inician
-    #  cuando la Luna está creciendo en luz"
-    # ═══════════════════════════════════════════════════════════════════════
+    Returns:
+        {comparados, diferencia_maxima_segundos, diferencia_media_segundos, peores}
+    """
+    fechas = [fecha_inicio + timedelta(days=n) for n in range(n_dias)]
+    amaneceres, ocasos = salidas_puestas_sol(
+        np.array([obtener_dia_juliano(f.year, f.month, f.day, 0.0) for f in fechas]),
+        np.array([lat for lat, _ in lugares]), np.array([lon for _, lon in lugares])
+    )
     
-    if fase_lunar["creciente"]:
-        puntaje += PESOS["luna_creciente"]
-        factores.append({
-            "texto": f"☽ Luna {fase_lunar['fase']}",
-            "tipo": "positive"
-        })
-    else:
-        puntaje += PESOS["luna_menguante"]
-        factores.append({
-            "texto": f"☽ Luna {fase_lunar['fase']}",
-            "tipo": "negative"
-        })
+    diferencias = []
+    for i, fecha in enumerate(fechas):
+        for j, (lat, lon) in enumerate(lugares):
+            if np.isnan(amaneceres[i, j]):
+                continue
+            medianoche = obtener_dia_juliano(fecha.year, fecha.month, fecha.day, 0.0) - desfase_horario(lon) / 24
+            amanecer = _evento_sol(medianoche, swe.CALC_RISE, lat, lon)
+            ocaso = _evento_sol(amanecer, swe.CALC_SET, lat, lon) if amanecer is not None else None
+            if amanecer is None or ocaso is None:
+                continue
+            segundos = max(abs(amanecer - amaneceres[i, j]), abs(ocaso - ocasos[i, j])) * 86400
+            diferencias.append((segundos, fecha.strftime("%Y-%m-%d"), lat, lon))
     
-    # ═══════════════════════════════════════════════════════════════════════
-    # REGLA 2: LUNA VACÍA DE CURSO (Robson Cap. 3, pág. 15)
-    # "Cuando está vacía de curso... no forma aspectos antes de cambiar de signo.
-    #  Nada resultará del asunto."
-    # ═══════════════════════════════════════════════════════════════════════
+    diferencias.sort(reverse=True)
+    return {
+        "comparados": len(diferencias),
+        "diferencia_maxima_segundos": round(diferencias[0][0], 1) if diferencias else 0.0,
+        "diferencia_media_segundos": round(float(np.mean([d[0] for d in diferencias])), 1) if diferencias else 0.0,
+        "peores": [
+            {"fecha": fecha, "latitud": lat, "longitud": lon, "segundos": round(segundos, 1)}
+            for segundos, fecha, lat, lon in diferencias[:5]
+        ]
+    }
+
+
+# ── Línea de tiempo de horas planetarias (arreglos) ──
+# Las horas de un lugar son consecutivas: cada día astrológico tiene 12 horas
+# diurnas (amanecer a ocaso) y 12 nocturnas (ocaso al amanecer siguiente), y la
+# última nocturna termina donde empieza la primera diurna del día siguiente.
+# Por eso alcanza con los límites (días julianos UT) y el regente de cada hora,
+# y semanas de horas se generan con una sola operación de arreglos.
+
+# Índice en ORDEN_HORAS_PLANETARIAS del regente de cada día (0 = lunes)
+INDICE_REGENTE_DIA = np.array(
+    [ORDEN_HORAS_PLANETARIAS.index(REGENTES_DIAS[dia]) for dia in range(7)], dtype=np.int8
+)
+
+# Índices en ORDEN_HORAS_PLANETARIAS de los planetas favorables
+INDICES_FAVORABLES_HORAS = np.array(
+    [ORDEN_HORAS_PLANETARIAS.index(planeta) for planeta in PLANETAS_FAVORABLES_HORAS], dtype=np.int8
+)
+
+
+class LineaHorasPlanetarias:
+    """
+    Horas planetarias consecutivas de un lugar.
     
-    if esta_luna_vacia_de_curso(dia_juliano):
-        puntaje += PESOS["luna_vacia_curso"]
-        factores.append({
-            "texto": "☽ Luna Vacía de Curso",
-            "tipo": "negative"
-        })
+    La hora i va de limites[i] a limites[i + 1] (días julianos UT) y la rige
+    ORDEN_HORAS_PLANETARIAS[regentes[i]]. primera es el número (0-23) de la
+    hora 0 dentro de su día astrológico: las horas 0-11 son diurnas.
+    """
     
-    # ═══════════════════════════════════════════════════════════════════════
-    # REGLA 3: VIA COMBUSTA (Robson Cap. 3, pág. 15)
-    # "La peor posición zodiacal para la Luna es la Via Combusta,
-    #  que se extiende desde 15° Libra hasta 15° Escorpio"
-    # ═══════════════════════════════════════════════════════════════════════
+    __slots__ = ("limites", "regentes", "primera")
     
-    if luna and esta_en_via_combusta(luna["longitud"]):
-        puntaje += PESOS["via_combusta"]
-        factores.append({
-            "texto": f"☽ Via Combusta ({luna['grado']:.0f}° {luna['signo']})",
-            "tipo": "negative"
-        })
+    def __init__(self, limites: np.ndarray, regentes: np.ndarray, primera: int = 0):
+        self.limites = limites
+        self.regentes = regentes
+        self.primera = primera
     
-    # ═══════════════════════════════════════════════════════════════════════
-    # REGLA 4: MERCURIO RETRÓGRADO (Robson Cap. 4, pág. 15)
-    # "Es muy importante evitar la aplicación lunar a la conjunción o aspecto
-    #  de cualquier planeta retrógrado, porque cualquier cosa iniciada en tal
-    #  momento fallará rápidamente"
-    # ═══════════════════════════════════════════════════════════════════════
-    
-    if mercurio and mercurio["retrogrado"]:
-        puntaje += PESOS["mercurio_retrogrado"]
-        factores.append({
-            "texto": "☿ Mercurio Retrógrado ℞",
-            "tipo": "negative"
-        })
-    else:
-        puntaje += PESOS["mercurio_directo"]
-        factores.append({
-            "texto": "☿ Mercurio Directo",
-            "tipo": "positive"
-        })
+    def __len__(self) -> int:
+        return len(self.regentes)
     
-    # ═══════════════════════════════════════════════════════════════════════
-    # REGLA 5: ASPECTOS LUNA-JÚPITER/VENUS (Robson Cap. 4, pág. 14)
-    # "Prosperidad y éxito siguen a la Luna en buen aspecto o conjunción
-    #  con Júpiter o Venus"
-    # ═══════════════════════════════════════════════════════════════════════
-    
-    aspecto_luna_jupiter = calcular_aspecto(dia_juliano, swe.MOON, swe.JUPITER)
-    if aspecto_luna_jupiter:
-        if aspecto_luna_jupiter["aspecto"] in ["Conjunción", "Trígono", "Sextil"]:
-            peso_key = f"luna_{aspecto_luna_jupiter['aspecto'].lower()}_jupiter"
-            puntaje += PESOS.get(peso_key, 12)
-            factores.append({
-                "texto": f"☽ {aspecto_luna_jupiter['simbolo']} ♃ ({aspecto_luna_jupiter['aspecto']})",
-                "tipo": "positive"
-            })
-        elif aspecto_luna_jupiter["aspecto"] in ["Cuadratura", "Oposición"]:
-            puntaje -= 5
-            factores.append({
-                "texto": f"☽ {aspecto_luna_jupiter['simbolo']} ♃ ({aspecto_luna_jupiter['aspecto']})",
-                "tipo": "neutral"
-            })
-    
-    aspecto_luna_venus = calcular_aspecto(dia_juliano, swe.MOON, swe.VENUS)
-    if aspecto_luna_venus:
-        if aspecto_luna_venus["aspecto"] in ["Conjunción", "Trígono", "Sextil"]:
-            puntaje += 10
-            factores.append({
-                "texto": f"☽ {aspecto_luna_venus['simbolo']} ♀ ({aspecto_luna_venus['aspecto']})",
-                "tipo": "positive"
-            })
-    
-    # ═══════════════════════════════════════════════════════════════════════
-    # REGLA 6: ASPECTOS LUNA-MARTE/SATURNO (Robson Cap. 4, pág. 14)
-    # "Es preferible como regla que la Luna no tenga ningún aspecto
-    #  con los maléficos"
-    # ═══════════════════════════════════════════════════════════════════════
-    
-    aspecto_luna_marte = calcular_aspecto(dia_juliano, swe.MOON, swe.MARS)
-    if aspecto_luna_marte:
-        if aspecto_luna_marte["aspecto"] in ["Conjunción", "Cuadratura", "Oposición"]:
-            puntaje += PESOS["luna_cuadratura_marte"]
-            factores.append({
-                "texto": f"☽ {aspecto_luna_marte['simbolo']} ♂ ({aspecto_luna_marte['aspecto']})",
-                "tipo": "negative"
-            })
-    
-    aspecto_luna_saturno = calcular_aspecto(dia_juliano, swe.MOON, swe.SATURN)
-    if aspecto_luna_saturno:
-        if aspecto_luna_saturno["aspecto"] in ["Conjunción", "Cuadratura", "Oposición"]:
-            puntaje += PESOS["luna_cuadratura_saturno"]
-            factores.append({
-                "texto": f"☽ {aspecto_luna_saturno['simbolo']} ♄ ({aspecto_luna_saturno['aspecto']})",
-                "tipo": "negative"
-            })
-    
-    # ═══════════════════════════════════════════════════════════════════════
-    # REGLA 7: SIGNO LUNAR FAVORABLE (Robson Cap. 8, pág. 34)
-    # "La Luna en Tauro, Cáncer, Virgo, Capricornio o Piscis es favorable
-    #  para comprar y vender"
-    # ═══════════════════════════════════════════════════════════════════════
+    @property
+    def inicios(self) -> np.ndarray:
+        return self.limites[:-1]
     
-    signos_favorables = ["Tauro", "Cáncer", "Virgo", "Capricornio", "Piscis"]
-    if luna and luna["signo"] in signos_favorables:
-        puntaje += PESOS["luna_signo_favorable"]
-        factores.append({
-            "texto": f"☽ Luna en {luna['signo']}",
-            "tipo": "positive"
-        })
+    @property
+    def fines(self) -> np.ndarray:
+        return self.limites[1:]
     
-    # ═══════════════════════════════════════════════════════════════════════
-    # REGLA 8: ASPECTO SOL-LUNA (Robson Cap. 3, pág. 13)
-    # "Un buen aspecto entre la Luna y el Sol es una excelente base
-    #  para el éxito, y mejorará cualquier elección"
-    # ═══════════════════════════════════════════════════════════════════════
+    def diurnas(self) -> np.ndarray:
+        """Máscara de las horas diurnas"""
+        return (self.primera + np.arange(len(self))) % 24 < 12
+    
+    def favorables(self) -> np.ndarray:
+        """Máscara de las horas de Júpiter, Venus y Sol"""
+        return np.isin(self.regentes, INDICES_FAVORABLES_HORAS)
+    
+    def a_intervalos(self, mascara: Optional[np.ndarray] = None) -> "IndiceIntervalos":
+        """IndiceIntervalos de las horas (todas o las de la máscara) con el planeta como dato"""
+        indices = np.arange(len(self)) if mascara is None else np.flatnonzero(mascara)
+        return IndiceIntervalos([
+            (self.limites[i], self.limites[i + 1], ORDEN_HORAS_PLANETARIAS[self.regentes[i]])
+            for i in indices.tolist()
+        ])
+
+
+def _linea_desde_salidas(fecha: datetime, latitud: float, longitud: float,
+                         amaneceres: np.ndarray, ocasos: np.ndarray) -> LineaHorasPlanetarias:
+    """
+    Arma la línea de n días a partir de amaneceres y ocasos de n + 1 días
+    locales consecutivos (NaN si el Sol no sale o no se pone).
+    
+    Sin amanecer se usan las 06:00 locales y sin ocaso el punto medio entre
+    amaneceres, así las horas siguen siendo consecutivas.
+    """
+    n_dias = len(amaneceres) - 1
+    medianoche = obtener_dia_juliano(fecha.year, fecha.month, fecha.day, 0.0) - desfase_horario(longitud) / 24
+    seis = medianoche + 0.25 + np.arange(n_dias + 1)
+    amaneceres = np.where(np.isnan(amaneceres), seis, amaneceres)
+    ocasos = ocasos[:-1]
+    ocasos = np.where(np.isnan(ocasos), (amaneceres[:-1] + amaneceres[1:]) / 2, ocasos)
+    
+    fracciones = np.arange(12) / 12
+    diurnas = amaneceres[:-1, None] + (ocasos - amaneceres[:-1])[:, None] * fracciones
+    nocturnas = ocasos[:, None] + (amaneceres[1:] - ocasos)[:, None] * fracciones
+    limites = np.append(np.hstack([diurnas, nocturnas]).ravel(), amaneceres[-1])
+    
+    dias_semana = (fecha.weekday() + np.arange(n_dias)) % 7
+    regentes = ((INDICE_REGENTE_DIA[dias_semana][:, None] + np.arange(24)) % 7).astype(np.int8).ravel()
+    return LineaHorasPlanetarias(limites, regentes)
+
+
+def linea_horas_planetarias(fecha: datetime, n_dias: int, latitud: float, longitud: float) -> LineaHorasPlanetarias:
+    """
+    Horas planetarias de n_dias días astrológicos desde el amanecer del día
+    local de la fecha, con amaneceres y ocasos en una sola llamada a
+    salidas_puestas_sol().
+    """
+    latitud = round(latitud, DECIMALES_LUGAR_SOL)
+    longitud = round(longitud, DECIMALES_LUGAR_SOL)
+    jd_fecha = obtener_dia_juliano(fecha.year, fecha.month, fecha.day, 0.0)
+    amaneceres, ocasos = salidas_puestas_sol(
+        jd_fecha + np.arange(n_dias + 1), np.array([latitud]), np.array([longitud])
+    )
+    return _linea_desde_salidas(fecha, latitud, longitud, amaneceres[:, 0], ocasos[:, 0])
+
+
+# ── Índice de horas planetarias por lugar ──
+# Cada lugar guarda sus horas en bloques anuales (días astrológicos del 1/1 al
+# 31/12 locales, del amanecer del 1/1 al del 1/1 siguiente), construidos la
+# primera vez que se consultan. Los bloques son consecutivos, así que
+# "¿qué hora rige en t?" es una búsqueda binaria en los límites y "las horas
+# de un rango" un corte de los arreglos, sin recalcular amaneceres por día.
+
+# Lugares con índice guardado (latitud y longitud redondeadas a DECIMALES_LUGAR_SOL)
+MAXIMO_INDICES_HORAS = int(os.environ.get("AE_INDICES_HORAS_MAX", "256"))
+
+# Bloques anuales guardados por lugar (~80 KB cada uno; los años vienen del
+# cliente, así que se desalojan los menos usados). 12 cubre una consulta de
+# 10 años más el año anterior y el siguiente.
+MAXIMO_BLOQUES_HORAS = int(os.environ.get("AE_BLOQUES_HORAS_MAX", "12"))
+
+
+class IndiceHorasPlanetarias:
+    """Horas planetarias de un lugar, por bloques anuales de LineaHorasPlanetarias"""
+    
+    def __init__(self, latitud: float, longitud: float):
+        self.latitud = round(latitud, DECIMALES_LUGAR_SOL)
+        self.longitud = round(longitud, DECIMALES_LUGAR_SOL)
+        self.bloques: "OrderedDict[int, LineaHorasPlanetarias]" = OrderedDict()
+        self._candado = threading.Lock()
+    
+    def tiene_bloque(self, anio: int) -> bool:
+        with self._candado:
+            return anio in self.bloques
+    
+    def _guardar(self, anio: int, linea: LineaHorasPlanetarias):
+        """Guarda un bloque y desaloja los menos usados (con el candado tomado)"""
+        self.bloques[anio] = linea
+        self.bloques.move_to_end(anio)
+        while len(self.bloques) > max(1, MAXIMO_BLOQUES_HORAS):
+            self.bloques.popitem(last=False)
+    
+    def guardar_bloque(self, anio: int, linea: LineaHorasPlanetarias):
+        """Guarda un bloque calculado afuera (ver precalcular_horas_planetarias)"""
+        with self._candado:
+            if anio not in self.bloques:
+                self._guardar(anio, linea)
+    
+    def bloque(self, anio: int) -> LineaHorasPlanetarias:
+        """Horas de los días astrológicos del año (se calculan la primera vez)"""
+        # Se construye con el candado del lugar tomado: dos peticiones del
+        # threadpool que piden el mismo año no lo calculan dos veces
+        with self._candado:
+            if anio in self.bloques:
+                self.bloques.move_to_end(anio)
+                return self.bloques[anio]
+            linea = linea_horas_planetarias(
+                datetime(anio, 1, 1), (datetime(anio + 1, 1, 1) - datetime(anio, 1, 1)).days,
+                self.latitud, self.longitud
+            )
+            self._guardar(anio, linea)
+            return linea
+    
+    def _anios(self, jd_inicio: float, jd_fin: float) -> range:
+        """Años cuyos bloques pueden cubrir [jd_inicio, jd_fin] (el 1/1 antes del amanecer es del año anterior)"""
+        desfase = desfase_horario(self.longitud) / 24
+        return range(dia_juliano_a_datetime(jd_inicio + desfase).year - 1,
+                     dia_juliano_a_datetime(jd_fin + desfase).year + 1)
+    
+    def dia(self, fecha: datetime) -> LineaHorasPlanetarias:
+        """Las 24 horas del día astrológico de la fecha (corte del bloque, sin copiar)"""
+        bloque = self.bloque(fecha.year)
+        i = 24 * (fecha - datetime(fecha.year, 1, 1)).days
+        return LineaHorasPlanetarias(bloque.limites[i:i + 25], bloque.regentes[i:i + 24])
+    
+    def hora_en(self, dia_juliano: float) -> tuple:
+        """Hora en curso en un instante (UT): (inicio, fin, planeta, tipo)"""
+        for anio in reversed(self._anios(dia_juliano, dia_juliano)):
+            bloque = self.bloque(anio)
+            if bloque.limites[0] <= dia_juliano < bloque.limites[-1]:
+                i = int(np.searchsorted(bloque.limites, dia_juliano, side="right")) - 1
+                return (float(bloque.limites[i]), float(bloque.limites[i + 1]),
+                        ORDEN_HORAS_PLANETARIAS[bloque.regentes[i]], "diurna" if i % 24 < 12 else "nocturna")
+        raise ValueError(f"Instante fuera de los bloques de horas: {dia_juliano}")
+    
+    def regentes_en(self, dias_julianos: np.ndarray) -> np.ndarray:
+        """Regente de la hora en curso en cada instante: índices de ORDEN_HORAS_PLANETARIAS"""
+        dias_julianos = np.asarray(dias_julianos, dtype=np.float64)
+        regentes = np.full(dias_julianos.shape, -1, dtype=np.int8)
+        if dias_julianos.size == 0:
+            return regentes
+        for anio in self._anios(float(dias_julianos.min()), float(dias_julianos.max())):
+            bloque = self.bloque(anio)
+            dentro = (dias_julianos >= bloque.limites[0]) & (dias_julianos < bloque.limites[-1])
+            i = np.searchsorted(bloque.limites, dias_julianos[dentro], side="right") - 1
+            regentes[dentro] = bloque.regentes[i]
+        return regentes
+    
+    def en_rango(self, jd_inicio: float, jd_fin: float) -> LineaHorasPlanetarias:
+        """Horas que se superponen con [jd_inicio, jd_fin), unidas en una sola línea"""
+        limites, regentes, primera = [], [], None
+        for anio in self._anios(jd_inicio, jd_fin):
+            bloque = self.bloque(anio)
+            desde = max(int(np.searchsorted(bloque.limites, jd_inicio, side="right")) - 1, 0)
+            hasta = min(int(np.searchsorted(bloque.limites, jd_fin, side="left")), len(bloque))
+            if desde >= hasta:
+                continue
+            if primera is None:
+                primera = (bloque.primera + desde) % 24
+                limites.append(bloque.limites[desde:desde + 1])
+            limites.append(bloque.limites[desde + 1:hasta + 1])
+            regentes.append(bloque.regentes[desde:hasta])
+        if primera is None:
+            return LineaHorasPlanetarias(np.array([jd_inicio]), np.array([], dtype=np.int8))
+        return LineaHorasPlanetarias(np.concatenate(limites), np.concatenate(regentes), primera)
+
+
+_INDICES_HORAS = CacheLRU(MAXIMO_INDICES_HORAS)
+
+
+def indice_horas_planetarias(latitud: float, longitud: float) -> IndiceHorasPlanetarias:
+    """Índice de horas planetarias de un lugar (uno por lugar redondeado)"""
+    clave = (round(latitud, DECIMALES_LUGAR_SOL), round(longitud, DECIMALES_LUGAR_SOL))
+    return _INDICES_HORAS.obtener(clave, lambda: IndiceHorasPlanetarias(*clave))
+
+
+def precalcular_horas_planetarias(lugares: List[tuple], anios: List[int]):
+    """
+    Construye los bloques anuales que falten de varios lugares (latitud,
+    longitud) con una sola llamada a salidas_puestas_sol() por año.
+    """
+    redondeados = {(round(lat, DECIMALES_LUGAR_SOL), round(lon, DECIMALES_LUGAR_SOL)) for lat, lon in lugares}
+    indices = [indice_horas_planetarias(lat, lon) for lat, lon in sorted(redondeados)]
+    for anio in sorted(set(anios)):
+        faltantes = [indice for indice in indices if not indice.tiene_bloque(anio)]
+        if not faltantes:
+            continue
+        primero = datetime(anio, 1, 1)
+        n_dias = (datetime(anio + 1, 1, 1) - primero).days
+        amaneceres, ocasos = salidas_puestas_sol(
+            obtener_dia_juliano(anio, 1, 1, 0.0) + np.arange(n_dias + 1),
+            np.array([indice.latitud for indice in faltantes]),
+            np.array([indice.longitud for indice in faltantes])
+        )
+        for j, indice in enumerate(faltantes):
+            indice.guardar_bloque(anio, _linea_desde_salidas(
+                primero, indice.latitud, indice.longitud, amaneceres[:, j], ocasos[:, j]
+            ))
+
+
+def horas_planetarias_dia(fecha: datetime, latitud: float, longitud: float) -> LineaHorasPlanetarias:
+    """Las 24 horas del día astrológico de la fecha, desde el índice del lugar"""
+    return indice_horas_planetarias(latitud, longitud).dia(fecha)
+
+
+def hora_local_hhmm(dia_juliano: float, desfase: int) -> str:
+    """Hora local aproximada (UT + desfase horas) de un día juliano, redondeada al minuto"""
+    instante = dia_juliano_a_datetime(round(dia_juliano * 1440) / 1440)
+    return (instante + timedelta(hours=desfase)).strftime("%H:%M")
+
+
+def obtener_horas_planetarias(fecha: datetime, latitud: float, longitud: float) -> List[Dict[str, Any]]:
+    """
+    Calcula las horas planetarias del día.
+    
+    Robson (Cap. 5): "El día astrológico comienza en el momento exacto
+    del amanecer local. La primera hora está regida por el planeta
+    que rige el día."
+    
+    Las horas son desiguales: 12 diurnas de amanecer a ocaso y 12 nocturnas
+    de ocaso al amanecer siguiente (ver horas_planetarias_dia), en hora
+    local aproximada (HH:MM).
+    
+    Returns:
+        Lista de horas con su planeta regente
+    """
+    desfase = desfase_horario(longitud)
+    linea = horas_planetarias_dia(fecha, latitud, longitud)
+    return [
+        {
+            "hora_inicio": hora_local_hhmm(inicio, desfase),
+            "hora_fin": hora_local_hhmm(fin, desfase),
+            "planeta": ORDEN_HORAS_PLANETARIAS[regente],
+            "favorable": favorable,
+            "tipo": "diurna" if diurna else "nocturna"
+        }
+        for inicio, fin, regente, favorable, diurna in zip(
+            linea.inicios.tolist(), linea.fines.tolist(), linea.regentes.tolist(),
+            linea.favorables().tolist(), linea.diurnas().tolist()
+        )
+    ]
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EFEMÉRIDES INTERPOLADAS (POLINOMIOS DE CHEBYSHEV)
+# ═══════════════════════════════════════════════════════════════════════════════
+# Mismo esquema que las efemérides DE del JPL: el tiempo se divide en segmentos
+# de duración fija por cuerpo y en cada uno la longitud se aproxima con un
+# polinomio de Chebyshev ajustado a partir de swe.calc_ut(). La velocidad es la
+# derivada del mismo polinomio. Los segmentos se ajustan la primera vez que se
+# necesitan y quedan en un caché LRU acotado.
+#
+# COTA DE ERROR: cada segmento se compara contra Swiss Ephemeris en los
+# extremos y en los puntos medios entre nodos, donde el error de interpolación
+# es mayor. Es una verificación en esos puntos de control, no una cota rigurosa
+# en todo el segmento. Si el error supera la cota del cuerpo se reintenta con
+# un grado mayor, y si aún así no la cumple el segmento queda marcado como
+# "exacto" y se calcula siempre con Swiss Ephemeris.
+# El puntaje solo necesita precisión de minutos de arco, así que la cota
+# (segundos de arco) deja margen de sobra.
+
+# Modo por defecto de obtener_posicion_planeta(): "auto", "exacto" o "interpolado"
+# ("auto" usa la tabla precalculada cuando existe y cubre la fecha)
+MODOS_EFEMERIDES = ["auto", "exacto", "interpolado"]
+MODO_EFEMERIDES = os.environ.get("AE_MODO_EFEMERIDES", "auto")
+
+# Origen de la numeración de segmentos (J2000.0)
+EPOCA_CHEBYSHEV = 2451545.0
+
+# Cuerpo -> (días por segmento, grado del polinomio)
+CONFIG_CHEBYSHEV = {
+    swe.SUN: (16.0, 10),
+    swe.MOON: (4.0, 12),          # La Luna avanza ~13°/día: segmentos cortos
+    swe.MERCURY: (8.0, 12),       # Estaciones frecuentes
+    swe.VENUS: (16.0, 12),
+    swe.MARS: (16.0, 12),
+    swe.JUPITER: (32.0, 10),
+    swe.SATURN: (32.0, 10),
+    swe.URANUS: (32.0, 10),
+    swe.NEPTUNE: (32.0, 10)
+}
+
+# Error máximo en longitud en los puntos de control, en segundos de arco
+ERROR_MAXIMO_CHEBYSHEV = {
+    swe.SUN: 0.5,
+    swe.MOON: 1.0,
+    swe.MERCURY: 1.0,
+    swe.VENUS: 0.5,
+    swe.MARS: 0.5,
+    swe.JUPITER: 0.5,
+    swe.SATURN: 0.5,
+    swe.URANUS: 0.5,
+    swe.NEPTUNE: 0.5
+}
+
+# Grados extra del segundo intento cuando un segmento no cumple la cota
+GRADO_EXTRA_CHEBYSHEV = 6
+
+# Segmentos ajustados que se guardan (todos los cuerpos; la Luna usa ~9000 por siglo)
+MAXIMO_SEGMENTOS_CHEBYSHEV = int(os.environ.get("AE_SEGMENTOS_CHEBYSHEV_MAX", "20000"))
+
+
+def validar_modo_efemerides(modo: Optional[str]) -> str:
+    """Devuelve el modo a usar (MODO_EFEMERIDES si no se indica) o lanza ValueError"""
+    modo = modo or MODO_EFEMERIDES
+    if modo not in MODOS_EFEMERIDES:
+        raise ValueError(f"Modo de efemérides desconocido: {modo}. Opciones: {MODOS_EFEMERIDES}")
+    return modo
+
+
+# AE_MODO_EFEMERIDES se valida una sola vez al importar: un valor inválido
+# detiene el arranque en lugar de fallar en cada cálculo
+MODO_EFEMERIDES = validar_modo_efemerides(MODO_EFEMERIDES)
+
+
+class EfemerideChebyshev:
+    """
+    Caché de segmentos de Chebyshev por cuerpo.
+    
+    Cada segmento k de un cuerpo cubre [EPOCA_CHEBYSHEV + k·duración,
+    EPOCA_CHEBYSHEV + (k+1)·duración) y guarda los coeficientes de la
+    longitud (desenrollada, sin saltos en 360°) y de su derivada.
+    """
+    
+    def __init__(self, configuracion: Optional[Dict[int, tuple]] = None,
+                 errores_maximos: Optional[Dict[int, float]] = None):
+        self.configuracion = configuracion or CONFIG_CHEBYSHEV
+        self.errores_maximos = errores_maximos or ERROR_MAXIMO_CHEBYSHEV
+        # (planeta, k) -> (coeficientes_longitud, coeficientes_velocidad), o None si es exacto
+        self._segmentos = CacheLRU(MAXIMO_SEGMENTOS_CHEBYSHEV, un_calculo_a_la_vez=True)
+    
+    def _parametros(self, planeta: int) -> tuple:
+        """Duración del segmento y grado; cuerpos sin configuración usan segmentos de 8 días"""
+        return self.configuracion.get(planeta, (8.0, 12))
+    
+    def _longitudes_exactas(self, planeta: int, inicio: float, duracion: float,
+                            puntos: np.ndarray) -> np.ndarray:
+        """Longitudes de Swiss Ephemeris en puntos x ∈ [-1, 1] del segmento"""
+        return np.array([
+            swe.calc_ut(inicio + (x + 1) * duracion / 2, planeta)[0][0]
+            for x in puntos.tolist()
+        ])
+    
+    def _ajustar_segmento(self, planeta: int, k: int) -> Optional[tuple]:
+        """Ajusta y verifica el segmento k. Devuelve None si no cumple la cota de error."""
+        duracion, grado = self._parametros(planeta)
+        inicio = EPOCA_CHEBYSHEV + k * duracion
+        cota = self.errores_maximos.get(planeta, 1.0) / 3600
+        
+        for grado_intento in (grado, grado + GRADO_EXTRA_CHEBYSHEV):
+            n = grado_intento + 1
+            # Nodos de Chebyshev en orden ascendente (interpolación casi óptima)
+            nodos = -np.cos(np.pi * (np.arange(n) + 0.5) / n)
+            longitudes = np.unwrap(
+                self._longitudes_exactas(planeta, inicio, duracion, nodos), period=360
+            )
+            coeficientes = chebyshev.chebfit(nodos, longitudes, grado_intento)
+            
+            # Verificación en los extremos y entre cada par de nodos
+            control = np.concatenate(([-1.0], (nodos[:-1] + nodos[1:]) / 2, [1.0]))
+            error = np.abs(diferencia_angular(
+                chebyshev.chebval(control, coeficientes),
+                self._longitudes_exactas(planeta, inicio, duracion, control)
+            ))
+            if error.max() <= cota:
+                # d(longitud)/d(jd) = d(longitud)/dx · dx/d(jd), con dx/d(jd) = 2/duración
+                return coeficientes, chebyshev.chebder(coeficientes) * (2.0 / duracion)
+        
+        return None
+    
+    def _segmento(self, planeta: int, k: int) -> Optional[tuple]:
+        return self._segmentos.obtener((planeta, k), lambda: self._ajustar_segmento(planeta, k))
+    
+    def posicion(self, dia_juliano: float, planeta: int) -> tuple:
+        """
+        Longitud (0-360°) y velocidad (°/día) de un cuerpo en un instante.
+        
+        Returns:
+            Tupla (longitud, velocidad)
+        """
+        duracion, _ = self._parametros(planeta)
+        k = int(math.floor((dia_juliano - EPOCA_CHEBYSHEV) / duracion))
+        segmento = self._segmento(planeta, k)
+        
+        if segmento is None:
+            posicion, _ = swe.calc_ut(dia_juliano, planeta)
+            return posicion[0], posicion[3]
+        
+        coeficientes, derivada = segmento
+        x = 2 * (dia_juliano - EPOCA_CHEBYSHEV - k * duracion) / duracion - 1
+        longitud = float(chebyshev.chebval(x, coeficientes)) % 360.0
+        if longitud >= 360.0:
+            longitud = 0.0
+        return longitud, float(chebyshev.chebval(x, derivada))
+    
+    def posiciones(self, planeta: int, dias_julianos: np.ndarray) -> tuple:
+        """
+        Versión vectorizada de posicion(): evalúa todos los instantes de cada
+        segmento con una sola llamada a chebval.
+        
+        Returns:
+            Tupla (longitudes, velocidades) de arreglos del mismo largo que dias_julianos
+        """
+        duracion, _ = self._parametros(planeta)
+        dias_julianos = np.asarray(dias_julianos, dtype=np.float64)
+        indices = np.floor((dias_julianos - EPOCA_CHEBYSHEV) / duracion).astype(np.int64)
+        longitudes = np.empty_like(dias_julianos)
+        velocidades = np.empty_like(dias_julianos)
+        
+        # Agrupar los instantes por segmento
+        orden = np.argsort(indices, kind="stable")
+        cortes = np.flatnonzero(np.diff(indices[orden])) + 1
+        
+        for grupo in np.split(orden, cortes):
+            if len(grupo) == 0:
+                continue
+            k = int(indices[grupo[0]])
+            segmento = self._segmento(planeta, k)
+            
+            if segmento is None:
+                for i in grupo.tolist():
+                    posicion, _ = swe.calc_ut(float(dias_julianos[i]), planeta)
+                    longitudes[i] = posicion[0]
+                    velocidades[i] = posicion[3]
+                continue
+            
+            coeficientes, derivada = segmento
+            x = 2 * (dias_julianos[grupo] - EPOCA_CHEBYSHEV - k * duracion) / duracion - 1
+            longitudes[grupo] = np.mod(chebyshev.chebval(x, coeficientes), 360.0)
+            velocidades[grupo] = chebyshev.chebval(x, derivada)
+        
+        longitudes[longitudes >= 360.0] = 0.0
+        return longitudes, velocidades
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        """Segmentos ajustados en memoria, cuántos quedaron en modo exacto y uso del caché"""
+        segmentos = self._segmentos.valores()
+        return {
+            "segmentos": len(segmentos),
+            "segmentos_exactos": sum(1 for segmento in segmentos if segmento is None),
+            "cache": self._segmentos.estadisticas()
+        }
+
+
+# Caché de segmentos compartida por todo el proceso
+EFEMERIDE_CHEBYSHEV = EfemerideChebyshev()
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TABLA PRECALCULADA DE EFEMÉRIDES (ARCHIVO MAPEADO EN MEMORIA)
+# ═══════════════════════════════════════════════════════════════════════════════
+# Archivo binario con longitud y velocidad de todos los cuerpos de PLANETAS a
+# paso fijo (por defecto cada hora, 1900-2100). Se genera una vez con:
+#
+#     python main.py construir-tabla --desde 1900 --hasta 2100 --paso-horas 1
+#
+# Cada worker lo abre con mmap en solo lectura, así que el caché de páginas del
+# sistema operativo lo comparte entre procesos. Entre dos muestras se interpola
+# con un polinomio cúbico de Hermite (usa longitud y velocidad de ambos
+# extremos); fuera del rango cubierto se usa Swiss Ephemeris.
+#
+# FORMATO (little-endian):
+#     cabecera   "<8sIIddQ": magia, versión, n_cuerpos, jd_inicio, paso (días), n_pasos
+#     cuerpos    n_cuerpos × int32 (códigos Swiss Ephemeris, orden de las columnas)
+#     relleno    hasta múltiplo de 64 bytes
+#     datos      n_pasos × n_cuerpos × 2 float32 (longitud, velocidad)
+
+FORMATO_CABECERA_TABLA = "<8sIIddQ"
+MAGIA_TABLA = b"AEEFEM01"
+VERSION_TABLA = 1
+ALINEACION_TABLA = 64
+PASOS_POR_BLOQUE_TABLA = 24 * 366      # Pasos calculados y escritos de una vez al construir
+
+RUTA_TABLA_EFEMERIDES = os.environ.get(
+    "AE_TABLA_EFEMERIDES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "efemerides.bin")
+)
+
+
+def _desplazamiento_datos_tabla(n_cuerpos: int) -> int:
+    """Byte donde empiezan los datos (después de cabecera, cuerpos y relleno)"""
+    tamanio = struct.calcsize(FORMATO_CABECERA_TABLA) + 4 * n_cuerpos
+    return -(-tamanio // ALINEACION_TABLA) * ALINEACION_TABLA
+
+
+def interpolar_hermite(longitud0, velocidad0, longitud1, velocidad1, s, paso):
+    """
+    Interpolación cúbica de Hermite entre dos muestras separadas por `paso` días.
+    
+    Args:
+        longitud0/velocidad0: Muestra inicial (grados, grados/día)
+        longitud1/velocidad1: Muestra final
+        s: Fracción del paso transcurrida (0-1)
+        paso: Separación entre muestras en días
+    
+    Returns:
+        Tupla (longitud 0-360°, velocidad °/día). Acepta números o arreglos.
+    """
+    # Desenrollar la longitud final para no interpolar a través del salto 360° -> 0°
+    longitud1 = longitud0 + diferencia_angular(longitud1, longitud0)
+    s2 = s * s
+    s3 = s2 * s
+    
+    longitud = ((2 * s3 - 3 * s2 + 1) * longitud0 + (s3 - 2 * s2 + s) * paso * velocidad0
+                + (-2 * s3 + 3 * s2) * longitud1 + (s3 - s2) * paso * velocidad1)
+    velocidad = ((6 * s2 - 6 * s) * longitud0 + (3 * s2 - 4 * s + 1) * paso * velocidad0
+                 + (-6 * s2 + 6 * s) * longitud1 + (3 * s2 - 2 * s) * paso * velocidad1) / paso
+    
+    # Un valor desenrollado apenas negativo da exactamente 360.0 (-1e-14 % 360.0):
+    # mismo ajuste que EfemerideChebyshev para no producir el signo 12
+    longitud = longitud % 360.0
+    if np.ndim(longitud):
+        longitud[longitud >= 360.0] = 0.0
+    elif longitud >= 360.0:
+        longitud = 0.0
+    return longitud, velocidad
+
+
+class TablaEfemerides:
+    """
+    Tabla de efemérides en un archivo mapeado en memoria (solo lectura).
+    
+    Atributos:
+        datos: arreglo (n_pasos, n_cuerpos, 2) float32 respaldado por el mmap
+        jd_inicio / jd_fin: rango cubierto (días julianos)
+        paso: separación entre muestras en días
+    """
+    
+    def __init__(self, ruta: str):
+        with open(ruta, "rb") as archivo:
+            self._mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magia, version, n_cuerpos, jd_inicio, paso, n_pasos = struct.unpack_from(
+            FORMATO_CABECERA_TABLA, self._mapa, 0
+        )
+        if magia != MAGIA_TABLA or version != VERSION_TABLA:
+            raise ValueError(f"{ruta} no es una tabla de efemérides válida (versión {VERSION_TABLA})")
+        if n_pasos < 2:
+            raise ValueError(f"{ruta} tiene menos de dos muestras")
+        
+        cuerpos = struct.unpack_from(f"<{n_cuerpos}i", self._mapa, struct.calcsize(FORMATO_CABECERA_TABLA))
+        self.datos = np.frombuffer(
+            self._mapa, dtype="<f4", count=n_pasos * n_cuerpos * 2,
+            offset=_desplazamiento_datos_tabla(n_cuerpos)
+        ).reshape(n_pasos, n_cuerpos, 2)
+        
+        self.ruta = ruta
+        self.jd_inicio = jd_inicio
+        self.paso = paso
+        self.n_pasos = n_pasos
+        self.jd_fin = jd_inicio + (n_pasos - 1) * paso
+        self._columnas = {cuerpo: j for j, cuerpo in enumerate(cuerpos)}
+    
+    def tiene(self, planeta: int) -> bool:
+        return planeta in self._columnas
+    
+    def cubre(self, dia_juliano: float, planeta: int) -> bool:
+        return planeta in self._columnas and self.jd_inicio <= dia_juliano <= self.jd_fin
+    
+    def posicion(self, dia_juliano: float, planeta: int) -> tuple:
+        """Longitud y velocidad interpoladas en un instante cubierto por la tabla"""
+        u = (dia_juliano - self.jd_inicio) / self.paso
+        i = min(int(u), self.n_pasos - 2)
+        muestra0 = self.datos[i, self._columnas[planeta]]
+        muestra1 = self.datos[i + 1, self._columnas[planeta]]
+        return interpolar_hermite(
+            float(muestra0[0]), float(muestra0[1]),
+            float(muestra1[0]), float(muestra1[1]),
+            u - i, self.paso
+        )
+    
+    def cubiertos(self, dias_julianos: np.ndarray) -> np.ndarray:
+        """Máscara de los instantes que están dentro de la tabla"""
+        return (dias_julianos >= self.jd_inicio) & (dias_julianos <= self.jd_fin)
+    
+    def posiciones(self, planeta: int, dias_julianos: np.ndarray) -> tuple:
+        """Versión vectorizada de posicion() (todos los instantes deben estar cubiertos)"""
+        u = (np.asarray(dias_julianos, dtype=np.float64) - self.jd_inicio) / self.paso
+        i = np.clip(np.floor(u).astype(np.int64), 0, self.n_pasos - 2)
+        muestras0 = self.datos[i, self._columnas[planeta]].astype(np.float64)
+        muestras1 = self.datos[i + 1, self._columnas[planeta]].astype(np.float64)
+        return interpolar_hermite(
+            muestras0[:, 0], muestras0[:, 1],
+            muestras1[:, 0], muestras1[:, 1],
+            u - i, self.paso
+        )
+    
+    def descripcion(self) -> Dict[str, Any]:
+        return {
+            "ruta": self.ruta,
+            "jd_inicio": self.jd_inicio,
+            "jd_fin": self.jd_fin,
+            "paso_horas": self.paso * 24,
+            "cuerpos": [PLANETAS.get(c, str(c)) for c in self._columnas]
+        }
+
+
+_TABLA_EFEMERIDES: Optional[TablaEfemerides] = None
+_TABLA_EFEMERIDES_INTENTADA = False
+
+
+def obtener_tabla_efemerides() -> Optional[TablaEfemerides]:
+    """
+    Abre la tabla de RUTA_TABLA_EFEMERIDES la primera vez que se necesita.
+    Devuelve None si el archivo no existe o no es válido (se usa Swiss Ephemeris).
+    """
+    global _TABLA_EFEMERIDES, _TABLA_EFEMERIDES_INTENTADA
+    if not _TABLA_EFEMERIDES_INTENTADA:
+        _TABLA_EFEMERIDES_INTENTADA = True
+        if os.path.exists(RUTA_TABLA_EFEMERIDES):
+            try:
+                _TABLA_EFEMERIDES = TablaEfemerides(RUTA_TABLA_EFEMERIDES)
+            except Exception as e:
+                print(f"Error abriendo tabla de efemérides {RUTA_TABLA_EFEMERIDES}: {e}")
+    return _TABLA_EFEMERIDES
+
+
+def construir_tabla_efemerides(ruta: str, anio_desde: int = 1900, anio_hasta: int = 2100,
+                               paso_horas: float = 1.0, planetas: Optional[List[int]] = None) -> int:
+    """
+    Genera el archivo binario de la tabla de efemérides.
+    
+    Se escribe primero en un archivo temporal y luego se renombra, para que un
+    worker nunca mapee una tabla a medio escribir.
+    
+    Args:
+        ruta: Archivo de salida
+        anio_desde: Primer año cubierto (desde el 1 de enero, 0h UT)
+        anio_hasta: Último año cubierto (hasta el 31 de diciembre, 24h UT)
+        paso_horas: Separación entre muestras en horas
+        planetas: Cuerpos a incluir (default: todos los de PLANETAS)
+    
+    Returns:
+        Cantidad de pasos escritos
+    """
+    if planetas is None:
+        planetas = list(PLANETAS)
+    
+    paso = paso_horas / 24
+    jd_inicio = obtener_dia_juliano(anio_desde, 1, 1, 0.0)
+    jd_fin = obtener_dia_juliano(anio_hasta + 1, 1, 1, 0.0)
+    n_pasos = int(math.floor((jd_fin - jd_inicio) / paso + 1e-9)) + 1
+    
+    ruta_temporal = ruta + ".tmp"
+    with open(ruta_temporal, "wb") as archivo:
+        archivo.write(struct.pack(
+            FORMATO_CABECERA_TABLA, MAGIA_TABLA, VERSION_TABLA,
+            len(planetas), jd_inicio, paso, n_pasos
+        ))
+        archivo.write(struct.pack(f"<{len(planetas)}i", *planetas))
+        archivo.write(b"\0" * (_desplazamiento_datos_tabla(len(planetas)) - archivo.tell()))
+        
+        for inicio in range(0, n_pasos, PASOS_POR_BLOQUE_TABLA):
+            dias_julianos = jd_inicio + paso * np.arange(
+                inicio, min(inicio + PASOS_POR_BLOQUE_TABLA, n_pasos), dtype=np.float64
+            )
+            efemerides = calcular_efemerides_instantes(dias_julianos, planetas, modo="exacto", usar_cache=False)
+            bloque = np.stack([efemerides.longitudes, efemerides.velocidades], axis=-1)
+            archivo.write(bloque.astype("<f4").tobytes())
+    
+    os.replace(ruta_temporal, ruta)
+    return n_pasos
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EFEMÉRIDES POR RANGO (VECTORIZADAS CON NUMPY)
+# ═══════════════════════════════════════════════════════════════════════════════
+# En lugar de recorrer el rango día por día armando diccionarios, se calculan
+# todas las posiciones de una vez en arreglos contiguos de forma
+# (n_instantes, n_cuerpos). Las reglas (fase, Via Combusta, retrogradación,
+# aspectos) se evalúan luego como operaciones sobre arreglos completos.
+
+class EfemeridesRango:
+    """
+    Posiciones de varios cuerpos en una serie de instantes.
+    
+    Atributos:
+        dias_julianos: arreglo (n_instantes,) con los días julianos
+        planetas: lista de códigos Swiss Ephemeris, en el orden de las columnas
+        longitudes: arreglo (n_instantes, n_cuerpos) en grados eclípticos (0-360)
+        velocidades: arreglo (n_instantes, n_cuerpos) en grados por día
+    """
+    
+    __slots__ = ("dias_julianos", "planetas", "longitudes", "velocidades", "_columnas")
+    
+    def __init__(self, dias_julianos: np.ndarray, planetas: List[int],
+                 longitudes: np.ndarray, velocidades: np.ndarray):
+        self.dias_julianos = dias_julianos
+        self.planetas = list(planetas)
+        self.longitudes = longitudes
+        self.velocidades = velocidades
+        self._columnas = {planeta: j for j, planeta in enumerate(self.planetas)}
+    
+    def __len__(self) -> int:
+        return len(self.dias_julianos)
+    
+    def longitud(self, planeta: int) -> np.ndarray:
+        """Longitudes de un cuerpo en todos los instantes (vista, sin copia)"""
+        return self.longitudes[:, self._columnas[planeta]]
+    
+    def velocidad(self, planeta: int) -> np.ndarray:
+        """Velocidades de un cuerpo en todos los instantes (vista, sin copia)"""
+        return self.velocidades[:, self._columnas[planeta]]
+
+
+def calcular_efemerides_instantes(dias_julianos: np.ndarray,
+                                  planetas: Optional[List[int]] = None,
+                                  modo: Optional[str] = None,
+                                  usar_cache: bool = True) -> EfemeridesRango:
+    """
+    Calcula longitud y velocidad de varios cuerpos en una lista de instantes.
+    
+    Args:
+        dias_julianos: Instantes en día juliano (cualquier orden)
+        planetas: Códigos Swiss Ephemeris (default: todos los de PLANETAS)
+        modo: "auto", "exacto" o "interpolado" (default: MODO_EFEMERIDES)
+        usar_cache: Pasar por CACHE_EFEMERIDES (desactivar en cálculos masivos
+                    que no se repiten, como construir la tabla)
+    
+    Returns:
+        EfemeridesRango con arreglos de forma (n_instantes, n_cuerpos)
+    """
+    if planetas is None:
+        planetas = list(PLANETAS)
+    modo = validar_modo_efemerides(modo)
+    
+    dias_julianos = np.ascontiguousarray(dias_julianos, dtype=np.float64)
+    longitudes = np.empty((len(dias_julianos), len(planetas)), dtype=np.float64)
+    velocidades = np.empty_like(longitudes)
+    
+    if modo == "interpolado":
+        for j, planeta in enumerate(planetas):
+            longitudes[:, j], velocidades[:, j] = EFEMERIDE_CHEBYSHEV.posiciones(planeta, dias_julianos)
+        return EfemeridesRango(dias_julianos, planetas, longitudes, velocidades)
+    
+    # Celdas (instante, cuerpo) que todavía hay que pedir a Swiss Ephemeris
+    pendientes = np.ones(longitudes.shape, dtype=bool)
+    
+    tabla = obtener_tabla_efemerides() if modo == "auto" else None
+    if tabla is not None:
+        cubiertos = tabla.cubiertos(dias_julianos)
+        if cubiertos.any():
+            for j, planeta in enumerate(planetas):
+                if tabla.tiene(planeta):
+                    longitudes[cubiertos, j], velocidades[cubiertos, j] = tabla.posiciones(
+                        planeta, dias_julianos[cubiertos]
+                    )
+                    pendientes[cubiertos, j] = False
+    
+    for i in np.flatnonzero(pendientes.any(axis=1)).tolist():
+        dia_juliano = float(dias_julianos[i])
+        for j in np.flatnonzero(pendientes[i]).tolist():
+            if usar_cache:
+                posicion = calcular_posicion_swe(dia_juliano, planetas[j])
+            else:
+                posicion, _ = swe.calc_ut(dia_juliano, planetas[j], FLAGS_EFEMERIDES)
+            longitudes[i, j] = posicion[0]
+            velocidades[i, j] = posicion[3]
+    
+    return EfemeridesRango(dias_julianos, planetas, longitudes, velocidades)
+
+
+def calcular_efemerides_rango(jd_inicio: float, jd_fin: float, paso: float = 1.0,
+                              planetas: Optional[List[int]] = None,
+                              modo: Optional[str] = None,
+                              usar_cache: bool = True) -> EfemeridesRango:
+    """
+    Calcula las efemérides de un rango de fechas a paso fijo.
+    
+    Args:
+        jd_inicio: Primer instante (día juliano)
+        jd_fin: Último instante incluido (día juliano)
+        paso: Separación entre instantes en días (1.0 = diario, 1/24 = horario)
+        planetas: Códigos Swiss Ephemeris (default: todos los de PLANETAS)
+        modo: "auto", "exacto" o "interpolado" (default: MODO_EFEMERIDES)
+        usar_cache: Pasar por CACHE_EFEMERIDES (ver calcular_efemerides_instantes)
+    
+    Returns:
+        EfemeridesRango con arreglos de forma (n_pasos, n_cuerpos)
+    """
+    if paso <= 0:
+        raise ValueError("El paso debe ser positivo")
+    
+    n_pasos = int(math.floor((jd_fin - jd_inicio) / paso + 1e-9)) + 1
+    dias_julianos = jd_inicio + paso * np.arange(max(n_pasos, 0), dtype=np.float64)
+    
+    return calcular_efemerides_instantes(dias_julianos, planetas, modo, usar_cache)
+
+
+def separacion_vector(efemerides: EfemeridesRango, planeta1: int, planeta2: int) -> np.ndarray:
+    """Distancia angular entre dos cuerpos (0-180°) en cada instante"""
+    diferencia = np.abs(efemerides.longitud(planeta1) - efemerides.longitud(planeta2))
+    return np.where(diferencia > 180, 360 - diferencia, diferencia)
+
+
+def fase_lunar_vector(efemerides: EfemeridesRango) -> Dict[str, np.ndarray]:
+    """
+    Versión vectorizada de obtener_fase_lunar().
+    
+    Returns:
+        Diccionario con arreglos: angulo, creciente (bool) e indice_fase
+        (posición en FASES_LUNARES)
+    """
+    angulo = np.mod(efemerides.longitud(swe.MOON) - efemerides.longitud(swe.SUN), 360)
+    return {
+        "angulo": angulo,
+        "creciente": angulo < 180,
+        "indice_fase": (angulo // 45).astype(np.int64) % 8
+    }
+
+
+def signo_vector(longitudes: np.ndarray) -> np.ndarray:
+    """Número de signo (0 = Aries ... 11 = Piscis) para cada longitud"""
+    return np.floor(longitudes / 30).astype(np.int64)
+
+
+def via_combusta_vector(longitudes: np.ndarray) -> np.ndarray:
+    """Versión vectorizada de esta_en_via_combusta()"""
+    return (longitudes >= VIA_COMBUSTA_INICIO) & (longitudes <= VIA_COMBUSTA_FIN)
+
+
+def retrogrado_vector(efemerides: EfemeridesRango, planeta: int) -> np.ndarray:
+    """Versión vectorizada de esta_retrogrado()"""
+    retrogrado = efemerides.velocidad(planeta) < 0
+    
+    if planeta in PLANETAS_ESTACIONES:
+        indice = indice_estaciones(planeta)
+        dias_julianos = efemerides.dias_julianos
+        cubiertos = (dias_julianos >= indice.jd_inicio) & (dias_julianos < indice.jd_fin)
+        retrogrado[cubiertos] = indice.retrogrados.contiene_vector(dias_julianos[cubiertos])
+    
+    return retrogrado
+
+
+def aspecto_vector(efemerides: EfemeridesRango, planeta1: int, planeta2: int) -> Dict[str, np.ndarray]:
+    """
+    Versión vectorizada de calcular_aspecto().
+    
+    Returns:
+        Diccionario con arreglos:
+        - angulo: ángulo del aspecto (0, 60, 90, 120, 180) o -1 si no hay aspecto
+        - orbe: distancia al aspecto exacto (NaN si no hay aspecto)
+    """
+    separacion = separacion_vector(efemerides, planeta1, planeta2)
+    angulo_aspecto = np.full(separacion.shape, -1, dtype=np.int64)
+    orbe_aspecto = np.full(separacion.shape, np.nan)
+    
+    # Se recorre en orden inverso para que, igual que en calcular_aspecto(),
+    # gane el primer aspecto de ASPECTOS cuyo orbe se cumpla
+    for angulo, (_, _, orbe) in reversed(list(ASPECTOS.items())):
+        distancia = np.abs(separacion - angulo)
+        dentro = distancia <= orbe
+        angulo_aspecto[dentro] = angulo
+        orbe_aspecto[dentro] = distancia[dentro]
+    
+    return {"angulo": angulo_aspecto, "orbe": orbe_aspecto}
+
+
+def luna_vacia_de_curso_vector(efemerides: EfemeridesRango) -> np.ndarray:
+    """Versión vectorizada de esta_luna_vacia_de_curso() (búsqueda binaria por instante)"""
+    dias_julianos = efemerides.dias_julianos
+    if len(dias_julianos) == 0:
+        return np.zeros(0, dtype=bool)
+    indice = periodos_vacio_de_curso(float(dias_julianos.min()), float(dias_julianos.max()))
+    return indice.contiene_vector(dias_julianos)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BÚSQUEDA DE EVENTOS E ÍNDICES DE INTERVALOS
+# ═══════════════════════════════════════════════════════════════════════════════
+# Los eventos (aspectos exactos, ingresos, estaciones...) se buscan muestreando
+# una función con signo a paso fijo y refinando cada cambio de signo con el
+# método de Illinois (regula falsi modificada) hasta TOLERANCIA_EVENTOS.
+# Los resultados se guardan como intervalos ordenados: preguntar "¿está
+# activo en t?" es una búsqueda binaria.
+
+TOLERANCIA_EVENTOS = 1.0 / 86400     # 1 segundo, en días
+
+# Años cubiertos por los índices precalculados (estaciones, lunaciones...)
+ANIO_INICIO_INDICES = 1900
+ANIO_FIN_INDICES = 2100
+
+
+class IndiceIntervalos:
+    """
+    Intervalos semiabiertos [inicio, fin) ordenados y sin solapamiento.
+    
+    Cada intervalo puede llevar un dato asociado (ej: el último aspecto
+    de la Luna antes de quedar vacía de curso).
+    """
+    
+    __slots__ = ("inicios", "fines", "datos")
+    
+    def __init__(self, intervalos: Optional[List[tuple]] = None):
+        """
+        Args:
+            intervalos: Tuplas (inicio, fin) o (inicio, fin, dato), en cualquier orden
+        """
+        ordenados = sorted(intervalos or [], key=lambda intervalo: intervalo[0])
+        self.inicios = [intervalo[0] for intervalo in ordenados]
+        self.fines = [intervalo[1] for intervalo in ordenados]
+        self.datos = [intervalo[2] if len(intervalo) > 2 else None for intervalo in ordenados]
+    
+    def __len__(self) -> int:
+        return len(self.inicios)
+    
+    def __iter__(self):
+        return iter(zip(self.inicios, self.fines, self.datos))
+    
+    def buscar(self, t: float) -> Optional[int]:
+        """Índice del intervalo que contiene t, o None"""
+        i = bisect_right(self.inicios, t) - 1
+        if i >= 0 and t < self.fines[i]:
+            return i
+        return None
+    
+    def contiene(self, t: float) -> bool:
+        return self.buscar(t) is not None
+    
+    def intervalo_en(self, t: float) -> Optional[tuple]:
+        """Tupla (inicio, fin, dato) del intervalo que contiene t, o None"""
+        i = self.buscar(t)
+        return None if i is None else (self.inicios[i], self.fines[i], self.datos[i])
+    
+    def contiene_vector(self, instantes: np.ndarray) -> np.ndarray:
+        """Versión vectorizada de contiene()"""
+        instantes = np.asarray(instantes, dtype=np.float64)
+        if not self.inicios:
+            return np.zeros(instantes.shape, dtype=bool)
+        i = np.searchsorted(np.asarray(self.inicios), instantes, side="right") - 1
+        fines = np.asarray(self.fines)
+        return (i >= 0) & (instantes < fines[np.maximum(i, 0)])
+    
+    def en_rango(self, jd_inicio: float, jd_fin: float) -> List[tuple]:
+        """Intervalos que se superponen con [jd_inicio, jd_fin)"""
+        primero = max(bisect_right(self.inicios, jd_inicio) - 1, 0)
+        ultimo = bisect_left(self.inicios, jd_fin)
+        return [
+            (self.inicios[i], self.fines[i], self.datos[i])
+            for i in range(primero, ultimo)
+            if self.fines[i] > jd_inicio
+        ]
+    
+    # ── Álgebra de conjuntos (mezclas lineales, los datos no se conservan) ──
+    
+    @classmethod
+    def _desde_ordenados(cls, inicios: List[float], fines: List[float]) -> "IndiceIntervalos":
+        """Construye el índice sin reordenar (los intervalos ya vienen ordenados y disjuntos)"""
+        indice = cls()
+        indice.inicios, indice.fines, indice.datos = inicios, fines, [None] * len(inicios)
+        return indice
+    
+    @classmethod
+    def desde_serie(cls, tiempos: np.ndarray, valores: np.ndarray, jd_fin: float) -> "IndiceIntervalos":
+        """
+        Intervalos donde una serie constante a tramos es verdadera.
+    
+        Args:
+            tiempos: Comienzo de cada tramo, ordenados (el último tramo termina en jd_fin)
+            valores: Valor de cada tramo
+        """
+        verdadero = np.concatenate([[False], np.asarray(valores, dtype=bool), [False]])
+        limites = np.append(np.asarray(tiempos, dtype=np.float64), jd_fin)
+        comienzos = np.flatnonzero(~verdadero[:-1] & verdadero[1:])
+        terminos = np.flatnonzero(verdadero[:-1] & ~verdadero[1:])
+        return cls._desde_ordenados(limites[comienzos].tolist(), limites[terminos].tolist())
+    
+    def union(self, otro: "IndiceIntervalos") -> "IndiceIntervalos":
+        """Intervalos cubiertos por self o por otro (los que se tocan se fusionan)"""
+        inicios, fines = [], []
+        i = j = 0
+        while i < len(self) or j < len(otro):
+            if j >= len(otro) or (i < len(self) and self.inicios[i] <= otro.inicios[j]):
+                inicio, fin = self.inicios[i], self.fines[i]
+                i += 1
+            else:
+                inicio, fin = otro.inicios[j], otro.fines[j]
+                j += 1
+            if fines and inicio <= fines[-1]:
+                fines[-1] = max(fines[-1], fin)
+            else:
+                inicios.append(inicio)
+                fines.append(fin)
+        return IndiceIntervalos._desde_ordenados(inicios, fines)
+    
+    def interseccion(self, otro: "IndiceIntervalos") -> "IndiceIntervalos":
+        """Intervalos cubiertos por self y por otro a la vez"""
+        inicios, fines = [], []
+        i = j = 0
+        while i < len(self) and j < len(otro):
+            inicio = max(self.inicios[i], otro.inicios[j])
+            fin = min(self.fines[i], otro.fines[j])
+            if inicio < fin:
+                inicios.append(inicio)
+                fines.append(fin)
+            # Avanza el que termina primero
+            if self.fines[i] < otro.fines[j]:
+                i += 1
+            else:
+                j += 1
+        return IndiceIntervalos._desde_ordenados(inicios, fines)
+    
+    def complemento(self, jd_inicio: float, jd_fin: float) -> "IndiceIntervalos":
+        """Huecos de [jd_inicio, jd_fin) no cubiertos por ningún intervalo"""
+        inicios, fines = [], []
+        cursor = jd_inicio
+        for inicio, fin, _ in self.en_rango(jd_inicio, jd_fin):
+            if inicio > cursor:
+                inicios.append(cursor)
+                fines.append(inicio)
+            cursor = max(cursor, fin)
+        if cursor < jd_fin:
+            inicios.append(cursor)
+            fines.append(jd_fin)
+        return IndiceIntervalos._desde_ordenados(inicios, fines)
+    
+    def duracion(self) -> float:
+        """Suma de las duraciones de los intervalos, en días"""
+        return float(np.sum(np.asarray(self.fines) - np.asarray(self.inicios))) if self.inicios else 0.0
+
+
+def refinar_cruce(funcion: Callable[[float], float], a: float, b: float,
+                  fa: float, fb: float, tolerancia: float = TOLERANCIA_EVENTOS) -> float:
+    """
+    Encuentra el cero de una función continua en [a, b], sabiendo que
+    fa = funcion(a) y fb = funcion(b) tienen signos opuestos.
+    
+    Usa el método de Illinois: converge casi tan rápido como la secante
+    pero sin salirse nunca del intervalo.
+    """
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    
+    lado = 0
+    c = (a + b) / 2
+    for _ in range(100):
+        if b - a <= tolerancia:
+            break
+        c = b - fb * (b - a) / (fb - fa)
+        fc = funcion(c)
+        if fc == 0:
+            return c
+        if (fc < 0) == (fb < 0):
+            b, fb = c, fc
+            if lado == -1:
+                fa /= 2
+            lado = -1
+        else:
+            a, fa = c, fc
+            if lado == 1:
+                fb /= 2
+            lado = 1
+        if abs(fc) < 1e-9:
+            return c
+    return c
+
+
+def indices_cruce(valores: np.ndarray) -> np.ndarray:
+    """
+    Posiciones i donde una serie angular con signo cruza por cero entre
+    valores[i] y valores[i + 1]. Se descartan los saltos de ±180° (el ángulo
+    dando la vuelta), que no son cruces reales.
+    """
+    negativo = valores < 0
+    return np.flatnonzero((negativo[:-1] != negativo[1:]) & (np.abs(np.diff(valores)) < 180))
+
+
+def _longitud_exacta(dia_juliano: float, planeta: int) -> float:
+    """Longitud para las búsquedas de eventos (sin pasar por el caché LRU)"""
+    return calcular_longitud_velocidad(dia_juliano, planeta, usar_cache=False)[0]
+
+
+def buscar_perfecciones(planeta1: int, planeta2: int, efemerides: EfemeridesRango,
+                        angulos: Optional[List[int]] = None) -> List[tuple]:
+    """
+    Instantes exactos en que la separación planeta1 - planeta2 es un ángulo de aspecto.
+    
+    Se buscan ambos lados del zodíaco (ej: 90° y 270° para la cuadratura),
+    así cada aspecto se encuentra tanto en fase creciente como menguante.
+    
+    Args:
+        planeta1, planeta2: Códigos Swiss Ephemeris (deben estar en efemerides)
+        efemerides: Muestreo del rango; el paso debe ser menor que el tiempo
+                    entre dos perfecciones del mismo aspecto
+        angulos: Ángulos de aspecto (default: los de ASPECTOS)
+    
+    Returns:
+        Lista de tuplas (dia_juliano, angulo_aspecto) ordenada por tiempo
+    """
+    if angulos is None:
+        angulos = list(ASPECTOS)
+    
+    separacion = efemerides.longitud(planeta1) - efemerides.longitud(planeta2)
+    dias_julianos = efemerides.dias_julianos
+    perfecciones = []
+    
+    for angulo in angulos:
+        for objetivo in sorted({angulo % 360, (360 - angulo) % 360}):
+            valores = diferencia_angular(separacion, objetivo)
+            
+            def funcion(t, objetivo=objetivo):
+                return diferencia_angular(
+                    _longitud_exacta(t, planeta1) - _longitud_exacta(t, planeta2), objetivo
+                )
+            
+            for i in indices_cruce(valores).tolist():
+                perfecciones.append((
+                    refinar_cruce(funcion, float(dias_julianos[i]), float(dias_julianos[i + 1]),
+                                  float(valores[i]), float(valores[i + 1])),
+                    angulo
+                ))
+    
+    perfecciones.sort()
+    return perfecciones
+
+
+def buscar_ingresos(planeta: int, efemerides: EfemeridesRango) -> List[tuple]:
+    """
+    Instantes exactos en que un cuerpo cambia de signo.
+    
+    Returns:
+        Lista de tuplas (dia_juliano, numero_signo_nuevo) ordenada por tiempo
+    """
+    longitudes = efemerides.longitud(planeta)
+    dias_julianos = efemerides.dias_julianos
+    signos = signo_vector(longitudes)
+    ingresos = []
+    
+    for i in np.flatnonzero(np.diff(signos) != 0).tolist():
+        # El límite cruzado es el inicio del signo nuevo (directo) o del anterior (retrógrado)
+        avanza = diferencia_angular(longitudes[i + 1], longitudes[i]) > 0
+        limite = 30.0 * (signos[i + 1] if avanza else signos[i])
+        
+        def funcion(t, limite=limite):
+            return diferencia_angular(_longitud_exacta(t, planeta), limite)
+        
+        ingresos.append((
+            refinar_cruce(funcion, float(dias_julianos[i]), float(dias_julianos[i + 1]),
+                          float(diferencia_angular(longitudes[i], limite)),
+                          float(diferencia_angular(longitudes[i + 1], limite))),
+            int(signos[i + 1])
+        ))
+    
+    return ingresos
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LUNA VACÍA DE CURSO (INTERVALOS EXACTOS)
+# ═══════════════════════════════════════════════════════════════════════════════
+# Para cada paso de la Luna por un signo se busca el instante exacto de su
+# último aspecto mayor (conjunción, sextil, cuadratura, trígono u oposición)
+# con los planetas tradicionales. Desde ese instante hasta el ingreso al signo
+# siguiente la Luna está vacía de curso. Si no hace ningún aspecto en el signo,
+# está vacía de curso durante todo su paso.
+
+PLANETAS_VACIO_CURSO = [swe.SUN, swe.MERCURY, swe.VENUS, swe.MARS, swe.JUPITER, swe.SATURN]
+
+# Paso del muestreo (días): la Luna avanza ~3.5° en 6 horas
+PASO_BUSQUEDA_LUNA = 0.25
+
+# Margen alrededor del rango para incluir el signo en curso en los extremos
+# (la Luna tarda como máximo ~2.7 días en recorrer un signo)
+MARGEN_BUSQUEDA_LUNA = 3.0
+
+# Meses con índice de vacío de curso guardado; (año, mes) viene del cliente
+MAXIMO_MESES_VACIO_CURSO = int(os.environ.get("AE_MESES_VACIO_CURSO_MAX", "240"))
+
+_VACIO_CURSO_POR_MES = CacheLRU(MAXIMO_MESES_VACIO_CURSO, un_calculo_a_la_vez=True)
+
+
+def calcular_periodos_vacio_de_curso(jd_inicio: float, jd_fin: float) -> IndiceIntervalos:
+    """
+    Calcula en una sola pasada los períodos de Luna vacía de curso de un rango.
+    
+    Returns:
+        IndiceIntervalos con los períodos que se superponen con [jd_inicio, jd_fin).
+        El dato de cada período es un diccionario con el último aspecto
+        ("planeta", "aspecto"), o None si la Luna no hizo aspectos en el signo.
+    """
+    efemerides = calcular_efemerides_rango(
+        jd_inicio - MARGEN_BUSQUEDA_LUNA, jd_fin + MARGEN_BUSQUEDA_LUNA,
+        PASO_BUSQUEDA_LUNA, [swe.MOON] + PLANETAS_VACIO_CURSO, usar_cache=False
+    )
+    
+    ingresos = [t for t, _ in buscar_ingresos(swe.MOON, efemerides)]
+    
+    perfecciones = []
+    for planeta in PLANETAS_VACIO_CURSO:
+        for t, angulo in buscar_perfecciones(swe.MOON, planeta, efemerides):
+            perfecciones.append((t, planeta, angulo))
+    perfecciones.sort()
+    tiempos_perfeccion = [t for t, _, _ in perfecciones]
+    
+    periodos = []
+    for inicio_signo, fin_signo in zip(ingresos[:-1], ingresos[1:]):
+        if fin_signo <= jd_inicio or inicio_signo >= jd_fin:
+            continue
+        
+        # Último aspecto exacto antes de salir del signo
+        k = bisect_left(tiempos_perfeccion, fin_signo) - 1
+        if k >= 0 and tiempos_perfeccion[k] >= inicio_signo:
+            _, planeta, angulo = perfecciones[k]
+            periodos.append((tiempos_perfeccion[k], fin_signo, {
+                "planeta": PLANETAS[planeta],
+                "aspecto": ASPECTOS[angulo][0]
+            }))
+        else:
+            periodos.append((inicio_signo, fin_signo, None))
+    
+    return IndiceIntervalos(periodos)
+
+
+def indice_vacio_de_curso_mes(anio: int, mes: int) -> IndiceIntervalos:
+    """Períodos de Luna vacía de curso de un mes calendario (UT), en caché"""
+    siguiente = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return _VACIO_CURSO_POR_MES.obtener((anio, mes), lambda: calcular_periodos_vacio_de_curso(
+        obtener_dia_juliano(anio, mes, 1, 0.0),
+        obtener_dia_juliano(siguiente[0], siguiente[1], 1, 0.0)
+    ))
+
+
+def formatear_periodo_vacio(periodo: tuple) -> Dict[str, Any]:
+    """Convierte un período (inicio, fin, dato) a texto para la API (horarios UT)"""
+    inicio, fin, dato = periodo
+    return {
+        "inicio": dia_juliano_a_datetime(inicio).isoformat(),
+        "fin": dia_juliano_a_datetime(fin).isoformat(),
+        "ultimo_aspecto": f"{dato['aspecto']} {dato['planeta']}" if dato else None
+    }
+
+
+def meses_en_rango(jd_inicio: float, jd_fin: float) -> List[tuple]:
+    """Meses calendario (anio, mes) que toca el rango [jd_inicio, jd_fin]"""
+    anio, mes, _, _ = swe.revjul(jd_inicio)
+    anio_fin, mes_fin, _, _ = swe.revjul(jd_fin)
+    meses = []
+    while (anio, mes) <= (anio_fin, mes_fin):
+        meses.append((anio, mes))
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return meses
+
+
+def periodos_vacio_de_curso(jd_inicio: float, jd_fin: float) -> IndiceIntervalos:
+    """Une los índices mensuales que cubren [jd_inicio, jd_fin]"""
+    periodos = {}
+    for anio, mes in meses_en_rango(jd_inicio, jd_fin):
+        for inicio, fin, dato in indice_vacio_de_curso_mes(anio, mes):
+            # Un período que cruza el cambio de mes aparece en ambos meses
+            periodos[round(inicio * 86400)] = (inicio, fin, dato)
+    return IndiceIntervalos(list(periodos.values()))
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ESTACIONES Y PERÍODOS RETRÓGRADOS
+# ═══════════════════════════════════════════════════════════════════════════════
+# Índice de los instantes de estación retrógrada (la velocidad pasa de + a -)
+# y estación directa (de - a +) de Mercurio a Saturno entre 1900 y 2100,
+# encontrados refinando el cambio de signo de la velocidad.
+#
+# PERÍODO DE SOMBRA: la pre-sombra empieza cuando el planeta, todavía directo,
+# llega a la longitud donde hará su estación directa; la post-sombra termina
+# cuando vuelve a la longitud de su estación retrógrada. Es el tramo del
+# zodíaco que el planeta recorre tres veces.
+
+PLANETAS_ESTACIONES = [swe.MERCURY, swe.VENUS, swe.MARS, swe.JUPITER, swe.SATURN]
+
+# Paso del muestreo de velocidad (días), menor que el período retrógrado más corto
+PASO_BUSQUEDA_ESTACIONES = {
+    swe.MERCURY: 1.0,     # Retrógrado ~3 semanas
+    swe.VENUS: 2.0,       # ~6 semanas
+    swe.MARS: 2.0,        # ~2.5 meses
+    swe.JUPITER: 4.0,     # ~4 meses
+    swe.SATURN: 4.0       # ~4.5 meses
+}
+
+# Margen (días) muestreado fuera de 1900-2100 para completar las sombras de los extremos
+MARGEN_BUSQUEDA_ESTACIONES = 250.0
+
+_INDICES_ESTACIONES: Dict[int, "IndiceEstaciones"] = {}
+_INDICES_ESTACIONES_CANDADO = threading.Lock()
+
+
+class IndiceEstaciones:
+    """
+    Estaciones y períodos retrógrados/de sombra de un planeta.
+    
+    Atributos:
+        estaciones: lista de (dia_juliano, "retrograda" | "directa", longitud)
+        retrogrados: IndiceIntervalos [estación retrógrada, estación directa)
+        sombras: IndiceIntervalos [inicio pre-sombra, fin post-sombra); el dato
+                 guarda los límites de cada fase
+        jd_inicio / jd_fin: rango cubierto
+    """
+    
+    def __init__(self, planeta: int, jd_inicio: float, jd_fin: float):
+        self.planeta = planeta
+        self.jd_inicio = jd_inicio
+        self.jd_fin = jd_fin
+        
+        efemerides = calcular_efemerides_rango(
+            jd_inicio - MARGEN_BUSQUEDA_ESTACIONES, jd_fin + MARGEN_BUSQUEDA_ESTACIONES,
+            PASO_BUSQUEDA_ESTACIONES.get(planeta, 1.0), [planeta], usar_cache=False
+        )
+        dias_julianos = efemerides.dias_julianos
+        longitudes = efemerides.longitud(planeta)
+        velocidades = efemerides.velocidad(planeta)
+        
+        def velocidad(t):
+            return calcular_longitud_velocidad(t, planeta, usar_cache=False)[1]
+        
+        # Estaciones: cambios de signo de la velocidad
+        self.estaciones = []
+        negativo = velocidades < 0
+        for i in np.flatnonzero(negativo[:-1] != negativo[1:]).tolist():
+            t = refinar_cruce(velocidad, float(dias_julianos[i]), float(dias_julianos[i + 1]),
+                              float(velocidades[i]), float(velocidades[i + 1]))
+            # Mismo criterio que el cruce: una muestra en 0.0 cuenta como no negativa
+            tipo = "retrograda" if not negativo[i] else "directa"
+            self.estaciones.append((t, tipo, _longitud_exacta(t, planeta)))
+        
+        retrogrados = []
+        sombras = []
+        for (t_r, tipo_r, lon_r), (t_d, tipo_d, lon_d) in zip(self.estaciones[:-1], self.estaciones[1:]):
+            if tipo_r != "retrograda" or tipo_d != "directa":
+                continue
+            retrogrados.append((t_r, t_d, {"longitud_retrograda": lon_r, "longitud_directa": lon_d}))
+            
+            # La sombra dura aproximadamente lo mismo que la retrogradación a cada lado
+            ventana = 3 * (t_d - t_r)
+            inicio_sombra = self._cruce_longitud(dias_julianos, longitudes, lon_d, t_r - ventana, t_r, ultimo=True)
+            fin_sombra = self._cruce_longitud(dias_julianos, longitudes, lon_r, t_d, t_d + ventana, ultimo=False)
+            if inicio_sombra is not None and fin_sombra is not None:
+                sombras.append((inicio_sombra, fin_sombra, {
+                    "pre_sombra": (inicio_sombra, t_r),
+                    "retrogrado": (t_r, t_d),
+                    "post_sombra": (t_d, fin_sombra)
+                }))
+        
+        self.retrogrados = IndiceIntervalos(retrogrados)
+        self.sombras = IndiceIntervalos(sombras)
+    
+    def _cruce_longitud(self, dias_julianos: np.ndarray, longitudes: np.ndarray, objetivo: float,
+                        jd_desde: float, jd_hasta: float, ultimo: bool) -> Optional[float]:
+        """Primer (o último) instante de (jd_desde, jd_hasta) en que el planeta pasa por `objetivo`"""
+        desde = int(np.searchsorted(dias_julianos, jd_desde))
+        hasta = int(np.searchsorted(dias_julianos, jd_hasta, side="right"))
+        tramo = diferencia_angular(longitudes[desde:hasta], objetivo)
+        cruces = indices_cruce(tramo)
+        if len(cruces) == 0:
+            return None
+        
+        i = desde + int(cruces[-1] if ultimo else cruces[0])
+        
+        def funcion(t):
+            return diferencia_angular(_longitud_exacta(t, self.planeta), objetivo)
+        
+        return refinar_cruce(funcion, float(dias_julianos[i]), float(dias_julianos[i + 1]),
+                             float(diferencia_angular(longitudes[i], objetivo)),
+                             float(diferencia_angular(longitudes[i + 1], objetivo)))
+    
+    def cubre(self, dia_juliano: float) -> bool:
+        return self.jd_inicio <= dia_juliano < self.jd_fin
+
+
+def indice_estaciones(planeta: int) -> "IndiceEstaciones":
+    """
+    Índice de estaciones 1900-2100 de un planeta (se construye la primera vez,
+    con un candado: las peticiones simultáneas esperan en lugar de repetirlo;
+    al arrancar el servidor se construyen en segundo plano, ver precalcular_indices)
+    """
+    if planeta not in _INDICES_ESTACIONES:
+        with _INDICES_ESTACIONES_CANDADO:
+            if planeta not in _INDICES_ESTACIONES:
+                _INDICES_ESTACIONES[planeta] = IndiceEstaciones(
+                    planeta,
+                    obtener_dia_juliano(ANIO_INICIO_INDICES, 1, 1, 0.0),
+                    obtener_dia_juliano(ANIO_FIN_INDICES + 1, 1, 1, 0.0)
+                )
+    return _INDICES_ESTACIONES[planeta]
+
+
+def esta_retrogrado(planeta: int, dia_juliano: float) -> bool:
+    """
+    Verifica si un planeta está retrógrado en un instante.
+    
+    Para Mercurio a Saturno dentro de 1900-2100 se consulta el índice de
+    estaciones; en otro caso se usa el signo de la velocidad.
+    """
+    if planeta in PLANETAS_ESTACIONES:
+        indice = indice_estaciones(planeta)
+        if indice.cubre(dia_juliano):
+            return indice.retrogrados.contiene(dia_juliano)
+    return calcular_longitud_velocidad(dia_juliano, planeta)[1] < 0
+
+
+def estado_sombra(planeta: int, dia_juliano: float) -> Optional[Dict[str, Any]]:
+    """
+    Fase del ciclo retrógrado en un instante: "pre_sombra", "retrogrado" o
+    "post_sombra", con los límites (UT) de cada fase. None si está fuera de la sombra.
+    """
+    if planeta not in PLANETAS_ESTACIONES:
+        return None
+    
+    intervalo = indice_estaciones(planeta).sombras.intervalo_en(dia_juliano)
+    if intervalo is None:
+        return None
+    
+    fases = intervalo[2]
+    fase_actual = next(
+        fase for fase in ("pre_sombra", "retrogrado", "post_sombra")
+        if dia_juliano < fases[fase][1] or fase == "post_sombra"
+    )
+    return {
+        "fase": fase_actual,
+        **{
+            fase: {
+                "inicio": dia_juliano_a_datetime(inicio).isoformat(),
+                "fin": dia_juliano_a_datetime(fin).isoformat()
+            }
+            for fase, (inicio, fin) in fases.items()
+        }
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TABLA DE LUNACIONES
+# ═══════════════════════════════════════════════════════════════════════════════
+# Instantes exactos en que la elongación Sol-Luna cruza cada múltiplo de 45°
+# entre 1900 y 2100. Los cruces de 0°, 90°, 180° y 270° son Luna Nueva,
+# Cuarto Creciente, Luna Llena y Cuarto Menguante; los intermedios son los
+# límites de las fases de FASES_LUNARES, así que la fase de cualquier
+# instante sale de la tabla sin error. Se guarda en dos arreglos compactos
+# (~20 mil eventos, < 200 KB).
+
+# Códigos de octante de las fases principales
+LUNA_NUEVA = 0
+CUARTO_CRECIENTE = 2
+LUNA_LLENA = 4
+CUARTO_MENGUANTE = 6
+
+# Paso del muestreo (días): la elongación avanza ~12° por día
+PASO_BUSQUEDA_LUNACIONES = 1.0
+
+_TABLA_LUNACIONES: Optional["TablaLunaciones"] = None
+_TABLA_LUNACIONES_CANDADO = threading.Lock()
+
+
+class TablaLunaciones:
+    """
+    Cruces de la elongación Sol-Luna por múltiplos de 45°.
+    
+    Atributos:
+        tiempos: arreglo float64 con los días julianos de cada cruce, ordenado
+        octantes: arreglo int8 con el octante que empieza en cada cruce
+                  (0 = 0°, 1 = 45°, ..., 4 = 180°, ..., 7 = 315°)
+    """
+    
+    def __init__(self, jd_inicio: float, jd_fin: float):
+        efemerides = calcular_efemerides_rango(
+            jd_inicio - PASO_BUSQUEDA_LUNACIONES, jd_fin + PASO_BUSQUEDA_LUNACIONES,
+            PASO_BUSQUEDA_LUNACIONES, [swe.SUN, swe.MOON], usar_cache=False
+        )
+        dias_julianos = efemerides.dias_julianos
+        elongacion = efemerides.longitud(swe.MOON) - efemerides.longitud(swe.SUN)
+        eventos = []
+        
+        for octante in range(8):
+            objetivo = 45.0 * octante
+            valores = diferencia_angular(elongacion, objetivo)
+            
+            def funcion(t, objetivo=objetivo):
+                return diferencia_angular(
+                    _longitud_exacta(t, swe.MOON) - _longitud_exacta(t, swe.SUN), objetivo
+                )
+            
+            for i in indices_cruce(valores).tolist():
+                eventos.append((
+                    refinar_cruce(funcion, float(dias_julianos[i]), float(dias_julianos[i + 1]),
+                                  float(valores[i]), float(valores[i + 1])),
+                    octante
+                ))
+        
+        eventos.sort()
+        self.tiempos = np.array([t for t, _ in eventos], dtype=np.float64)
+        self.octantes = np.array([o for _, o in eventos], dtype=np.int8)
+        self.jd_inicio = float(self.tiempos[0])
+        self.jd_fin = float(self.tiempos[-1])
+    
+    def cubre(self, dia_juliano: float) -> bool:
+        return self.jd_inicio <= dia_juliano < self.jd_fin
+    
+    def fase(self, dia_juliano: float) -> Dict[str, Any]:
+        """Fase en un instante cubierto, con el mismo formato que obtener_fase_lunar()"""
+        i = int(np.searchsorted(self.tiempos, dia_juliano, side="right")) - 1
+        octante = int(self.octantes[i])
+        fraccion = (dia_juliano - self.tiempos[i]) / (self.tiempos[i + 1] - self.tiempos[i])
+        return {
+            "fase": FASES_LUNARES[octante],
+            "creciente": octante < 4,
+            "angulo": 45.0 * (octante + fraccion)
+        }
+    
+    def proximo(self, dia_juliano: float, octante: int) -> Optional[float]:
+        """Instante del próximo cruce del octante indicado (ej: LUNA_LLENA) después de t"""
+        i = int(np.searchsorted(self.tiempos, dia_juliano, side="right"))
+        for j in range(i, min(i + 9, len(self.tiempos))):
+            if self.octantes[j] == octante:
+                return float(self.tiempos[j])
+        return None
+    
+    def en_rango(self, jd_inicio: float, jd_fin: float, principales: bool = True) -> List[tuple]:
+        """Eventos (dia_juliano, octante) en [jd_inicio, jd_fin); solo fases principales por defecto"""
+        desde = int(np.searchsorted(self.tiempos, jd_inicio))
+        hasta = int(np.searchsorted(self.tiempos, jd_fin))
+        return [
+            (float(t), int(o))
+            for t, o in zip(self.tiempos[desde:hasta], self.octantes[desde:hasta])
+            if not principales or o % 2 == 0
+        ]
+
+
+def tabla_lunaciones() -> TablaLunaciones:
+    """
+    Tabla de lunaciones 1900-2100 (se construye la primera vez, con un
+    candado; al arrancar el servidor se construye en segundo plano, ver
+    precalcular_indices)
+    """
+    global _TABLA_LUNACIONES
+    if _TABLA_LUNACIONES is None:
+        with _TABLA_LUNACIONES_CANDADO:
+            if _TABLA_LUNACIONES is None:
+                _TABLA_LUNACIONES = TablaLunaciones(
+                    obtener_dia_juliano(ANIO_INICIO_INDICES, 1, 1, 0.0),
+                    obtener_dia_juliano(ANIO_FIN_INDICES + 1, 1, 1, 0.0)
+                )
+    return _TABLA_LUNACIONES
+
+
+def proxima_lunacion(dia_juliano: float, octante: int) -> Optional[Dict[str, Any]]:
+    """Fecha (UT) y días restantes hasta la próxima Luna Nueva/Llena/cuarto"""
+    instante = tabla_lunaciones().proximo(dia_juliano, octante)
+    if instante is None:
+        return None
+    return {
+        "fecha": dia_juliano_a_datetime(instante).isoformat(),
+        "dias": round(instante - dia_juliano, 2)
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INGRESOS A SIGNOS Y VIA COMBUSTA
+# ═══════════════════════════════════════════════════════════════════════════════
+# Instantes exactos en que un cuerpo cambia de signo y en que entra o sale de
+# la Via Combusta (195°-225°), calculados por año calendario la primera vez
+# que se piden. El signo o el estado de Via Combusta en cualquier instante
+# es una búsqueda binaria, y para un rango completo basta recorrer los
+# intervalos ordenados. Sirve para la Luna (cambia de signo cada ~2.5 días)
+# y para cualquier planeta de PLANETAS.
+
+# Paso del muestreo (días) por cuerpo, bastante menor que su tiempo en un signo
+PASO_BUSQUEDA_INGRESOS = {
+    swe.MOON: PASO_BUSQUEDA_LUNA,
+    swe.SUN: 1.0,
+    swe.MERCURY: 1.0,
+    swe.VENUS: 1.0,
+    swe.MARS: 2.0,
+    swe.JUPITER: 4.0,
+    swe.SATURN: 4.0,
+    swe.URANUS: 8.0,
+    swe.NEPTUNE: 8.0
+}
+
+# Índices de ingresos guardados, uno por (cuerpo, año); el año viene del cliente
+MAXIMO_INDICES_INGRESOS = int(os.environ.get("AE_INDICES_INGRESOS_MAX", "512"))
+
+_INDICES_INGRESOS = CacheLRU(MAXIMO_INDICES_INGRESOS, un_calculo_a_la_vez=True)
+
+
+class IndiceIngresos:
+    """
+    Ingresos de un cuerpo a cada signo y sus pasos por la Via Combusta
+    dentro de [jd_inicio, jd_fin).
+    
+    Atributos:
+        signo_inicial: signo en jd_inicio
+        tiempos: arreglo float64 con los instantes de ingreso
+        signos: arreglo int8 con el signo al que entra en cada ingreso
+        via_combusta: IndiceIntervalos con los pasos por 195°-225°
+                      (recortados a [jd_inicio, jd_fin))
+    """
+    
+    def __init__(self, planeta: int, jd_inicio: float, jd_fin: float):
+        self.planeta = planeta
+        self.jd_inicio = jd_inicio
+        self.jd_fin = jd_fin
+        
+        efemerides = calcular_efemerides_rango(
+            jd_inicio, jd_fin, PASO_BUSQUEDA_INGRESOS.get(planeta, 1.0), [planeta], usar_cache=False
+        )
+        longitudes = efemerides.longitud(planeta)
+        
+        ingresos = [(t, signo) for t, signo in buscar_ingresos(planeta, efemerides) if t < jd_fin]
+        self.signo_inicial = int(signo_vector(longitudes[:1])[0])
+        self.tiempos = np.array([t for t, _ in ingresos], dtype=np.float64)
+        self.signos = np.array([signo for _, signo in ingresos], dtype=np.int8)
+        
+        self.via_combusta = self._calcular_via_combusta(efemerides)
+    
+    def _calcular_via_combusta(self, efemerides: EfemeridesRango) -> IndiceIntervalos:
+        dias_julianos = efemerides.dias_julianos
+        longitudes = efemerides.longitud(self.planeta)
+        dentro = via_combusta_vector(longitudes)
+        
+        intervalos = []
+        inicio = self.jd_inicio if dentro[0] else None
+        for i in np.flatnonzero(dentro[:-1] != dentro[1:]).tolist():
+            # El límite cruzado es el más cercano a la muestra previa
+            limite = min(
+                (VIA_COMBUSTA_INICIO, VIA_COMBUSTA_FIN),
+                key=lambda l: abs(diferencia_angular(longitudes[i], l))
+            )
+            
+            def funcion(t, limite=limite):
+                return diferencia_angular(_longitud_exacta(t, self.planeta), limite)
+            
+            t = refinar_cruce(funcion, float(dias_julianos[i]), float(dias_julianos[i + 1]),
+                              float(diferencia_angular(longitudes[i], limite)),
+                              float(diferencia_angular(longitudes[i + 1], limite)))
+            if dentro[i + 1]:
+                inicio = t
+            elif inicio is not None:
+                intervalos.append((inicio, min(t, self.jd_fin)))
+                inicio = None
+        
+        if inicio is not None and inicio < self.jd_fin:
+            intervalos.append((inicio, self.jd_fin))
+        return IndiceIntervalos(intervalos)
+    
+    def signo_en(self, dia_juliano: float) -> int:
+        """Número de signo (0-11) en un instante del rango"""
+        i = int(np.searchsorted(self.tiempos, dia_juliano, side="right")) - 1
+        return self.signo_inicial if i < 0 else int(self.signos[i])
+
+
+def indice_ingresos(planeta: int, anio: int) -> IndiceIngresos:
+    """Ingresos de un cuerpo durante un año calendario (UT), en caché"""
+    return _INDICES_INGRESOS.obtener((planeta, anio), lambda: IndiceIngresos(
+        planeta,
+        obtener_dia_juliano(anio, 1, 1, 0.0),
+        obtener_dia_juliano(anio + 1, 1, 1, 0.0)
+    ))
+
+
+def _anios_en_rango(jd_inicio: float, jd_fin: float) -> range:
+    return range(swe.revjul(jd_inicio)[0], swe.revjul(jd_fin)[0] + 1)
+
+
+def signo_en(planeta: int, dia_juliano: float) -> int:
+    """Signo (0 = Aries ... 11 = Piscis) de un cuerpo en un instante, desde el índice"""
+    return indice_ingresos(planeta, swe.revjul(dia_juliano)[0]).signo_en(dia_juliano)
+
+
+def signos_en_rango(planeta: int, jd_inicio: float, jd_fin: float) -> List[tuple]:
+    """
+    Tramos consecutivos (inicio, fin, numero_signo) que recorre un cuerpo en
+    [jd_inicio, jd_fin), uniendo los índices anuales.
+    """
+    tramos = []
+    inicio = jd_inicio
+    signo = signo_en(planeta, jd_inicio)
+    
+    for anio in _anios_en_rango(jd_inicio, jd_fin):
+        indice = indice_ingresos(planeta, anio)
+        desde = int(np.searchsorted(indice.tiempos, jd_inicio, side="right"))
+        hasta = int(np.searchsorted(indice.tiempos, jd_fin))
+        for t, signo_nuevo in zip(indice.tiempos[desde:hasta].tolist(), indice.signos[desde:hasta].tolist()):
+            tramos.append((inicio, t, signo))
+            inicio, signo = t, signo_nuevo
+    
+    tramos.append((inicio, jd_fin, signo))
+    return tramos
+
+
+def via_combusta_en_rango(jd_inicio: float, jd_fin: float) -> IndiceIntervalos:
+    """
+    Pasos de la Luna por la Via Combusta que se superponen con [jd_inicio, jd_fin).
+    Los pasos que cruzan el cambio de año se unen en un solo intervalo.
+    """
+    intervalos = []
+    for anio in _anios_en_rango(jd_inicio, jd_fin):
+        for inicio, fin, _ in indice_ingresos(swe.MOON, anio).via_combusta.en_rango(jd_inicio, jd_fin):
+            if intervalos and abs(intervalos[-1][1] - inicio) < TOLERANCIA_EVENTOS:
+                intervalos[-1] = (intervalos[-1][0], fin)
+            else:
+                intervalos.append((inicio, fin))
+    return IndiceIntervalos(intervalos)
+
+
+def luna_en_via_combusta(dia_juliano: float) -> bool:
+    """esta_en_via_combusta() para la Luna, consultando el índice en vez de calcular su posición"""
+    return indice_ingresos(swe.MOON, swe.revjul(dia_juliano)[0]).via_combusta.contiene(dia_juliano)
+
+
+def proximo_ingreso(planeta: int, dia_juliano: float) -> Optional[Dict[str, Any]]:
+    """Próximo cambio de signo de un cuerpo: signo nuevo y fecha (UT)"""
+    anio = swe.revjul(dia_juliano)[0]
+    for indice in (indice_ingresos(planeta, anio), indice_ingresos(planeta, anio + 1)):
+        i = int(np.searchsorted(indice.tiempos, dia_juliano, side="right"))
+        if i < len(indice.tiempos):
+            return {
+                "signo": SIGNOS[int(indice.signos[i])],
+                "fecha": dia_juliano_a_datetime(float(indice.tiempos[i])).isoformat()
+            }
+    return None
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LÍNEA DE TIEMPO DE ASPECTOS LUNARES
+# ═══════════════════════════════════════════════════════════════════════════════
+# Para un rango de fechas se buscan, entre la Luna y cada cuerpo de PLANETAS,
+# los instantes de entrada y salida del orbe de cada aspecto de ASPECTOS y el
+# instante en que el aspecto es exacto. El resultado es una lista ordenada de
+# intervalos por par: saber si hay aspecto en un instante es una búsqueda
+# binaria, sin volver a calcular posiciones.
+
+_LINEAS_TIEMPO_ASPECTOS = CacheLRU(32)
+
+
+def _estado_aspecto(separacion: np.ndarray) -> np.ndarray:
+    """Ángulo del aspecto cuyo orbe contiene cada separación (0-180°), o -1"""
+    estado = np.full(separacion.shape, -1, dtype=np.int64)
+    for angulo, (_, _, orbe) in reversed(list(ASPECTOS.items())):
+        estado[np.abs(separacion - angulo) <= orbe] = angulo
+    return estado
+
+
+class LineaTiempoAspectos:
+    """
+    Aspectos de la Luna con cada cuerpo de PLANETAS en [jd_inicio, jd_fin).
+    
+    Atributos:
+        pares: planeta -> IndiceIntervalos [entrada al orbe, salida del orbe).
+               El dato de cada intervalo es un diccionario con "angulo",
+               "aspecto", "simbolo" y "exacto" (instante de perfección, o None
+               si el aspecto no llega a ser exacto dentro del rango).
+    """
+    
+    def __init__(self, jd_inicio: float, jd_fin: float, planetas: Optional[List[int]] = None):
+        if planetas is None:
+            planetas = [planeta for planeta in PLANETAS if planeta != swe.MOON]
+        
+        self.jd_inicio = jd_inicio
+        self.jd_fin = jd_fin
+        
+        efemerides = calcular_efemerides_rango(
+            jd_inicio, jd_fin + PASO_BUSQUEDA_LUNA, PASO_BUSQUEDA_LUNA,
+            [swe.MOON] + planetas, usar_cache=False
+        )
+        self.pares = {planeta: self._intervalos_par(planeta, efemerides) for planeta in planetas}
+    
+    def _intervalos_par(self, planeta: int, efemerides: EfemeridesRango) -> IndiceIntervalos:
+        dias_julianos = efemerides.dias_julianos
+        separacion = separacion_vector(efemerides, swe.MOON, planeta)
+        estado = _estado_aspecto(separacion)
+        
+        def distancia(t, limite):
+            return abs(diferencia_angular(_longitud_exacta(t, swe.MOON), _longitud_exacta(t, planeta))) - limite
+        
+        # Instantes de cambio de estado (entrada o salida de un orbe)
+        cambios = []
+        for i in np.flatnonzero(estado[:-1] != estado[1:]).tolist():
+            d0, d1 = float(separacion[i]), float(separacion[i + 1])
+            # El límite cruzado es el borde de orbe que queda entre ambas muestras
+            limite = next(
+                angulo + signo * ASPECTOS[angulo][2]
+                for angulo in (estado[i], estado[i + 1]) if angulo >= 0
+                for signo in (-1, 1)
+                if min(d0, d1) <= angulo + signo * ASPECTOS[angulo][2] <= max(d0, d1)
+            )
+            t = refinar_cruce(lambda t, limite=limite: distancia(t, limite),
+                              float(dias_julianos[i]), float(dias_julianos[i + 1]),
+                              d0 - limite, d1 - limite)
+            cambios.append((t, int(estado[i + 1])))
+        
+        perfecciones = buscar_perfecciones(swe.MOON, planeta, efemerides)
+        tiempos_perfeccion = [t for t, _ in perfecciones]
+        
+        intervalos = []
+        inicio, angulo_actual = self.jd_inicio, int(estado[0])
+        for t, angulo_nuevo in cambios + [(self.jd_fin, -1)]:
+            t = min(t, self.jd_fin)
+            if angulo_actual >= 0 and t > inicio:
+                # Perfección del mismo aspecto dentro del intervalo
+                k = bisect_left(tiempos_perfeccion, inicio)
+                exacto = None
+                while k < len(perfecciones) and tiempos_perfeccion[k] < t:
+                    if perfecciones[k][1] == angulo_actual:
+                        exacto = tiempos_perfeccion[k]
+                        break
+                    k += 1
+                nombre, simbolo, _ = ASPECTOS[angulo_actual]
+                intervalos.append((inicio, t, {
+                    "angulo": angulo_actual,
+                    "aspecto": nombre,
+                    "simbolo": simbolo,
+                    "exacto": exacto
+                }))
+            if t >= self.jd_fin:
+                break
+            inicio, angulo_actual = t, angulo_nuevo
+        
+        return IndiceIntervalos(intervalos)
+    
+    def aspecto_en(self, planeta: int, dia_juliano: float) -> Optional[Dict[str, Any]]:
+        """Aspecto Luna-planeta vigente en un instante del rango (ver atributo pares), o None"""
+        intervalo = self.pares[planeta].intervalo_en(dia_juliano)
+        return None if intervalo is None else intervalo[2]
+
+
+def linea_tiempo_aspectos(jd_inicio: float, jd_fin: float) -> LineaTiempoAspectos:
+    """LineaTiempoAspectos de un rango; se guardan las últimas en un caché LRU"""
+    return _LINEAS_TIEMPO_ASPECTOS.obtener(
+        (jd_inicio, jd_fin),
+        lambda: LineaTiempoAspectos(jd_inicio, jd_fin)
+    )
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SISTEMA DE PUNTUACIÓN (SCORING)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def variables_puntaje(dia_juliano: float, carta: Optional[ChartSnapshot] = None) -> Dict[str, Any]:
+    """
+    Variables de un instante que consultan las reglas de REGLAS_PUNTAJE.
+    
+    Los aspectos se expresan como el ángulo del aspecto (0, 60, 90, 120, 180)
+    o -1 si no hay aspecto.
+    """
+    carta = _obtener_carta(dia_juliano, carta)
+    luna = carta[swe.MOON]
+    fase_lunar = obtener_fase_lunar(dia_juliano, carta)
+    
+    def angulo_aspecto(planeta1, planeta2):
+        aspecto = calcular_aspecto(dia_juliano, planeta1, planeta2, carta)
+        return aspecto["angulo"] if aspecto else -1
+    
+    variables = {
+        "creciente": fase_lunar["creciente"],
+        "fase": fase_lunar["fase"],
+        "vacia_curso": esta_luna_vacia_de_curso(dia_juliano),
+        "via_combusta": bool(luna) and esta_en_via_combusta(luna["longitud"]),
+        "grado_luna": luna["grado"] if luna else 0.0,
+        "signo_luna": luna["signo"] if luna else None,
+        "signo_favorable": bool(luna) and luna["signo"] in SIGNOS_FAVORABLES_LUNA,
+        "mercurio_retrogrado": esta_retrogrado(swe.MERCURY, dia_juliano),
+        "aspecto_jupiter": angulo_aspecto(swe.MOON, swe.JUPITER),
+        "aspecto_venus": angulo_aspecto(swe.MOON, swe.VENUS),
+        "aspecto_marte": angulo_aspecto(swe.MOON, swe.MARS),
+        "aspecto_saturno": angulo_aspecto(swe.MOON, swe.SATURN),
+        "aspecto_sol": angulo_aspecto(swe.SUN, swe.MOON)
+    }
+    for planeta in SIGNIFICADORES:
+        nombre = _sin_acentos(PLANETAS[planeta].lower())
+        variables[f"significador_{nombre}"] = angulo_aspecto(swe.MOON, planeta) in ASPECTOS_FAVORABLES
+    
+    return variables
+
+
+# Pipelines escalares compilados que se guardan (combinaciones de reglas activas y pesos)
+MAXIMO_PIPELINES_REGLAS = int(os.environ.get("AE_PIPELINES_REGLAS_MAX", "128"))
+
+
+class MotorReglas:
+    """
+    Reglas declarativas compiladas una sola vez en dos formas:
+    - escalar: una tupla de closures (una por regla) que se recorre por instante
+    - vectorizada: una matriz de activaciones (instantes x reglas, ver
+      MatrizFactores) y un vector de pesos
+    
+    Las reglas desactivadas no se evalúan: cada combinación de reglas activas y
+    pesos tiene su propio pipeline compilado (en un CacheLRU acotado), así que el bucle no
+    pregunta regla por regla si está activa. En la forma vectorizada una regla
+    desactivada simplemente tiene peso 0.
+    """
+    
+    def __init__(self, reglas: List[Dict[str, Any]], pesos: Dict[str, int]):
+        faltantes = [regla["id"] for regla in reglas if regla.get("peso", regla["id"]) not in pesos]
+        if faltantes:
+            raise ValueError(f"Reglas sin peso en PESOS: {faltantes}")
+        
+        self.reglas = reglas
+        self.ids = [regla["id"] for regla in reglas]
+        self.pesos = {regla["id"]: pesos[regla.get("peso", regla["id"])] for regla in reglas}
+        # Acotado: los pesos vienen del cliente y cada combinación es una clave nueva
+        self._pipelines = CacheLRU(MAXIMO_PIPELINES_REGLAS)
+    
+    @staticmethod
+    def _compilar_regla(variable: str, valor: Any, peso: int, texto: str, tipo: str) -> Callable:
+        """Closure de una regla: suma su peso y agrega su factor si se cumple"""
+        def regla(variables: Dict[str, Any], factores: List[Dict[str, str]]) -> int:
+            if variables[variable] == valor:
+                factores.append({"texto": texto.format(**variables), "tipo": tipo})
+                return peso
+            return 0
+        return regla
+    
+    def reglas_activas(self, desactivadas: Optional[List[str]] = None) -> Optional[frozenset]:
+        """Conjunto de ids activos (None = todas). ValueError si algún id no existe."""
+        if not desactivadas:
+            return None
+        desconocidas = sorted(set(desactivadas) - set(self.ids))
+        if desconocidas:
+            raise ValueError(f"Reglas desconocidas: {desconocidas}. Opciones: {self.ids}")
+        return frozenset(self.ids) - frozenset(desactivadas)
+    
+    def activas_tipo(self, tipo_proyecto: str, activas: Optional[frozenset] = None) -> frozenset:
+        """
+        Reglas activas para un tipo de proyecto: las generales más las de
+        significador de sus TIPOS_PROYECTO["planetas"], dentro de activas.
+        """
+        planetas = TIPOS_PROYECTO.get(tipo_proyecto, TIPOS_PROYECTO["otro"])["planetas"]
+        return frozenset(
+            regla["id"] for regla in self.reglas
+            if (activas is None or regla["id"] in activas)
+            and ("significador" not in regla or regla["significador"] in planetas)
+        )
+    
+    def validar_pesos(self, pesos: Optional[Dict[str, int]] = None) -> Optional[Dict[str, int]]:
+        """Pesos que reemplazan a los de PESOS (None = sin cambios). ValueError si algún id no existe."""
+        if not pesos:
+            return None
+        desconocidas = sorted(set(pesos) - set(self.ids))
+        if desconocidas:
+            raise ValueError(f"Pesos de reglas desconocidas: {desconocidas}. Opciones: {self.ids}")
+        return dict(pesos)
+    
+    def vector_pesos(self, activas: Optional[frozenset] = None,
+                     pesos: Optional[Dict[str, int]] = None) -> np.ndarray:
+        """Peso de cada regla en el orden de self.ids (0 para las desactivadas)"""
+        pesos = {**self.pesos, **(pesos or {})}
+        return np.array([
+            pesos[id_regla] if activas is None or id_regla in activas else 0
+            for id_regla in self.ids
+        ], dtype=np.int64)
+    
+    def _pipeline(self, activas: Optional[frozenset], pesos: Optional[Dict[str, int]]) -> tuple:
+        """Closures escalares para un conjunto de reglas activas y pesos"""
+        clave = (activas, frozenset(pesos.items()) if pesos else None)
+        
+        def compilar():
+            pesos_regla = {**self.pesos, **(pesos or {})}
+            return tuple(
+                self._compilar_regla(*regla["si"], pesos_regla[regla["id"]], regla["texto"], regla["tipo"])
+                for regla in self.reglas
+                if activas is None or regla["id"] in activas
+            )
+        
+        return self._pipelines.obtener(clave, compilar)
+    
+    def evaluar(self, variables: Dict[str, Any], activas: Optional[frozenset] = None,
+                pesos: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Puntaje, nivel y factores de un instante (variables de variables_puntaje())"""
+        factores = []
+        puntaje = 50  # Puntaje base neutro
+        for regla in self._pipeline(activas, pesos):
+            puntaje += regla(variables, factores)
+        
+        # Limitar puntaje entre 0 y 100
+        puntaje = max(0, min(100, puntaje))
+        
+        return {
+            "puntaje": puntaje,
+            "nivel": nivel_puntaje(puntaje),
+            "factores": factores
+        }
+    
+    def activaciones(self, variables: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Matriz int8 (instantes x reglas): 1 donde la regla se cumple (variables
+        de variables_puntaje_rango()). Las reglas cuyas variables no están
+        quedan en 0 (ver cota_pendientes).
+        """
+        n = len(next(iter(variables.values())))
+        matriz = np.zeros((n, len(self.reglas)), dtype=np.int8)
+        for j, regla in enumerate(self.reglas):
+            variable, valor = regla["si"]
+            if variable in variables:
+                matriz[:, j] = variables[variable] == valor
+        return matriz
+    
+    def cota_pendientes(self, conocidas, vector_pesos: np.ndarray) -> int:
+        """
+        Máximo que pueden sumar las reglas cuyas variables no están en conocidas.
+        
+        Las reglas de una misma variable piden valores distintos, así que a lo
+        sumo se cumple una por variable: se suma el mayor peso positivo de cada una.
+        """
+        maximos = {}
+        for j, regla in enumerate(self.reglas):
+            variable = regla["si"][0]
+            if variable not in conocidas:
+                maximos[variable] = max(maximos.get(variable, 0), int(vector_pesos[j]))
+        return sum(maximos.values())
+
+
+MOTOR_REGLAS = MotorReglas(REGLAS_PUNTAJE, PESOS)
+
+
+def calcular_puntaje_fecha(dia_juliano: float, tipo_proyecto: str, lat: float, lon: float,
+                           activas: Optional[frozenset] = None,
+                           pesos: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Calcula el puntaje de una fecha para un tipo de proyecto.
+    
+    METODOLOGÍA:
+    - Puntaje base: 50 (neutro)
+    - Se suman/restan puntos según las reglas de Robson (ver REGLAS_PUNTAJE)
+    - Puntaje final: 0-100
+    
+    NIVELES:
+    - 80-100: Excelente
+    - 60-79: Buena
+    - 40-59: Precaución
+    - 0-39: Evitar
+    
+    Args:
+        activas: Ids de reglas activas (ver MotorReglas.reglas_activas); None = todas
+        pesos: Pesos que reemplazan a los de PESOS (ver MotorReglas.validar_pesos)
+    
+    Returns:
+        Diccionario con: puntaje, nivel, factores
+    """
+    return MOTOR_REGLAS.evaluar(
+        variables_puntaje(dia_juliano),
+        MOTOR_REGLAS.activas_tipo(tipo_proyecto, activas),
+        pesos
+    )
+
+
+def nivel_puntaje(puntaje: int) -> str:
+    """Nivel según puntaje: excellent (80-100), good (60-79), caution (40-59), avoid (0-39)"""
+    if puntaje >= 80:
+        return "excellent"
+    elif puntaje >= 60:
+        return "good"
+    elif puntaje >= 40:
+        return "caution"
+    return "avoid"
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SISTEMA DE PUNTUACIÓN VECTORIZADO (RANGO COMPLETO)
+# ═══════════════════════════════════════════════════════════════════════════════
+# Dos etapas:
+# 1. MatrizFactores: la parte astronómica. Una fila por instante y una columna
+#    por regla de MOTOR_REGLAS (1 si la regla se cumple). Se guarda en caché
+#    por rango (matriz_factores_rango).
+# 2. puntuar_matriz: 50 + matriz @ pesos, limitado a 0-100. Cambiar PESOS o
+#    enviar pesos propios solo repite esta etapa, sin recalcular efemérides.
+# Los textos de los factores solo se arman para los días que se muestran (ver
+# factores_rango). verificar_paridad_puntajes() compara con el motor escalar.
+
+def variables_puntaje_rango(efemerides: EfemeridesRango) -> Dict[str, np.ndarray]:
+    """
+    Versión vectorizada de variables_puntaje(): un arreglo por variable.
+    
+    fase y signo_luna se guardan como índices (indice_fase, indice_signo_luna);
+    _variables_fila() los traduce a texto para formatear los factores.
+    
+    Sol, Luna y Mercurio son obligatorios (CUERPOS_BARATOS). Los aspectos a
+    cuerpos que no están en efemerides se omiten: así la poda de
+    buscar_mejores_podando() calcula primero solo las variables baratas.
+    """
+    luna = efemerides.longitud(swe.MOON)
+    fase = fase_lunar_vector(efemerides)
+    signo_luna = signo_vector(luna)
+    
+    variables = {
+        "creciente": fase["creciente"],
+        "indice_fase": fase["indice_fase"],
+        "vacia_curso": luna_vacia_de_curso_vector(efemerides),
+        "via_combusta": via_combusta_vector(luna),
+        "grado_luna": np.mod(luna, 30),
+        "indice_signo_luna": signo_luna,
+        "signo_favorable": np.isin(signo_luna, [SIGNOS.index(signo) for signo in SIGNOS_FAVORABLES_LUNA]),
+        "mercurio_retrogrado": retrogrado_vector(efemerides, swe.MERCURY),
+        "aspecto_sol": aspecto_vector(efemerides, swe.SUN, swe.MOON)["angulo"]
+    }
+    variables.update(variables_aspectos_rango(
+        efemerides, [planeta for planeta in efemerides.planetas if planeta != swe.MOON]
+    ))
+    return variables
+
+
+def variables_aspectos_rango(efemerides: EfemeridesRango, planetas: List[int]) -> Dict[str, np.ndarray]:
+    """Variables de aspectos Luna-planeta (aspecto_* y significador_*) de los planetas indicados"""
+    con_reglas = (swe.JUPITER, swe.VENUS, swe.MARS, swe.SATURN)  # REGLAS 5 y 6
+    variables = {}
+    for planeta in planetas:
+        if planeta not in con_reglas and planeta not in SIGNIFICADORES:
+            continue
+        nombre = _sin_acentos(PLANETAS[planeta].lower())
+        angulos = aspecto_vector(efemerides, swe.MOON, planeta)["angulo"]
+        if planeta in con_reglas:
+            variables[f"aspecto_{nombre}"] = angulos
+        if planeta in SIGNIFICADORES:
+            variables[f"significador_{nombre}"] = np.isin(angulos, ASPECTOS_FAVORABLES)
+    return variables
+
+
+def _variables_fila(variables: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+    """Variables del instante i de variables_puntaje_rango(), con el formato de variables_puntaje()"""
+    fila = {nombre: valores[i].item() for nombre, valores in variables.items()}
+    fila["fase"] = FASES_LUNARES[fila.pop("indice_fase")]
+    fila["signo_luna"] = SIGNOS[fila.pop("indice_signo_luna")]
+    return fila
+
+
+class MatrizFactores:
+    """
+    Activaciones de todas las reglas en todos los instantes de un rango.
+    
+    Attributes:
+        dias_julianos: Arreglo (n,) de instantes
+        variables: Arreglos de variables_puntaje_rango() (para los textos)
+        activaciones: Matriz int8 (n, reglas) en el orden de MOTOR_REGLAS.ids
+    """
+    
+    __slots__ = ("dias_julianos", "variables", "activaciones")
+    
+    def __init__(self, efemerides: EfemeridesRango):
+        self.dias_julianos = efemerides.dias_julianos
+        self.variables = variables_puntaje_rango(efemerides)
+        self.activaciones = MOTOR_REGLAS.activaciones(self.variables)
+    
+    def puntajes(self, vector_pesos: np.ndarray) -> np.ndarray:
+        """Puntaje (0-100) de cada instante para un vector de pesos de MotorReglas.vector_pesos()"""
+        return np.clip(50 + self.activaciones @ vector_pesos, 0, 100)
+
+
+# Matrices de factores recientes (clave: rango, paso y modo de efemérides)
+_MATRICES_FACTORES = CacheLRU(16)
+
+
+def matriz_factores_rango(jd_inicio: float, jd_fin: float, paso: float = 1.0) -> MatrizFactores:
+    """MatrizFactores de un rango equiespaciado; se guardan las últimas en un caché LRU"""
+    # Las grillas subdiarias se guardan enteras como matriz; no vale la pena
+    # pasar cada una de sus posiciones por CACHE_EFEMERIDES
+    return _MATRICES_FACTORES.obtener(
+        (jd_inicio, jd_fin, paso, MODO_EFEMERIDES),
+        lambda: MatrizFactores(calcular_efemerides_rango(jd_inicio, jd_fin, paso, usar_cache=paso >= 1.0))
+    )
+
+
+def puntuar_matriz(matriz: MatrizFactores, activas: Optional[frozenset] = None,
+                   pesos: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Puntajes de una MatrizFactores (segunda etapa, sin cálculos astronómicos).
+    
+    Args:
+        matriz: MatrizFactores del rango
+        activas: Ids de reglas activas (ver MotorReglas.reglas_activas); None = todas
+        pesos: Pesos que reemplazan a los de PESOS (ver MotorReglas.validar_pesos)
+    
+    Returns:
+        Diccionario con:
+        - puntajes: arreglo int (0-100) por instante
+        - matriz, activas, pesos: lo necesario para que factores_rango() arme los textos
+    """
+    return {
+        "dias_julianos": matriz.dias_julianos,
+        "puntajes": matriz.puntajes(MOTOR_REGLAS.vector_pesos(activas, pesos)),
+        "matriz": matriz,
+        "activas": activas,
+        "pesos": pesos
+    }
+
+
+def calcular_puntajes_rango(efemerides: EfemeridesRango, tipo_proyecto: str,
+                            activas: Optional[frozenset] = None,
+                            pesos: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Versión vectorizada de calcular_puntaje_fecha() para todos los instantes de un rango.
+    
+    Args:
+        efemerides: EfemeridesRango con todos los cuerpos de PLANETAS
+        tipo_proyecto: Ver TIPOS_PROYECTO
+        activas: Ids de reglas activas (ver MotorReglas.reglas_activas); None = todas
+        pesos: Pesos que reemplazan a los de PESOS (ver MotorReglas.validar_pesos)
+    
+    Returns:
+        Ver puntuar_matriz()
+    """
+    return puntuar_matriz(MatrizFactores(efemerides), MOTOR_REGLAS.activas_tipo(tipo_proyecto, activas), pesos)
+
+
+def factores_rango(resultado: Dict[str, Any], i: int) -> List[Dict[str, str]]:
+    """Factores del instante i de puntuar_matriz(), en el formato de calcular_puntaje_fecha()"""
+    return MOTOR_REGLAS.evaluar(
+        _variables_fila(resultado["matriz"].variables, i),
+        resultado["activas"],
+        resultado["pesos"]
+    )["factores"]
+
+
+def seleccionar_mejores(puntajes: np.ndarray, k: int) -> np.ndarray:
+    """
+    Índices de los k mayores puntajes, ordenados de mayor a menor; a igual
+    puntaje, el índice menor (la fecha anterior) primero.
+    
+    Con np.partition el costo es lineal en la cantidad de instantes; solo los k
+    elegidos se ordenan.
+    """
+    n = len(puntajes)
+    if k >= n:
+        return np.argsort(-puntajes, kind="stable")
+    
+    umbral = np.partition(puntajes, n - k)[n - k]  # k-ésimo mayor puntaje
+    mayores = np.flatnonzero(puntajes > umbral)
+    iguales = np.flatnonzero(puntajes == umbral)[:k - len(mayores)]
+    elegidos = np.concatenate([mayores, iguales])
+    return elegidos[np.lexsort((elegidos, -puntajes[elegidos]))]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PODA DE INSTANTES DESCALIFICADOS (BRANCH-AND-BOUND)
+# ═══════════════════════════════════════════════════════════════════════════════
+# Modo "rapido" de /calcular. Fase, vacío de curso, Via Combusta, signo lunar,
+# Mercurio y el aspecto Sol-Luna solo necesitan Sol, Luna y Mercurio (y los
+# índices de eventos); los aspectos de la Luna al resto de los planetas son lo
+# caro. Para cada instante:
+#   cota = 50 + reglas baratas + (máximo que podrían sumar los aspectos)
+# Los instantes se evalúan completos en orden de cota decreciente y se para
+# cuando la cota del siguiente es menor que el k-ésimo mejor puntaje ya
+# obtenido: ninguno de los que faltan puede entrar (ni empatar) en el top k,
+# así que el resultado es idéntico al del modo completo.
+
+# Modos de búsqueda de /calcular
+MODOS_BUSQUEDA = ["completo", "rapido"]
+
+# Cuerpos de la primera etapa (variables baratas)
+CUERPOS_BARATOS = [swe.SUN, swe.MOON, swe.MERCURY]
+
+# Cuerpos de la segunda etapa (aspectos de la Luna)
+CUERPOS_CAROS = [planeta for planeta in PLANETAS if planeta not in CUERPOS_BARATOS]
+
+# Instantes del primer lote de evaluación completa (cada lote duplica al anterior)
+TAMANO_LOTE_PODA = 32
+
+
+def buscar_mejores_podando(dias_julianos: np.ndarray, k: int,
+                           activas: Optional[frozenset] = None,
+                           pesos: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Los k mejores instantes, evaluando completos solo los que pueden entrar al top k.
+    
+    Args:
+        dias_julianos: Instantes candidatos
+        k: Cantidad de instantes a devolver
+        activas: Ids de reglas activas (ver MotorReglas.reglas_activas); None = todas
+        pesos: Pesos que reemplazan a los de PESOS (ver MotorReglas.validar_pesos)
+    
+    Returns:
+        puntuar_matriz() de los k mejores instantes (mismo orden y desempate que
+        seleccionar_mejores), más:
+        - indices: posición de cada uno en dias_julianos
+        - evaluados: cuántos instantes se evaluaron completos
+    """
+    n = len(dias_julianos)
+    vector_pesos = MOTOR_REGLAS.vector_pesos(activas, pesos)
+    
+    # Etapa 1: variables baratas y cota superior de cada instante
+    efemerides_baratas = calcular_efemerides_instantes(dias_julianos, CUERPOS_BARATOS)
+    baratas = variables_puntaje_rango(efemerides_baratas)
+    cota = np.clip(
+        50 + MOTOR_REGLAS.activaciones(baratas) @ vector_pesos
+        + MOTOR_REGLAS.cota_pendientes(baratas, vector_pesos),
+        0, 100
+    )
+    
+    # Etapa 2: aspectos de la Luna por lotes, de mayor a menor cota
+    orden = np.lexsort((np.arange(n), -cota))
+    puntajes = np.full(n, -1, dtype=np.int64)
+    umbral = -1
+    evaluados = 0
+    tamano_lote = TAMANO_LOTE_PODA
+    
+    while evaluados < n and cota[orden[evaluados]] >= umbral:
+        lote = orden[evaluados:evaluados + tamano_lote]
+        lote = lote[cota[lote] >= umbral]
+        tamano_lote *= 2
+        
+        caras = calcular_efemerides_instantes(dias_julianos[lote], CUERPOS_CAROS)
+        efemerides_lote = EfemeridesRango(
+            dias_julianos[lote],
+            CUERPOS_BARATOS + CUERPOS_CAROS,
+            np.hstack([efemerides_baratas.longitudes[lote], caras.longitudes]),
+            np.hstack([efemerides_baratas.velocidades[lote], caras.velocidades])
+        )
+        variables = {nombre: valores[lote] for nombre, valores in baratas.items()}
+        variables.update(variables_aspectos_rango(efemerides_lote, CUERPOS_CAROS))
+        puntajes[lote] = np.clip(50 + MOTOR_REGLAS.activaciones(variables) @ vector_pesos, 0, 100)
+        evaluados += len(lote)
+        
+        if evaluados >= k:
+            completos = puntajes[orden[:evaluados]]
+            umbral = np.partition(completos, evaluados - k)[evaluados - k]
+    
+    # Los no evaluados tienen cota < umbral: quedan fuera del top k con puntaje -1
+    indices = seleccionar_mejores(puntajes, min(k, evaluados))
+    resultado = puntuar_matriz(
+        MatrizFactores(calcular_efemerides_instantes(dias_julianos[indices])), activas, pesos
+    )
+    resultado["indices"] = indices
+    resultado["evaluados"] = evaluados
+    return resultado
+
+
+def verificar_paridad_puntajes(jd_inicio: float, n_dias: int, tipo_proyecto: str = "negocio") -> List[str]:
+    """
+    Compara día por día (a las 12:00 UT) el motor escalar con el vectorizado.
+    
+    Returns:
+        Lista de diferencias encontradas (vacía si ambos motores coinciden)
+    """
+    efemerides = calcular_efemerides_rango(jd_inicio, jd_inicio + n_dias - 1, 1.0)
+    resultado = calcular_puntajes_rango(efemerides, tipo_proyecto)
+    diferencias = []
+    
+    for i, dia_juliano in enumerate(efemerides.dias_julianos.tolist()):
+        escalar = calcular_puntaje_fecha(dia_juliano, tipo_proyecto, 0.0, 0.0)
+        vectorizado = {
+            "puntaje": int(resultado["puntajes"][i]),
+            "nivel": nivel_puntaje(int(resultado["puntajes"][i])),
+            "factores": factores_rango(resultado, i)
+        }
+        if escalar != vectorizado:
+            fecha = dia_juliano_a_datetime(dia_juliano).date().isoformat()
+            diferencias.append(f"{fecha}: escalar={escalar} vectorizado={vectorizado}")
+    
+    return diferencias
+
+
+def obtener_mejores_horas(fecha: datetime, lat: float, lon: float) -> List[str]:
+    """
+    Obtiene las mejores horas del día para iniciar el proyecto.
+    
+    Las horas de Júpiter, Venus y Sol son las más favorables; solo se
+    proponen horas diurnas.
+    
+    Returns:
+        Lista de strings con las mejores horas
+    """
+    linea = horas_planetarias_dia(fecha, lat, lon)
+    desfase = desfase_horario(lon)
+    
+    # Máximo 3 horas
+    return [
+        f"{hora_local_hhmm(linea.limites[i], desfase)} - {hora_local_hhmm(linea.limites[i + 1], desfase)} "
+        f"(Hora de {ORDEN_HORAS_PLANETARIAS[linea.regentes[i]]})"
+        for i in np.flatnonzero(linea.favorables() & linea.diurnas())[:3].tolist()
+    ]
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BÚSQUEDA SUBDIARIA (DE GRUESO A FINO)
+# ═══════════════════════════════════════════════════════════════════════════════
+# Con resolución menor a un día, /calcular busca el instante de mayor puntaje
+# de cada día local:
+# 1. Puntajes horarios de todo el rango (MatrizFactores, en caché).
+# 2. Entre dos muestras consecutivas el puntaje solo puede cambiar si cambia
+#    alguna regla: los intervalos sin cambios se descartan. En los demás, la
+#    cota 50 + Σ max(contribución al inicio, contribución al final) dice si
+#    podrían superar al mejor instante del día. La cota supone que cada regla
+#    cambia a lo sumo una vez dentro del intervalo; con una hora o menos se
+#    cumple (lo más rápido son los orbes lunares, que duran horas).
+# 3. Los intervalos que quedan se subdividen (60 → 15 → 5 → 1 minutos) y se
+#    repite el paso 2 solo con ellos.
+# Así un día a resolución de 1 minuto cuesta 25 instantes más unos pocos
+# alrededor de los cambios de factores, no 1440.
+
+# Resoluciones de /calcular: minutos entre instantes evaluados (None = 12:00 UT de cada día)
+RESOLUCIONES = {"diaria": None, "horaria": 60, "15min": 15, "1min": 1}
+
+# Pasos sucesivos del refinamiento, en minutos (cada uno divide al anterior)
+PASOS_REFINAMIENTO = [60, 15, 5, 1]
+
+
+def desfase_horario(longitud: float) -> int:
+    """Desfase aproximado de la hora local respecto de UT, en horas (longitud / 15°)"""
+    return round(longitud / 15)
+
+
+def _mejores_por_dia(dias: np.ndarray, puntajes: np.ndarray, dias_julianos: np.ndarray,
+                     n_dias: int) -> tuple:
+    """
+    Mejor muestra de cada día: a igual puntaje, la más temprana.
+    
+    Returns:
+        (puntajes, dias_julianos) de forma (n_dias,); -1 e infinito en días sin muestras
+    """
+    mejor_puntaje = np.full(n_dias, -1, dtype=np.int64)
+    mejor_dia_juliano = np.full(n_dias, np.inf)
+    if len(dias):
+        orden = np.lexsort((dias_julianos, -puntajes, dias))
+        primeras = orden[np.r_[True, dias[orden][1:] != dias[orden][:-1]]]
+        mejor_puntaje[dias[primeras]] = puntajes[primeras]
+        mejor_dia_juliano[dias[primeras]] = dias_julianos[primeras]
+    return mejor_puntaje, mejor_dia_juliano
+
+
+def buscar_mejores_instantes(jd_inicio: float, n_dias: int, minutos: int,
+                             activas: Optional[frozenset] = None,
+                             pesos: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Instante de mayor puntaje de cada día, con resolución de minutos.
+    
+    Args:
+        jd_inicio: Comienzo del primer día (00:00 local, en día juliano UT)
+        n_dias: Cantidad de días
+        minutos: Resolución; uno de PASOS_REFINAMIENTO
+        activas: Ids de reglas activas (ver MotorReglas.reglas_activas); None = todas
+        pesos: Pesos que reemplazan a los de PESOS (ver MotorReglas.validar_pesos)
+    
+    Returns:
+        puntuar_matriz() de los mejores instantes, uno por día y en orden
+    """
+    vector_pesos = MOTOR_REGLAS.vector_pesos(activas, pesos)
+    
+    # 1. Grilla horaria, con la muestra de las 24:00 del último día para cerrar su último intervalo
+    matriz = matriz_factores_rango(jd_inicio, jd_inicio + n_dias, 1 / 24)
+    dias_julianos = matriz.dias_julianos
+    activaciones = matriz.activaciones
+    dias = np.arange(len(dias_julianos)) // 24
+    
+    del_rango = dias < n_dias
+    mejor_puntaje, mejor_dia_juliano = _mejores_por_dia(
+        dias[del_rango], matriz.puntajes(vector_pesos)[del_rango], dias_julianos[del_rango], n_dias
+    )
+    
+    # Intervalos entre muestras consecutivas
+    inicio, fin = dias_julianos[:-1], dias_julianos[1:]
+    activaciones_inicio, activaciones_fin = activaciones[:-1], activaciones[1:]
+    dia = dias[:-1]
+    
+    for paso_actual, paso_siguiente in zip(PASOS_REFINAMIENTO, PASOS_REFINAMIENTO[1:]):
+        if paso_actual <= minutos:
+            break
+        
+        # 2. Descartar intervalos sin cambios o que no pueden mejorar su día
+        cota = np.clip(50 + np.maximum(
+            activaciones_inicio * vector_pesos, activaciones_fin * vector_pesos
+        ).sum(axis=1), 0, 100)
+        prometedor = (activaciones_inicio != activaciones_fin).any(axis=1) & (
+            (cota > mejor_puntaje[dia])
+            | ((cota == mejor_puntaje[dia]) & (inicio < mejor_dia_juliano[dia]))
+        )
+        if not prometedor.any():
+            break
+        inicio, fin, dia = inicio[prometedor], fin[prometedor], dia[prometedor]
+        activaciones_inicio = activaciones_inicio[prometedor]
+        activaciones_fin = activaciones_fin[prometedor]
+        
+        # 3. Subdividir los intervalos que quedan
+        partes = paso_actual // paso_siguiente
+        nuevos = inicio[:, None] + (fin - inicio)[:, None] * (np.arange(1, partes) / partes)
+        matriz_fina = MatrizFactores(calcular_efemerides_instantes(nuevos.ravel(), usar_cache=False))
+        
+        puntaje_fino, dia_juliano_fino = _mejores_por_dia(
+            np.repeat(dia, partes - 1), matriz_fina.puntajes(vector_pesos), nuevos.ravel(), n_dias
+        )
+        mejora = (puntaje_fino > mejor_puntaje) | (
+            (puntaje_fino == mejor_puntaje) & (dia_juliano_fino < mejor_dia_juliano)
+        )
+        mejor_puntaje[mejora] = puntaje_fino[mejora]
+        mejor_dia_juliano[mejora] = dia_juliano_fino[mejora]
+        
+        # Nuevos intervalos: [inicio, n1], [n1, n2], ..., [n_k, fin]
+        n_reglas = activaciones.shape[1]
+        puntos = np.concatenate([inicio[:, None], nuevos, fin[:, None]], axis=1)
+        activaciones_puntos = np.concatenate([
+            activaciones_inicio[:, None],
+            matriz_fina.activaciones.reshape(len(inicio), partes - 1, n_reglas),
+            activaciones_fin[:, None]
+        ], axis=1)
+        inicio, fin = puntos[:, :-1].ravel(), puntos[:, 1:].ravel()
+        activaciones_inicio = activaciones_puntos[:, :-1].reshape(-1, n_reglas)
+        activaciones_fin = activaciones_puntos[:, 1:].reshape(-1, n_reglas)
+        dia = np.repeat(dia, partes)
+    
+    # Una MatrizFactores con los instantes elegidos, para los textos de los factores
+    return puntuar_matriz(
+        MatrizFactores(calcular_efemerides_instantes(mejor_dia_juliano, usar_cache=False)),
+        activas,
+        pesos
+    )
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VENTANAS FAVORABLES (BARRIDO DE EVENTOS)
+# ═══════════════════════════════════════════════════════════════════════════════
+# Cada variable de las reglas es constante a tramos entre sus eventos: fases
+# (tabla de lunaciones), vacío de curso, Via Combusta e ingresos lunares
+# (índices de ingresos), estaciones de Mercurio y entradas/salidas de orbe de
+# los aspectos lunares (LineaTiempoAspectos). Una serie es (tiempos, valores):
+# valores[i] rige en [tiempos[i], tiempos[i+1]).
+#
+# El barrido une los tiempos de todas las series (ordenados, sin repetir) y
+# busca con searchsorted el valor de cada variable al comienzo de cada tramo;
+# con esas variables MOTOR_REGLAS da el puntaje exacto de cada tramo. El costo
+# depende de la cantidad de eventos, no de una resolución de muestreo.
+
+# Rango máximo de /ventanas en días
+DIAS_MAXIMOS_VENTANAS = 366
+
+
+def _serie_intervalos(indice: IndiceIntervalos, jd_inicio: float, jd_fin: float,
+                      valor: Callable[[Any], Any] = lambda dato: True, fuera: Any = False) -> tuple:
+    """Serie de una variable que vale valor(dato) dentro de los intervalos del índice y fuera afuera"""
+    tiempos, valores = [jd_inicio], [fuera]
+    for inicio, fin, dato in indice.en_rango(jd_inicio, jd_fin):
+        tiempos += [max(inicio, jd_inicio), fin]
+        valores += [valor(dato), fuera]
+    return np.array(tiempos), np.array(valores)
+
+
+def series_variables_puntaje(jd_inicio: float, jd_fin: float) -> Dict[str, tuple]:
+    """
+    Series (tiempos, valores) de las variables de REGLAS_PUNTAJE en [jd_inicio, jd_fin),
+    armadas solo con los índices de eventos.
+    """
+    lunaciones = tabla_lunaciones().en_rango(jd_inicio, jd_fin, principales=False)
+    tramos_signo = signos_en_rango(swe.MOON, jd_inicio, jd_fin)
+    linea = linea_tiempo_aspectos(jd_inicio, jd_fin)
+    
+    series = {
+        "creciente": (
+            np.array([jd_inicio] + [t for t, _ in lunaciones]),
+            np.array([obtener_fase_lunar(jd_inicio)["creciente"]] + [octante < 4 for _, octante in lunaciones])
+        ),
+        "vacia_curso": _serie_intervalos(periodos_vacio_de_curso(jd_inicio, jd_fin), jd_inicio, jd_fin),
+        "via_combusta": _serie_intervalos(via_combusta_en_rango(jd_inicio, jd_fin), jd_inicio, jd_fin),
+        "signo_favorable": (
+            np.array([inicio for inicio, _, _ in tramos_signo]),
+            np.array([SIGNOS[signo] in SIGNOS_FAVORABLES_LUNA for _, _, signo in tramos_signo])
+        ),
+        "mercurio_retrogrado": _serie_intervalos(
+            indice_estaciones(swe.MERCURY).retrogrados, jd_inicio, jd_fin
+        ),
+        "aspecto_sol": _serie_intervalos(
+            linea.pares[swe.SUN], jd_inicio, jd_fin, lambda dato: dato["angulo"], -1
+        )
+    }
+    for nombre, planeta in (("jupiter", swe.JUPITER), ("venus", swe.VENUS),
+                            ("marte", swe.MARS), ("saturno", swe.SATURN)):
+        series[f"aspecto_{nombre}"] = _serie_intervalos(
+            linea.pares[planeta], jd_inicio, jd_fin, lambda dato: dato["angulo"], -1
+        )
+    for planeta in SIGNIFICADORES:
+        nombre = _sin_acentos(PLANETAS[planeta].lower())
+        series[f"significador_{nombre}"] = _serie_intervalos(
+            linea.pares[planeta], jd_inicio, jd_fin, lambda dato: dato["angulo"] in ASPECTOS_FAVORABLES
+        )
+    return series
+
+
+def puntaje_por_tramos(jd_inicio: float, jd_fin: float, activas: Optional[frozenset] = None,
+                       pesos: Optional[Dict[str, int]] = None,
+                       filtro: Optional[IndiceIntervalos] = None) -> tuple:
+    """
+    Puntaje como función constante a tramos en [jd_inicio, jd_fin).
+    
+    Args:
+        activas: Ids de reglas activas (ver MotorReglas.reglas_activas); None = todas
+        pesos: Pesos que reemplazan a los de PESOS (ver MotorReglas.validar_pesos)
+        filtro: Si se indica, los tramos fuera de sus intervalos tienen puntaje -1
+    
+    Returns:
+        (inicios, puntajes): el tramo i va de inicios[i] a inicios[i+1] (el último, a jd_fin)
+    """
+    series = series_variables_puntaje(jd_inicio, jd_fin)
+    if filtro is not None:
+        series["_filtro"] = _serie_intervalos(filtro, jd_inicio, jd_fin)
+    
+    # Barrido: todos los eventos del rango, en orden y sin repetir
+    inicios = np.unique(np.concatenate([tiempos for tiempos, _ in series.values()]))
+    inicios = inicios[(inicios >= jd_inicio) & (inicios < jd_fin)]
+    
+    variables = {
+        nombre: valores[np.searchsorted(tiempos, inicios, side="right") - 1]
+        for nombre, (tiempos, valores) in series.items()
+    }
+    puntajes = np.clip(50 + MOTOR_REGLAS.activaciones(variables) @ MOTOR_REGLAS.vector_pesos(activas, pesos), 0, 100)
+    if filtro is not None:
+        puntajes = np.where(variables["_filtro"], puntajes, -1)
+    return inicios, puntajes
+
+
+def buscar_ventanas(jd_inicio: float, jd_fin: float, umbral: int,
+                    activas: Optional[frozenset] = None,
+                    pesos: Optional[Dict[str, int]] = None,
+                    filtro: Optional[IndiceIntervalos] = None) -> List[Dict[str, Any]]:
+    """
+    Intervalos maximales de [jd_inicio, jd_fin) con puntaje >= umbral.
+    
+    Returns:
+        Lista de {inicio, fin (días julianos UT), puntaje_minimo, puntaje_maximo}
+    """
+    inicios, puntajes = puntaje_por_tramos(jd_inicio, jd_fin, activas, pesos, filtro)
+    fines = np.append(inicios[1:], jd_fin)
+    
+    # Tramos consecutivos sobre el umbral forman una ventana
+    sobre = np.concatenate([[False], puntajes >= umbral, [False]])
+    comienzos = np.flatnonzero(~sobre[:-1] & sobre[1:])
+    terminos = np.flatnonzero(sobre[:-1] & ~sobre[1:])
+    
+    return [
+        {
+            "inicio": float(inicios[a]),
+            "fin": float(fines[b - 1]),
+            "puntaje_minimo": int(puntajes[a:b].min()),
+            "puntaje_maximo": int(puntajes[a:b].max())
+        }
+        for a, b in zip(comienzos.tolist(), terminos.tolist())
+    ]
+
+
+def horas_planetarias_en_rango(jd_inicio: float, jd_fin: float, lat: float, lon: float,
+                               solo_favorables: bool = False) -> IndiceIntervalos:
+    """
+    Horas planetarias que se superponen con [jd_inicio, jd_fin), en UT, desde
+    el índice del lugar. El dato de cada intervalo es el planeta regente.
+    """
+    linea = indice_horas_planetarias(lat, lon).en_rango(jd_inicio, jd_fin)
+    return linea.a_intervalos(linea.favorables() if solo_favorables else None)
+
+
+def horas_favorables_en_rango(jd_inicio: float, jd_fin: float, lat: float, lon: float) -> IndiceIntervalos:
+    """Horas planetarias favorables (Júpiter, Venus, Sol) que se superponen con [jd_inicio, jd_fin)"""
+    return horas_planetarias_en_rango(jd_inicio, jd_fin, lat, lon, solo_favorables=True)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONSULTAS DE RESTRICCIONES
+# ═══════════════════════════════════════════════════════════════════════════════
+# Una consulta combina predicados con Y/O/NO (o AND/OR/NOT) y paréntesis, ej:
+#   luna_creciente Y NO luna_vacia_curso Y mercurio_directo Y hora_jupiter Y laborable
+# NO tiene la mayor precedencia y luego Y, O.
+#
+# Cada predicado es un IndiceIntervalos del rango (UT) y los operadores son las
+# mezclas lineales de IndiceIntervalos (union, interseccion, complemento), así
+# que el costo depende de la cantidad de intervalos y no de la duración del
+# rango ni de una resolución de muestreo.
+#
+# Predicados:
+# - Ids de REGLAS_PUNTAJE (ver /reglas): se cumple la condición de la regla
+# - hora_<planeta> (hora_jupiter, hora_sol, ...) y hora_favorable
+# - lunes ... domingo, laborable y fin_de_semana (día local del lugar)
+
+OPERADORES_CONSULTA = {"Y": "y", "AND": "y", "O": "o", "OR": "o", "NO": "no", "NOT": "no"}
+
+DIAS_CONSULTA = {_sin_acentos(dia.lower()): [numero] for numero, dia in enumerate(DIAS_SEMANA)}
+DIAS_CONSULTA["laborable"] = [0, 1, 2, 3, 4]
+DIAS_CONSULTA["fin_de_semana"] = [5, 6]
+
+HORAS_CONSULTA = {f"hora_{_sin_acentos(planeta.lower())}": planeta for planeta in ORDEN_HORAS_PLANETARIAS}
+
+# Condición (variable, valor) de cada regla
+CONDICIONES_REGLAS = {regla["id"]: regla["si"] for regla in REGLAS_PUNTAJE}
+
+PREDICADOS_CONSULTA = (
+    list(CONDICIONES_REGLAS)
+    + list(HORAS_CONSULTA) + ["hora_favorable"]
+    + list(DIAS_CONSULTA)
+)
+
+
+class ConsultaRestricciones:
+    """
+    Expresión booleana de predicados, analizada una vez y evaluable sobre
+    cualquier rango y lugar.
+    
+    El árbol es de tuplas: ("predicado", nombre), ("no", a), ("y", a, b), ("o", a, b).
+    """
+    
+    def __init__(self, expresion: str):
+        """
+        Args:
+            expresion: Texto de la consulta
+        
+        Raises:
+            ValueError: Si la sintaxis es inválida o un predicado no existe
+        """
+        self.expresion = expresion
+        self._tokens = re.findall(r"\(|\)|[^\s()]+", expresion)
+        self._posicion = 0
+        if not self._tokens:
+            raise ValueError("La consulta está vacía")
+        self.arbol = self._disyuncion()
+        if self._posicion < len(self._tokens):
+            raise ValueError(f"Símbolo inesperado: {self._tokens[self._posicion]}")
+    
+    # ── Análisis sintáctico (descenso recursivo) ──
+    
+    def _siguiente(self) -> Optional[str]:
+        if self._posicion < len(self._tokens):
+            return self._tokens[self._posicion]
+        return None
+    
+    def _operador(self, operador: str) -> bool:
+        """Consume el siguiente token si es el operador indicado"""
+        token = self._siguiente()
+        if token is not None and OPERADORES_CONSULTA.get(token.upper()) == operador:
+            self._posicion += 1
+            return True
+        return False
+    
+    def _disyuncion(self) -> tuple:
+        arbol = self._conjuncion()
+        while self._operador("o"):
+            arbol = ("o", arbol, self._conjuncion())
+        return arbol
+    
+    def _conjuncion(self) -> tuple:
+        arbol = self._negacion()
+        while self._operador("y"):
+            arbol = ("y", arbol, self._negacion())
+        return arbol
+    
+    def _negacion(self) -> tuple:
+        if self._operador("no"):
+            return ("no", self._negacion())
+        token = self._siguiente()
+        if token is None:
+            raise ValueError("La consulta termina de forma inesperada")
+        self._posicion += 1
+        if token == "(":
+            arbol = self._disyuncion()
+            if self._siguiente() != ")":
+                raise ValueError("Falta cerrar un paréntesis")
+            self._posicion += 1
+            return arbol
+        if token == ")" or token.upper() in OPERADORES_CONSULTA:
+            raise ValueError(f"Símbolo inesperado: {token}")
+        nombre = token.lower()
+        if nombre not in PREDICADOS_CONSULTA:
+            raise ValueError(f"Predicado desconocido: {token}. Opciones: {PREDICADOS_CONSULTA}")
+        return ("predicado", nombre)
+    
+    # ── Evaluación ──
+    
+    def evaluar(self, jd_inicio: float, jd_fin: float, lat: float, lon: float) -> IndiceIntervalos:
+        """
+        Intervalos de [jd_inicio, jd_fin) (UT) en que la consulta es verdadera.
+        
+        Las series de las reglas y las horas planetarias se calculan una sola
+        vez por evaluación y solo si algún predicado las usa.
+        """
+        rango = IndiceIntervalos([(jd_inicio, jd_fin)])
+        calculados = {}
+        
+        def series():
+            if "series" not in calculados:
+                calculados["series"] = series_variables_puntaje(jd_inicio, jd_fin)
+            return calculados["series"]
+        
+        def horas():
+            if "horas" not in calculados:
+                calculados["horas"] = horas_planetarias_en_rango(jd_inicio, jd_fin, lat, lon)
+            return calculados["horas"]
+        
+        def predicado(nombre: str) -> IndiceIntervalos:
+            if nombre in HORAS_CONSULTA or nombre == "hora_favorable":
+                planetas = [HORAS_CONSULTA[nombre]] if nombre in HORAS_CONSULTA else PLANETAS_FAVORABLES_HORAS
+                indice = IndiceIntervalos([
+                    (inicio, fin) for inicio, fin, planeta in horas() if planeta in planetas
+                ])
+            elif nombre in DIAS_CONSULTA:
+                indice = dias_semana_en_rango(jd_inicio, jd_fin, lon, DIAS_CONSULTA[nombre])
+            else:
+                variable, valor = CONDICIONES_REGLAS[nombre]
+                tiempos, valores = series()[variable]
+                dentro = tiempos < jd_fin
+                indice = IndiceIntervalos.desde_serie(tiempos[dentro], valores[dentro] == valor, jd_fin)
+            return indice.interseccion(rango)
+        
+        def evaluar_arbol(arbol: tuple) -> IndiceIntervalos:
+            if arbol[0] == "predicado":
+                if arbol[1] not in calculados:
+                    calculados[arbol[1]] = predicado(arbol[1])
+                return calculados[arbol[1]]
+            if arbol[0] == "no":
+                return evaluar_arbol(arbol[1]).complemento(jd_inicio, jd_fin)
+            izquierda, derecha = evaluar_arbol(arbol[1]), evaluar_arbol(arbol[2])
+            if arbol[0] == "y":
+                return izquierda.interseccion(derecha)
+            return izquierda.union(derecha)
+        
+        return evaluar_arbol(self.arbol)
+
+
+def dias_semana_en_rango(jd_inicio: float, jd_fin: float, lon: float, dias: List[int]) -> IndiceIntervalos:
+    """
+    Días locales (hora local aproximada) de [jd_inicio, jd_fin) cuyo día de la
+    semana (0 = lunes) está en dias.
+    """
+    desfase = desfase_horario(lon) / 24
+    # La medianoche N + 0.5 abre el día civil del mediodía N + 1; el JD 0 fue lunes
+    primera = math.floor(jd_inicio + desfase - 0.5) + 0.5
+    medianoches = np.arange(primera, jd_fin + desfase, 1.0)
+    dia_semana = (medianoches + 0.5).astype(np.int64) % 7
+    return IndiceIntervalos.desde_serie(medianoches - desfase, np.isin(dia_semana, dias), jd_fin)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GEOCODIFICACIÓN SIN CONEXIÓN (NOMENCLÁTOR DE CIUDADES)
+# ═══════════════════════════════════════════════════════════════════════════════
+# datos/ciudades.tsv sigue el formato de columnas del volcado "cities" de
+# GeoNames, separado por tabuladores: geonameid, name, asciiname,
+# alternatenames, latitude, longitude, feature class, feature code, country
+# code, cc2, admin1-4, population, elevation, dem, timezone, modification date.
+# El archivo incluido es un extracto (capitales regionales del Perú y ciudades
+# principales, ids locales); AE_ARCHIVO_CIUDADES puede apuntar a un volcado
+# completo de GeoNames (ej: cities15000.txt) sin cambiar el código.
+#
+# El nomenclátor se carga una sola vez en arreglos y dos índices:
+# - Nombres: claves normalizadas (sin acentos ni signos, en minúsculas)
+#   ordenadas, así que la búsqueda exacta o por prefijo es una búsqueda
+#   binaria. Si no hay coincidencias se comparan trigramas (errores de tipeo).
+# - Árbol k-d sobre vectores unitarios (x, y, z) para la ciudad más cercana a
+#   unas coordenadas, sin casos especiales en el antimeridiano ni en los polos.
+
+RUTA_CIUDADES = os.environ.get(
+    "AE_ARCHIVO_CIUDADES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos", "ciudades.tsv")
+)
+
+# Similitud mínima de trigramas (coeficiente de Dice) para una coincidencia aproximada
+SIMILITUD_MINIMA_TRIGRAMAS = 0.5
+
+# Claves revisadas como máximo en una búsqueda por prefijo (prefijos muy cortos)
+MAXIMO_CLAVES_PREFIJO = 2000
+
+# Resultados máximos de /geocodificar
+MAXIMO_RESULTADOS_GEOCODIFICAR = 20
+
+RADIO_TIERRA_KM = 6371.0
+
+# Nombres de país aceptados después de la coma ("Cusco, Perú"); también vale el código ISO
+PAISES = {
+    "PE": ["Perú", "Peru"], "CO": ["Colombia"], "EC": ["Ecuador"], "BO": ["Bolivia"],
+    "CL": ["Chile"], "AR": ["Argentina"], "UY": ["Uruguay"], "PY": ["Paraguay"],
+    "VE": ["Venezuela"], "MX": ["México", "Mexico"], "GT": ["Guatemala"],
+    "SV": ["El Salvador"], "HN": ["Honduras"], "NI": ["Nicaragua"], "CR": ["Costa Rica"],
+    "PA": ["Panamá", "Panama"], "CU": ["Cuba"], "DO": ["República Dominicana", "Dominican Republic"],
+    "PR": ["Puerto Rico"], "BR": ["Brasil", "Brazil"], "ES": ["España", "Spain"],
+    "PT": ["Portugal"], "FR": ["Francia", "France"], "GB": ["Reino Unido", "United Kingdom", "Inglaterra"],
+    "IE": ["Irlanda", "Ireland"], "IT": ["Italia", "Italy"], "DE": ["Alemania", "Germany"],
+    "NL": ["Países Bajos", "Holanda", "Netherlands"], "BE": ["Bélgica", "Belgium"],
+    "AT": ["Austria"], "CH": ["Suiza", "Switzerland"], "SE": ["Suecia", "Sweden"],
+    "NO": ["Noruega", "Norway"], "DK": ["Dinamarca", "Denmark"], "FI": ["Finlandia", "Finland"],
+    "PL": ["Polonia", "Poland"], "CZ": ["Chequia", "República Checa", "Czechia"],
+    "GR": ["Grecia", "Greece"], "RU": ["Rusia", "Russia"], "TR": ["Turquía", "Turkey"],
+    "US": ["Estados Unidos", "EEUU", "EE UU", "USA", "United States"], "CA": ["Canadá", "Canada"],
+    "JP": ["Japón", "Japan"], "CN": ["China"], "KR": ["Corea del Sur", "South Korea"],
+    "IN": ["India"], "SG": ["Singapur", "Singapore"], "AE": ["Emiratos Árabes Unidos", "UAE"],
+    "IL": ["Israel"], "AU": ["Australia"], "NZ": ["Nueva Zelanda", "New Zealand"],
+    "EG": ["Egipto", "Egypt"], "ZA": ["Sudáfrica", "South Africa"], "NG": ["Nigeria"],
+    "KE": ["Kenia", "Kenya"], "MA": ["Marruecos", "Morocco"]
+}
+
+
+def normalizar_nombre(texto: str) -> str:
+    """Clave de búsqueda: sin acentos ni signos, en minúsculas y con espacios simples"""
+    sin_acentos = "".join(
+        caracter for caracter in unicodedata.normalize("NFKD", texto)
+        if not unicodedata.combining(caracter)
+    )
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", sin_acentos.lower()).split())
+
+
+# Nombre normalizado de país -> código ISO
+CODIGOS_PAISES = {
+    normalizar_nombre(nombre): codigo for codigo, nombres in PAISES.items() for nombre in nombres
+}
+
+
+def _trigramas(clave: str) -> set:
+    """Trigramas de una clave, con bordes marcados para que pesen el inicio y el fin"""
+    marcada = f"  {clave} "
+    return {marcada[i:i + 3] for i in range(len(marcada) - 2)}
+
+
+def _vector_unitario(latitud: float, longitud: float) -> tuple:
+    lat, lon = math.radians(latitud), math.radians(longitud)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+class Nomenclator:
+    """
+    Ciudades de un archivo con formato GeoNames, en arreglos, con índice de
+    nombres (prefijos y trigramas) y árbol k-d para búsqueda inversa.
+    """
+    
+    def __init__(self, ruta: str):
+        nombres, paises, zonas, latitudes, longitudes, poblaciones = [], [], [], [], [], []
+        pares = set()
+        with open(ruta, encoding="utf-8") as archivo:
+            for linea in archivo:
+                if not linea.strip() or linea.startswith("#"):
+                    continue
+                campos = linea.rstrip("\n").split("\t")
+                i = len(nombres)
+                nombres.append(campos[1])
+                latitudes.append(float(campos[4]))
+                longitudes.append(float(campos[5]))
+                paises.append(campos[8])
+                poblaciones.append(int(campos[14] or 0))
+                zonas.append(campos[17])
+                for nombre in [campos[1], campos[2]] + campos[3].split(","):
+                    clave = normalizar_nombre(nombre)
+                    if clave:
+                        pares.add((clave, i))
+        
+        self.nombres = nombres
+        self.claves_nombre = [normalizar_nombre(nombre) for nombre in nombres]
+        self.zonas = zonas
+        self.paises = np.array(paises)
+        self.latitudes = np.array(latitudes, dtype=np.float64)
+        self.longitudes = np.array(longitudes, dtype=np.float64)
+        self.poblaciones = np.array(poblaciones, dtype=np.int64)
+        
+        # Índice de nombres: las ciudades de claves[j] son
+        # ciudades_clave[desde_clave[j]:desde_clave[j + 1]], de mayor a menor población
+        ordenados = sorted(pares, key=lambda par: (par[0], -poblaciones[par[1]]))
+        self.claves: List[str] = []
+        desde = []
+        for posicion, (clave, _) in enumerate(ordenados):
+            if not self.claves or self.claves[-1] != clave:
+                self.claves.append(clave)
+                desde.append(posicion)
+        desde.append(len(ordenados))
+        self.ciudades_clave = np.array([i for _, i in ordenados], dtype=np.int32)
+        self.desde_clave = np.array(desde, dtype=np.int32)
+        
+        # Trigrama -> claves que lo contienen
+        por_trigrama: Dict[str, List[int]] = {}
+        self.trigramas_clave = np.zeros(len(self.claves), dtype=np.int32)
+        for j, clave in enumerate(self.claves):
+            trigramas = _trigramas(clave)
+            self.trigramas_clave[j] = len(trigramas)
+            for trigrama in trigramas:
+                por_trigrama.setdefault(trigrama, []).append(j)
+        self.indice_trigramas = {trigrama: np.array(js, dtype=np.int32) for trigrama, js in por_trigrama.items()}
+        
+        # Árbol k-d implícito: el nodo del tramo [a, b) de arbol está en (a + b) // 2
+        # y divide por el eje profundidad % 3
+        self.puntos = [_vector_unitario(lat, lon) for lat, lon in zip(latitudes, longitudes)]
+        self.arbol = np.arange(len(nombres), dtype=np.int32)
+        coordenadas = np.array(self.puntos).reshape(-1, 3)
+        pendientes = [(0, len(nombres), 0)]
+        while pendientes:
+            a, b, profundidad = pendientes.pop()
+            if b - a <= 1:
+                continue
+            medio = (a + b) // 2
+            tramo = self.arbol[a:b]
+            self.arbol[a:b] = tramo[np.argpartition(coordenadas[tramo, profundidad % 3], medio - a)]
+            pendientes += [(a, medio, profundidad + 1), (medio + 1, b, profundidad + 1)]
     
-    aspecto_sol_luna = calcular_aspecto(dia_juliano, swe.SUN, swe.MOON)
-    if aspecto_sol_luna:
-        if aspecto_sol_luna["aspecto"] in ["Trígono", "Sextil"]:
-            puntaje += PESOS["sol_trigono_luna"]
-            factores.append({
-                "texto": f"☉ {aspecto_sol_luna['simbolo']} ☽",
-                "tipo": "positive"
-            })
+    def __len__(self) -> int:
+        return len(self.nombres)
     
-    # ═══════════════════════════════════════════════════════════════════════
-    # Asegurar que el puntaje esté entre 0 y 100
-    # ═══════════════════════════════════════════════════════════════════════
+    def ciudad(self, i: int) -> Dict[str, Any]:
+        """Datos públicos de una ciudad"""
+        return {
+            "nombre": self.nombres[i],
+            "pais": str(self.paises[i]),
+            "latitud": float(self.latitudes[i]),
+            "longitud": float(self.longitudes[i]),
+            "poblacion": int(self.poblaciones[i]),
+            "zona_horaria": self.zonas[i]
+        }
     
-    puntaje = max(0, min(100, puntaje))
+    def _ciudades_de(self, claves: List[int]) -> List[int]:
+        """Ciudades de varias claves, sin repetir, en el orden de las claves"""
+        vistas, ciudades = set(), []
+        for j in claves:
+            for i in self.ciudades_clave[self.desde_clave[j]:self.desde_clave[j + 1]].tolist():
+                if i not in vistas:
+                    vistas.add(i)
+                    ciudades.append(i)
+        return ciudades
     
-    # Determinar nivel según puntaje
-    if puntaje >= 80:
-        nivel = "excellent"
-    elif puntaje >= 60:
-        nivel = "good"
-    elif puntaje >= 40:
-        nivel = "caution"
-    else:
-        nivel = "avoid"
+    def _por_poblacion(self, ciudades: List[int], prefijo: str = "") -> List[int]:
+        """De mayor a menor población, primero las que tienen el prefijo en el nombre principal"""
+        return sorted(ciudades, key=lambda i: (not self.claves_nombre[i].startswith(prefijo), -self.poblaciones[i]))
     
-    return {
-        "puntaje": puntaje,
-        "nivel": nivel,
-        "factores": factores
-    }
+    def buscar(self, texto: str, limite: int = 5) -> List[Dict[str, Any]]:
+        """
+        Ciudades que coinciden con un texto ("Cusco", "Cusco, Perú", "cusc").
+        
+        Primero coincidencias exactas, si no hay por prefijo y si no hay
+        aproximadas por trigramas; dentro de cada grupo, de mayor a menor
+        población. Lo que sigue a la primera coma filtra por país cuando es
+        un país conocido (nombre o código ISO).
+        
+        Returns:
+            Lista de ciudades (ver ciudad()) con "coincidencia": exacta, prefijo o aproximada
+        """
+        nombre, _, resto = texto.partition(",")
+        clave = normalizar_nombre(nombre)
+        if not clave:
+            return []
+        pais = resto.strip().upper() if resto.strip().upper() in PAISES else CODIGOS_PAISES.get(normalizar_nombre(resto))
+        
+        def filtrar(ciudades: List[int]) -> List[int]:
+            return [i for i in ciudades if pais is None or self.paises[i] == pais]
+        
+        # Exacta
+        j = bisect_left(self.claves, clave)
+        if j < len(self.claves) and self.claves[j] == clave:
+            ciudades = filtrar(self._ciudades_de([j]))
+            if ciudades:
+                return self._resultados(self._por_poblacion(ciudades), "exacta", limite)
+        
+        # Prefijo
+        fin = j
+        while fin < len(self.claves) and fin - j < MAXIMO_CLAVES_PREFIJO and self.claves[fin].startswith(clave):
+            fin += 1
+        ciudades = filtrar(self._ciudades_de(list(range(j, fin))))
+        if ciudades:
+            return self._resultados(self._por_poblacion(ciudades, clave), "prefijo", limite)
+        
+        # Aproximada: coeficiente de Dice entre trigramas
+        trigramas = [self.indice_trigramas[t] for t in _trigramas(clave) if t in self.indice_trigramas]
+        if not trigramas:
+            return []
+        comunes = np.bincount(np.concatenate(trigramas), minlength=len(self.claves))
+        similitud = 2 * comunes / (len(_trigramas(clave)) + self.trigramas_clave)
+        candidatas = np.flatnonzero(similitud >= SIMILITUD_MINIMA_TRIGRAMAS)
+        candidatas = candidatas[np.argsort(-similitud[candidatas], kind="stable")]
+        return self._resultados(filtrar(self._ciudades_de(candidatas.tolist())), "aproximada", limite)
+    
+    def _resultados(self, ciudades: List[int], coincidencia: str, limite: int) -> List[Dict[str, Any]]:
+        return [dict(self.ciudad(i), coincidencia=coincidencia) for i in ciudades[:limite]]
+    
+    def mas_cercana(self, latitud: float, longitud: float) -> Dict[str, Any]:
+        """Ciudad más cercana a unas coordenadas, con su distancia_km (círculo máximo)"""
+        if not self.nombres:
+            raise ValueError("El nomenclátor está vacío")
+        objetivo = _vector_unitario(latitud, longitud)
+        arbol, puntos = self.arbol, self.puntos
+        mejor, mejor_distancia = -1, math.inf
+        
+        pendientes = [(0, len(arbol), 0)]
+        while pendientes:
+            a, b, profundidad = pendientes.pop()
+            if a >= b:
+                continue
+            medio = (a + b) // 2
+            i = int(arbol[medio])
+            punto = puntos[i]
+            distancia = ((punto[0] - objetivo[0]) ** 2 + (punto[1] - objetivo[1]) ** 2
+                         + (punto[2] - objetivo[2]) ** 2)
+            if distancia < mejor_distancia:
+                mejor, mejor_distancia = i, distancia
+            eje = profundidad % 3
+            diferencia = objetivo[eje] - punto[eje]
+            cerca, lejos = ((a, medio), (medio + 1, b)) if diferencia < 0 else ((medio + 1, b), (a, medio))
+            # El lado lejano solo se revisa si el plano de corte está más cerca que el mejor
+            # (se apila primero para visitar antes el lado cercano)
+            if diferencia * diferencia < mejor_distancia:
+                pendientes.append((*lejos, profundidad + 1))
+            pendientes.append((*cerca, profundidad + 1))
+        
+        cuerda = math.sqrt(mejor_distancia)
+        return dict(self.ciudad(mejor), distancia_km=round(2 * math.asin(min(cuerda / 2, 1.0)) * RADIO_TIERRA_KM, 1))
 
 
-def obtener_mejores_horas(fecha: datetime, lat: float, lon: float) -> List[str]:
+_NOMENCLATOR: Optional[Nomenclator] = None
+_NOMENCLATOR_CANDADO = threading.Lock()
+
+
+def obtener_nomenclator() -> Nomenclator:
+    """Carga el nomenclátor de RUTA_CIUDADES la primera vez que se necesita"""
+    global _NOMENCLATOR
+    if _NOMENCLATOR is None:
+        with _NOMENCLATOR_CANDADO:
+            if _NOMENCLATOR is None:
+                _NOMENCLATOR = Nomenclator(RUTA_CIUDADES)
+    return _NOMENCLATOR
+
+
+def geocodificar(texto: str, aproximada: bool = True) -> Dict[str, Any]:
     """
-    Obtiene las mejores horas del día para iniciar el proyecto.
+    Ciudad más probable para un texto (ver Nomenclator.buscar).
     
-    Las horas de Júpiter, Venus y Sol son las más favorables.
+    Args:
+        texto: Nombre de la ciudad, opcionalmente con el país después de una coma
+        aproximada: Si es False solo valen coincidencias exactas o por prefijo;
+                    las aproximadas (trigramas) se devuelven como sugerencias
+                    en el error, para no usar en silencio otra ciudad
     
-    Returns:
-        Lista de strings con las mejores horas
+    Raises:
+        ValueError: Si ninguna ciudad coincide
     """
-    horas = obtener_horas_planetarias(fecha, lat, lon)
-    mejores = []
-    
-    for h in horas:
-        if h["favorable"] and h["tipo"] == "diurna":
-            mejores.append(f"{h['hora_inicio']} - {h['hora_fin']} (Hora de {h['planeta']})")
-    
-    return mejores[:3]  # Máximo 3 horas
+    resultados = obtener_nomenclator().buscar(texto)
+    if not resultados:
+        raise ValueError(f"Ciudad no encontrada: {texto}")
+    if not aproximada and resultados[0]["coincidencia"] == "aproximada":
+        sugerencias = ", ".join(f"{ciudad['nombre']}, {ciudad['pais']}" for ciudad in resultados)
+        raise ValueError(f"Ciudad no encontrada: {texto}. Sugerencias: {sugerencias}")
+    return resultados[0]
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # ENDPOINTS DE LA API
 # ═══════════════════════════════════════════════════════════════════════════════
 
+def precalcular_indices():
+    """Construye los índices de eventos 1900-2100 (búsquedas de varios segundos)"""
+    tabla_lunaciones()
+    for planeta in PLANETAS_ESTACIONES:
+        indice_estaciones(planeta)
+
+
+def iniciar_precalculo():
+    """
+    Al arrancar, los índices de eventos se construyen en un hilo aparte: la
+    primera petición no carga con la búsqueda de 200 años, y si llega antes
+    de que termine espera en el candado del índice en lugar de repetirla.
+    """
+    threading.Thread(target=precalcular_indices, name="precalculo-indices", daemon=True).start()
+
+
 @app.get("/")
 def raiz():
     """Endpoint raíz con información de la API"""
@@ -760,8 +4293,19 @@ def raiz():
         "motor": "Swiss Ephemeris",
         "endpoints": {
             "/calcular": "POST - Calcular mejores fechas",
+            "/calcular-comparativo": "POST - Mejores fechas de varios tipos de proyecto a la vez",
+            "/reglas": "GET - Reglas de puntuación y sus pesos",
             "/horas-planetarias/{fecha}": "GET - Horas planetarias del día",
-            "/info-luna/{fecha}": "GET - Información lunar del día"
+            "/info-luna/{fecha}": "GET - Información lunar del día",
+            "/retrogrados/{fecha}": "GET - Planetas retrógrados y períodos de sombra",
+            "/aspectos-luna": "GET - Aspectos de la Luna (orbe y momento exacto) en un rango",
+            "/vacio-de-curso/{anio}/{mes}": "GET - Períodos de Luna vacía de curso del mes",
+            "/hora-planetaria": "GET - Hora planetaria en curso en un instante",
+            "/geocodificar": "GET - Coordenadas de una ciudad (nomenclátor local)",
+            "/geocodificar/inverso": "GET - Ciudad más cercana a unas coordenadas",
+            "/ventanas": "GET - Intervalos con puntaje mayor o igual a un umbral",
+            "/consultar": "GET - Intervalos en que se cumple una consulta Y/O/NO de factores",
+            "/metricas/cache": "GET - Estadísticas del caché de efemérides"
         }
     }
 
@@ -769,7 +4313,119 @@ def raiz():
 @app.get("/salud")
 def verificar_salud():
     """Verificación de salud de la API"""
-    return {"estado": "saludable", "version": "1.0.0"}
+    tabla = obtener_tabla_efemerides()
+    return {
+        "estado": "saludable",
+        "version": "1.0.0",
+        "modo_efemerides": MODO_EFEMERIDES,
+        "tabla_efemerides": tabla.descripcion() if tabla else None
+    }
+
+
+@app.get("/metricas/cache")
+def obtener_metricas_cache():
+    """Aciertos, fallos y desalojos del caché de efemérides (para dimensionarlo)"""
+    return CACHE_EFEMERIDES.estadisticas()
+
+
+@app.get("/reglas")
+def listar_reglas():
+    """Reglas de puntuación (ids para reglas_desactivadas) con su peso y tipo"""
+    return {
+        "reglas": [
+            {
+                "id": regla["id"],
+                "peso": MOTOR_REGLAS.pesos[regla["id"]],
+                "tipo": regla["tipo"],
+                "condicion": {"variable": regla["si"][0], "valor": regla["si"][1]}
+            }
+            for regla in REGLAS_PUNTAJE
+        ]
+    }
+
+
+def _resolver_lugares(solicitud: BaseModel) -> Dict[str, Any]:
+    """
+    Completa las coordenadas que no se enviaron a partir de los nombres de
+    lugar, con el nomenclátor local.
+    
+    - ubicacion: solo si se envió y no se enviaron latitud ni longitud
+      (sin ubicacion se mantienen los valores por defecto de Lima)
+    - ubicaciones[]: las que no traen latitud/longitud se buscan por nombre
+    - ciudad_nacimiento: se geocodifica si se envió; solo es informativa,
+      así que si no se encuentra lugar_nacimiento queda en None
+    
+    Solo se aceptan coincidencias exactas o por prefijo: un error de tipeo
+    no debe calcular con las coordenadas de otra ciudad.
+    
+    Returns:
+        {"lugar": ciudad o None, "lugar_nacimiento": ciudad o None}
+    
+    Raises:
+        ValueError: Si ubicacion o una de ubicaciones[] no se encuentra
+                    (con sugerencias si hay coincidencias aproximadas)
+    """
+    campos = solicitud.model_fields_set
+    lugar = None
+    if "ubicacion" in campos and solicitud.ubicacion and not {"latitud", "longitud"} & campos:
+        lugar = geocodificar(solicitud.ubicacion, aproximada=False)
+        solicitud.latitud, solicitud.longitud = lugar["latitud"], lugar["longitud"]
+    
+    for ubicacion in getattr(solicitud, "ubicaciones", None) or []:
+        if ubicacion.latitud is None or ubicacion.longitud is None:
+            if not ubicacion.nombre:
+                raise ValueError("Cada ubicación necesita latitud y longitud, o un nombre para geocodificar")
+            ciudad = geocodificar(ubicacion.nombre, aproximada=False)
+            ubicacion.latitud, ubicacion.longitud = ciudad["latitud"], ciudad["longitud"]
+    
+    lugar_nacimiento = None
+    ciudad_nacimiento = getattr(solicitud, "ciudad_nacimiento", None)
+    if ciudad_nacimiento:
+        try:
+            lugar_nacimiento = geocodificar(ciudad_nacimiento, aproximada=False)
+        except ValueError:
+            pass
+    
+    return {"lugar": lugar, "lugar_nacimiento": lugar_nacimiento}
+
+
+def _rango_fechas(fecha_desde: str, fecha_hasta: str, dias_maximos: int = DIAS_MAXIMOS_RANGO) -> tuple:
+    """(fecha inicial, cantidad de días) de una solicitud, limitado a dias_maximos"""
+    desde = datetime.strptime(fecha_desde, "%Y-%m-%d")
+    hasta = datetime.strptime(fecha_hasta, "%Y-%m-%d")
+    
+    # Limitar rango (por rendimiento)
+    if (hasta - desde).days > dias_maximos:
+        hasta = desde + timedelta(days=dias_maximos)
+    
+    return desde, (hasta - desde).days + 1
+
+
+def _resultado_fecha(fecha: datetime, analisis: Dict[str, Any], lat: float, lon: float) -> ResultadoFecha:
+    """ResultadoFecha de un día con su análisis (puntaje, nivel, factores, instante) y sus mejores horas"""
+    # Instante evaluado, redondeado al minuto
+    instante = dia_juliano_a_datetime(round(analisis["instante"] * 1440) / 1440)
+    
+    # Si el nivel es "avoid", no mostrar horas
+    if analisis["nivel"] == "avoid":
+        mejores_horas = []
+    elif analisis["nivel"] == "caution":
+        mejores_horas = ["⚠️ Si es urgente, evitar horas de Marte y Saturno"]
+    else:
+        mejores_horas = obtener_mejores_horas(fecha, lat, lon)
+    
+    return ResultadoFecha(
+        dia=fecha.day,
+        dia_semana=DIAS_SEMANA[fecha.weekday()],
+        mes=f"{MESES[fecha.month]} {fecha.year}",
+        fecha_completa=fecha.strftime("%Y-%m-%d"),
+        puntaje=analisis["puntaje"],
+        nivel=analisis["nivel"],
+        factores=analisis["factores"],
+        mejores_horas=mejores_horas,
+        hora_utc=instante.strftime("%H:%M"),
+        hora_local=(instante + timedelta(hours=desfase_horario(lon))).strftime("%H:%M")
+    )
 
 
 @app.post("/calcular", response_model=RespuestaElectiva)
@@ -784,20 +4440,64 @@ def calcular_electiva(solicitud: SolicitudElectiva):
     - fecha_hasta: Fecha de fin del rango (YYYY-MM-DD)
     - ubicacion: Ciudad donde se lanzará (opcional)
     - latitud/longitud: Coordenadas (opcional)
+    - ubicaciones: Otros lugares [{nombre, latitud, longitud}] (opcional)
+    - resolucion: diaria (12:00 UT), horaria, 15min o 1min (mejor instante de cada día local)
+    
+    RANGO MÁXIMO (se recorta fecha_hasta):
+    - Motor vectorizado, resolución diaria: DIAS_MAXIMOS_RANGO (3660 días)
+    - Motor escalar: DIAS_MAXIMOS_RANGO_ESCALAR (366 días)
+    - Resolución horaria, 15min o 1min: DIAS_MAXIMOS_RANGO_SUBDIARIO (366 días)
+    - k: Cantidad de fechas a devolver (1-100, default 10)
+    - modo: completo o rapido (descarta sin calcular todos los aspectos los
+      días que ya no pueden entrar al top k; mismo resultado)
     
     RETORNA:
-    - Lista de las 10 mejores fechas ordenadas por puntaje
+    - Lista de las k mejores fechas (default 10) ordenadas por puntaje;
+      a igual puntaje, la fecha anterior primero
     - Factores astrológicos de cada fecha
     - Mejores horas para cada día
+    - Con ubicaciones: las mismas fechas con las mejores horas de cada lugar
+      (el puntaje es geocéntrico y se calcula una sola vez)
     """
     try:
-        # Parsear fechas
-        fecha_desde = datetime.strptime(solicitud.fecha_desde, "%Y-%m-%d")
-        fecha_hasta = datetime.strptime(solicitud.fecha_hasta, "%Y-%m-%d")
+        if solicitud.motor not in MOTORES_PUNTAJE:
+            raise HTTPException(status_code=400, detail=f"Motor desconocido: {solicitud.motor}. Opciones: {MOTORES_PUNTAJE}")
+        
+        if solicitud.resolucion not in RESOLUCIONES:
+            raise HTTPException(status_code=400, detail=f"Resolución desconocida: {solicitud.resolucion}. Opciones: {list(RESOLUCIONES)}")
+        minutos = RESOLUCIONES[solicitud.resolucion]
+        if minutos is not None and solicitud.motor != "vectorizado":
+            raise HTTPException(status_code=400, detail="La resolución menor a un día requiere el motor vectorizado")
+        
+        if minutos is not None:
+            dias_maximos = DIAS_MAXIMOS_RANGO_SUBDIARIO
+        elif solicitud.motor == "vectorizado":
+            dias_maximos = DIAS_MAXIMOS_RANGO
+        else:
+            dias_maximos = DIAS_MAXIMOS_RANGO_ESCALAR
+        fecha_desde, n_dias = _rango_fechas(solicitud.fecha_desde, solicitud.fecha_hasta, dias_maximos)
         
-        # Limitar rango a 60 días máximo (por rendimiento)
-        if (fecha_hasta - fecha_desde).days > 60:
-            fecha_hasta = fecha_desde + timedelta(days=60)
+        if len(solicitud.ubicaciones or []) > MAXIMO_UBICACIONES:
+            raise HTTPException(status_code=400, detail=f"Máximo {MAXIMO_UBICACIONES} ubicaciones por solicitud")
+        
+        try:
+            lugares = _resolver_lugares(solicitud)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        if not 1 <= solicitud.k <= MAXIMO_K:
+            raise HTTPException(status_code=400, detail=f"k debe estar entre 1 y {MAXIMO_K}")
+        
+        if solicitud.modo not in MODOS_BUSQUEDA:
+            raise HTTPException(status_code=400, detail=f"Modo desconocido: {solicitud.modo}. Opciones: {MODOS_BUSQUEDA}")
+        if solicitud.modo == "rapido" and (solicitud.motor != "vectorizado" or minutos is not None):
+            raise HTTPException(status_code=400, detail="El modo rapido requiere el motor vectorizado y resolución diaria")
+        
+        try:
+            activas = MOTOR_REGLAS.reglas_activas(solicitud.reglas_desactivadas)
+            pesos = MOTOR_REGLAS.validar_pesos(solicitud.pesos)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Obtener información del tipo de proyecto
         info_proyecto = TIPOS_PROYECTO.get(
@@ -805,70 +4505,115 @@ def calcular_electiva(solicitud: SolicitudElectiva):
             TIPOS_PROYECTO["otro"]
         )
         
-        resultados = []
-        fecha_actual = fecha_desde
-        
-        # Analizar cada día del rango
-        while fecha_actual <= fecha_hasta:
-            # Calcular día juliano para mediodía
-            dia_juliano = obtener_dia_juliano(
-                fecha_actual.year,
-                fecha_actual.month,
-                fecha_actual.day,
-                12.0
+        # Modo rápido: poda de los días que no pueden entrar al top k
+        if solicitud.modo == "rapido":
+            jd_desde = obtener_dia_juliano(fecha_desde.year, fecha_desde.month, fecha_desde.day, 12.0)
+            puntajes_rango = buscar_mejores_podando(
+                jd_desde + np.arange(n_dias, dtype=np.float64),
+                solicitud.k,
+                MOTOR_REGLAS.activas_tipo(solicitud.tipo_proyecto, activas),
+                pesos
             )
-            
-            # Calcular puntaje de la fecha
-            analisis = calcular_puntaje_fecha(
-                dia_juliano, 
-                solicitud.tipo_proyecto,
-                solicitud.latitud,
-                solicitud.longitud
+        
+        # Motor vectorizado: la matriz de factores del rango (en caché) por el vector de pesos
+        elif solicitud.motor == "vectorizado" and minutos is None:
+            jd_desde = obtener_dia_juliano(fecha_desde.year, fecha_desde.month, fecha_desde.day, 12.0)
+            puntajes_rango = puntuar_matriz(
+                matriz_factores_rango(jd_desde, jd_desde + n_dias - 1, 1.0),
+                MOTOR_REGLAS.activas_tipo(solicitud.tipo_proyecto, activas),
+                pesos
             )
-            
-            # Obtener mejores horas
-            mejores_horas = obtener_mejores_horas(
-                fecha_actual, 
-                solicitud.latitud, 
-                solicitud.longitud
+        
+        # Resolución subdiaria: mejor instante de cada día local (00:00-24:00)
+        elif solicitud.motor == "vectorizado":
+            jd_desde = obtener_dia_juliano(fecha_desde.year, fecha_desde.month, fecha_desde.day, 0.0) \
+                - desfase_horario(solicitud.longitud) / 24
+            puntajes_rango = buscar_mejores_instantes(
+                jd_desde, n_dias, minutos,
+                MOTOR_REGLAS.activas_tipo(solicitud.tipo_proyecto, activas),
+                pesos
             )
+        
+        # El puntaje es geocéntrico: se calcula una sola vez para todos los lugares.
+        # Solo los k mejores días llegan a tener factores y ResultadoFecha.
+        if solicitud.motor == "vectorizado":
+            # dia: posición en el rango; fila: posición en puntajes_rango
+            if solicitud.modo == "rapido":
+                dias = puntajes_rango["indices"].tolist()
+                filas = range(len(dias))
+            else:
+                dias = filas = seleccionar_mejores(puntajes_rango["puntajes"], solicitud.k).tolist()
             
-            # Si el nivel es "avoid", no mostrar horas
-            if analisis["nivel"] == "avoid":
-                mejores_horas = []
-            elif analisis["nivel"] == "caution":
-                mejores_horas = ["⚠️ Si es urgente, evitar horas de Marte y Saturno"]
-            
-            resultados.append(ResultadoFecha(
-                dia=fecha_actual.day,
-                dia_semana=DIAS_SEMANA[fecha_actual.weekday()],
-                mes=f"{MESES[fecha_actual.month]} {fecha_actual.year}",
-                fecha_completa=fecha_actual.strftime("%Y-%m-%d"),
-                puntaje=analisis["puntaje"],
-                nivel=analisis["nivel"],
-                factores=analisis["factores"],
-                mejores_horas=mejores_horas
-            ))
+            mejores_dias = []
+            for dia, fila in zip(dias, filas):
+                puntaje = int(puntajes_rango["puntajes"][fila])
+                mejores_dias.append((fecha_desde + timedelta(days=dia), {
+                    "puntaje": puntaje,
+                    "nivel": nivel_puntaje(puntaje),
+                    "factores": factores_rango(puntajes_rango, fila),
+                    "instante": float(puntajes_rango["dias_julianos"][fila])
+                }))
+        else:
+            # Montículo acotado de (puntaje, -índice, análisis): a igual puntaje gana el día anterior
+            monticulo = []
+            for i in range(n_dias):
+                fecha_actual = fecha_desde + timedelta(days=i)
+                
+                # Calcular día juliano para mediodía
+                dia_juliano = obtener_dia_juliano(
+                    fecha_actual.year,
+                    fecha_actual.month,
+                    fecha_actual.day,
+                    12.0
+                )
+                
+                # Calcular puntaje de la fecha
+                analisis = calcular_puntaje_fecha(
+                    dia_juliano, 
+                    solicitud.tipo_proyecto,
+                    solicitud.latitud,
+                    solicitud.longitud,
+                    activas,
+                    pesos
+                )
+                analisis["instante"] = dia_juliano
+                
+                candidato = (analisis["puntaje"], -i, analisis)
+                if len(monticulo) < solicitud.k:
+                    heapq.heappush(monticulo, candidato)
+                elif candidato[:2] > monticulo[0][:2]:
+                    heapq.heapreplace(monticulo, candidato)
             
-            fecha_actual += timedelta(days=1)
-        
-        # Ordenar por puntaje descendente
-        resultados.sort(key=lambda x: x.puntaje, reverse=True)
-        
-        # Tomar las mejores 10 fechas
-        mejores_resultados = resultados[:10]
-        
-        # Reglas aplicadas (para mostrar al usuario)
-        reglas = [
-            "✅ Luna creciente - Favorece crecimiento y progreso (Robson pág. 13)",
-            "✅ Mercurio directo - Comunicación y contratos claros (Robson pág. 15)",
-            "✅ Júpiter/Venus en buen aspecto a Luna - Favorece negocios (Robson pág. 14)",
-            "✅ Luna en signos favorables: Tauro, Cáncer, Virgo, etc. (Robson pág. 34)",
-            "❌ Evitar Luna vacía de curso - Nada prospera (Robson pág. 15)",
-            "❌ Evitar Via Combusta: 15° Libra - 15° Escorpio (Robson pág. 15)",
-            "❌ Evitar Mercurio retrógrado - Contratos problemáticos (Robson pág. 15)",
-            "❌ Evitar aflicciones Marte/Saturno a Luna - Conflictos (Robson pág. 14)"
+            mejores_dias = [
+                (fecha_desde + timedelta(days=-menos_i), analisis)
+                for _, menos_i, analisis in sorted(monticulo, key=lambda x: x[:2], reverse=True)
+            ]
+        
+        # Solo las horas dependen del lugar: se evalúan por ubicación para los días elegidos
+        # (horas de todos los lugares con una sola pasada de amaneceres y ocasos por año)
+        precalcular_horas_planetarias(
+            [(solicitud.latitud, solicitud.longitud)]
+            + [(ubicacion.latitud, ubicacion.longitud) for ubicacion in solicitud.ubicaciones or []],
+            [fecha.year for fecha, _ in mejores_dias]
+        )
+        mejores_resultados = [
+            _resultado_fecha(fecha, analisis, solicitud.latitud, solicitud.longitud)
+            for fecha, analisis in mejores_dias
         ]
+        ubicaciones = None
+        if solicitud.ubicaciones:
+            ubicaciones = [
+                ResultadoUbicacion(
+                    ubicacion=ubicacion.nombre,
+                    latitud=ubicacion.latitud,
+                    longitud=ubicacion.longitud,
+                    fechas=[
+                        _resultado_fecha(fecha, analisis, ubicacion.latitud, ubicacion.longitud)
+                        for fecha, analisis in mejores_dias
+                    ]
+                )
+                for ubicacion in solicitud.ubicaciones
+            ]
         
         return RespuestaElectiva(
             estado="exito",
@@ -876,9 +4621,133 @@ def calcular_electiva(solicitud: SolicitudElectiva):
             tipo_proyecto=solicitud.tipo_proyecto,
             descripcion_tipo=info_proyecto["descripcion"],
             fechas=mejores_resultados,
-            reglas_aplicadas=reglas
+            reglas_aplicadas=REGLAS_APLICADAS,
+            ubicaciones=ubicaciones,
+            **lugares
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/calcular-comparativo", response_model=RespuestaComparativa)
+def calcular_comparativo(solicitud: SolicitudComparativa):
+    """
+    Mejores fechas de varios tipos de proyecto en una sola pasada.
+    
+    Las efemérides y la matriz de factores del rango se calculan una vez; cada
+    tipo solo cambia su vector de pesos (reglas de significador de sus
+    TIPOS_PROYECTO["planetas"]), y todos se puntúan con un único producto
+    matriz x (reglas x tipos).
+    
+    PARÁMETROS:
+    - tipos_proyecto: Tipos a comparar (default: todos los de TIPOS_PROYECTO)
+    - fecha_desde/fecha_hasta, latitud/longitud, reglas_desactivadas, pesos: como en /calcular
+    
+    RETORNA:
+    - Una RespuestaElectiva por tipo (las k mejores fechas de cada uno, default 10)
+    """
+    try:
+        tipos = solicitud.tipos_proyecto or list(TIPOS_PROYECTO)
+        desconocidos = [tipo for tipo in tipos if tipo not in TIPOS_PROYECTO]
+        if desconocidos:
+            raise HTTPException(status_code=400, detail=f"Tipos de proyecto desconocidos: {desconocidos}. Opciones: {list(TIPOS_PROYECTO)}")
+        
+        try:
+            activas = MOTOR_REGLAS.reglas_activas(solicitud.reglas_desactivadas)
+            pesos = MOTOR_REGLAS.validar_pesos(solicitud.pesos)
+            lugares = _resolver_lugares(solicitud)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        if not 1 <= solicitud.k <= MAXIMO_K:
+            raise HTTPException(status_code=400, detail=f"k debe estar entre 1 y {MAXIMO_K}")
+        
+        fecha_desde, n_dias = _rango_fechas(solicitud.fecha_desde, solicitud.fecha_hasta)
+        jd_desde = obtener_dia_juliano(fecha_desde.year, fecha_desde.month, fecha_desde.day, 12.0)
+        matriz = matriz_factores_rango(jd_desde, jd_desde + n_dias - 1, 1.0)
+        
+        # Un vector de pesos por tipo: puntajes (días x tipos) en un solo producto
+        activas_por_tipo = [MOTOR_REGLAS.activas_tipo(tipo, activas) for tipo in tipos]
+        puntajes = matriz.puntajes(np.column_stack([
+            MOTOR_REGLAS.vector_pesos(activas_tipo, pesos) for activas_tipo in activas_por_tipo
+        ]))
+        
+        comparativo = []
+        for j, tipo in enumerate(tipos):
+            puntajes_tipo = {"matriz": matriz, "activas": activas_por_tipo[j], "pesos": pesos}
+            
+            # Mejores k fechas (a igual puntaje, la más temprana primero)
+            mejores_resultados = []
+            for i in seleccionar_mejores(puntajes[:, j], solicitud.k).tolist():
+                puntaje = int(puntajes[i, j])
+                analisis = {
+                    "puntaje": puntaje,
+                    "nivel": nivel_puntaje(puntaje),
+                    "factores": factores_rango(puntajes_tipo, i),
+                    "instante": float(matriz.dias_julianos[i])
+                }
+                mejores_resultados.append(_resultado_fecha(
+                    fecha_desde + timedelta(days=i), analisis, solicitud.latitud, solicitud.longitud
+                ))
+            
+            comparativo.append(RespuestaElectiva(
+                estado="exito",
+                nombre=solicitud.nombre,
+                tipo_proyecto=tipo,
+                descripcion_tipo=TIPOS_PROYECTO[tipo]["descripcion"],
+                fechas=mejores_resultados,
+                reglas_aplicadas=REGLAS_APLICADAS,
+                lugar=lugares["lugar"]
+            ))
+        
+        return RespuestaComparativa(
+            estado="exito",
+            nombre=solicitud.nombre,
+            comparativo=comparativo
         )
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/geocodificar")
+def geocodificar_ciudad(q: str, limite: int = 5):
+    """
+    Busca ciudades por nombre en el nomenclátor local (sin conexión).
+    
+    PARÁMETROS:
+    - q: Nombre o prefijo, opcionalmente con el país después de una coma ("Cusco, Perú")
+    - limite: Resultados máximos (default: 5, máximo 20)
+    
+    RETORNA ciudades con coordenadas, país, población y zona horaria; la
+    coincidencia puede ser exacta, por prefijo o aproximada (errores de tipeo).
+    """
+    if not 1 <= limite <= MAXIMO_RESULTADOS_GEOCODIFICAR:
+        raise HTTPException(status_code=400, detail=f"limite debe estar entre 1 y {MAXIMO_RESULTADOS_GEOCODIFICAR}")
+    try:
+        return {"consulta": q, "resultados": obtener_nomenclator().buscar(q, limite)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/geocodificar/inverso")
+def geocodificar_inverso(lat: float, lon: float):
+    """
+    Ciudad más cercana a unas coordenadas, con la distancia en km.
+    
+    PARÁMETROS:
+    - lat: Latitud (-90 a 90)
+    - lon: Longitud (-180 a 180)
+    """
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(status_code=400, detail="Coordenadas fuera de rango")
+    try:
+        return obtener_nomenclator().mas_cercana(lat, lon)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -896,17 +4765,59 @@ def obtener_horas_dia(fecha: str, lat: float = -12.0464, lon: float = -77.0428):
     try:
         fecha_dt = datetime.strptime(fecha, "%Y-%m-%d")
         horas = obtener_horas_planetarias(fecha_dt, lat, lon)
+        sol = salida_puesta_sol(fecha_dt, lat, lon)
         
         return {
             "fecha": fecha,
             "dia_semana": DIAS_SEMANA[fecha_dt.weekday()],
             "regente_dia": REGENTES_DIAS[fecha_dt.weekday()],
+            "amanecer_utc": dia_juliano_a_datetime(sol[0]).isoformat() if sol else None,
+            "ocaso_utc": dia_juliano_a_datetime(sol[1]).isoformat() if sol else None,
             "horas": horas
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/hora-planetaria")
+def obtener_hora_actual(instante: Optional[str] = None, lat: float = -12.0464, lon: float = -77.0428):
+    """
+    Hora planetaria en curso en un instante.
+    
+    PARÁMETROS:
+    - instante: Fecha y hora en formato ISO (YYYY-MM-DDTHH:MM[:SS]), UT si no
+      lleva desfase (ej: 2026-03-10T09:00-05:00 se convierte a UT); default: ahora
+    - lat: Latitud (default: Lima)
+    - lon: Longitud (default: Lima)
+    """
+    try:
+        momento = datetime.fromisoformat(instante) if instante else datetime.utcnow()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    try:
+        dia_juliano = obtener_dia_juliano(
+            momento.year, momento.month, momento.day,
+            momento.hour + momento.minute / 60 + momento.second / 3600
+        )
+        inicio, fin, planeta, tipo = indice_horas_planetarias(lat, lon).hora_en(dia_juliano)
+        desfase = desfase_horario(lon)
+        
+        return {
+            "instante_utc": momento.replace(microsecond=0).isoformat(),
+            "planeta": planeta,
+            "favorable": planeta in PLANETAS_FAVORABLES_HORAS,
+            "tipo": tipo,
+            "hora_inicio": hora_local_hhmm(inicio, desfase),
+            "hora_fin": hora_local_hhmm(fin, desfase),
+            "minutos_restantes": round((fin - dia_juliano) * 1440)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/info-luna/{fecha}")
 def obtener_info_luna(fecha: str):
     """
@@ -919,30 +4830,315 @@ def obtener_info_luna(fecha: str):
         fecha_dt = datetime.strptime(fecha, "%Y-%m-%d")
         dia_juliano = obtener_dia_juliano(fecha_dt.year, fecha_dt.month, fecha_dt.day, 12.0)
         
-        luna = obtener_posicion_planeta(dia_juliano, swe.MOON)
-        fase = obtener_fase_lunar(dia_juliano)
-        vacia_curso = esta_luna_vacia_de_curso(dia_juliano)
-        via_combusta = esta_en_via_combusta(luna["longitud"]) if luna else False
+        carta = ChartSnapshot(dia_juliano)
+        luna = carta[swe.MOON]
+        fase = obtener_fase_lunar(dia_juliano, carta)
+        periodo_vacio = indice_vacio_de_curso_mes(fecha_dt.year, fecha_dt.month).intervalo_en(dia_juliano)
+        via_combusta = luna_en_via_combusta(dia_juliano)
         
         return {
             "fecha": fecha,
             "posicion_luna": luna,
             "fase": fase,
-            "vacia_de_curso": vacia_curso,
+            "proximo_ingreso": proximo_ingreso(swe.MOON, dia_juliano),
+            "proxima_luna_nueva": proxima_lunacion(dia_juliano, LUNA_NUEVA),
+            "proxima_luna_llena": proxima_lunacion(dia_juliano, LUNA_LLENA),
+            "vacia_de_curso": periodo_vacio is not None,
+            "periodo_vacio_de_curso": formatear_periodo_vacio(periodo_vacio) if periodo_vacio else None,
             "via_combusta": via_combusta
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/retrogrados/{fecha}")
+def obtener_retrogrados(fecha: str):
+    """
+    Obtiene el estado retrógrado y de sombra de Mercurio a Saturno en un día.
+    
+    PARÁMETROS:
+    - fecha: Fecha en formato YYYY-MM-DD (se evalúa a las 12:00 UT)
+    """
+    try:
+        fecha_dt = datetime.strptime(fecha, "%Y-%m-%d")
+        dia_juliano = obtener_dia_juliano(fecha_dt.year, fecha_dt.month, fecha_dt.day, 12.0)
+        
+        return {
+            "fecha": fecha,
+            "planetas": {
+                PLANETAS[planeta]: {
+                    "retrogrado": esta_retrogrado(planeta, dia_juliano),
+                    "sombra": estado_sombra(planeta, dia_juliano)
+                }
+                for planeta in PLANETAS_ESTACIONES
+            }
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/aspectos-luna")
+def obtener_aspectos_luna(desde: str, hasta: str):
+    """
+    Obtiene todos los aspectos de la Luna con cada planeta en un rango.
+    
+    PARÁMETROS:
+    - desde: Fecha de inicio (YYYY-MM-DD, 00:00 UT)
+    - hasta: Fecha de fin incluida (YYYY-MM-DD), máximo 366 días
+    
+    RETORNA, por planeta, cada aspecto con su entrada al orbe, su instante
+    exacto y su salida del orbe (UT).
+    """
+    try:
+        fecha_desde = datetime.strptime(desde, "%Y-%m-%d")
+        fecha_hasta = datetime.strptime(hasta, "%Y-%m-%d")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not 0 <= (fecha_hasta - fecha_desde).days <= 366:
+        raise HTTPException(status_code=400, detail="El rango debe ser de 0 a 366 días")
+    
+    try:
+        jd_inicio = obtener_dia_juliano(fecha_desde.year, fecha_desde.month, fecha_desde.day, 0.0)
+        jd_fin = obtener_dia_juliano(fecha_hasta.year, fecha_hasta.month, fecha_hasta.day, 24.0)
+        linea = linea_tiempo_aspectos(jd_inicio, jd_fin)
+        
+        def formatear(t):
+            return dia_juliano_a_datetime(t).isoformat() if t is not None else None
+        
+        return {
+            "desde": desde,
+            "hasta": hasta,
+            "aspectos": {
+                PLANETAS[planeta]: [
+                    {
+                        "aspecto": dato["aspecto"],
+                        "simbolo": dato["simbolo"],
+                        "entrada_orbe": formatear(inicio),
+                        "exacto": formatear(dato["exacto"]),
+                        "salida_orbe": formatear(fin)
+                    }
+                    for inicio, fin, dato in indice
+                ]
+                for planeta, indice in linea.pares.items()
+            }
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/ventanas")
+def obtener_ventanas(desde: str, hasta: str, tipo_proyecto: str = "negocio", umbral: int = 80,
+                     latitud: float = -12.0464, longitud: float = -77.0428,
+                     horas_favorables: bool = False):
+    """
+    Intervalos exactos en que el puntaje es mayor o igual al umbral.
+    
+    PARÁMETROS:
+    - desde: Fecha de inicio (YYYY-MM-DD, 00:00 local)
+    - hasta: Fecha de fin incluida (YYYY-MM-DD), máximo 366 días
+    - tipo_proyecto: Ver TIPOS_PROYECTO (default: negocio)
+    - umbral: Puntaje mínimo (default: 80)
+    - latitud/longitud: Lugar (hora local aproximada y horas planetarias)
+    - horas_favorables: Solo dentro de horas planetarias de Júpiter, Venus o Sol
+    
+    RETORNA cada ventana con su inicio y fin (UT y hora local aproximada) y el
+    puntaje mínimo y máximo dentro de ella.
+    """
+    try:
+        fecha_desde = datetime.strptime(desde, "%Y-%m-%d")
+        fecha_hasta = datetime.strptime(hasta, "%Y-%m-%d")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not 0 <= (fecha_hasta - fecha_desde).days <= DIAS_MAXIMOS_VENTANAS:
+        raise HTTPException(status_code=400, detail=f"El rango debe ser de 0 a {DIAS_MAXIMOS_VENTANAS} días")
+    if tipo_proyecto not in TIPOS_PROYECTO:
+        raise HTTPException(status_code=400, detail=f"Tipo de proyecto desconocido: {tipo_proyecto}. Opciones: {list(TIPOS_PROYECTO)}")
+    
+    try:
+        desfase = desfase_horario(longitud)
+        jd_inicio = obtener_dia_juliano(fecha_desde.year, fecha_desde.month, fecha_desde.day, 0.0) - desfase / 24
+        jd_fin = obtener_dia_juliano(fecha_hasta.year, fecha_hasta.month, fecha_hasta.day, 24.0) - desfase / 24
+        
+        filtro = horas_favorables_en_rango(jd_inicio, jd_fin, latitud, longitud) if horas_favorables else None
+        ventanas = buscar_ventanas(jd_inicio, jd_fin, umbral, MOTOR_REGLAS.activas_tipo(tipo_proyecto), filtro=filtro)
+        
+        def formatear(t, horas=0):
+            return (dia_juliano_a_datetime(t) + timedelta(hours=horas)).isoformat()
+        
+        return {
+            "desde": desde,
+            "hasta": hasta,
+            "tipo_proyecto": tipo_proyecto,
+            "umbral": umbral,
+            "ventanas": [
+                {
+                    "inicio_utc": formatear(ventana["inicio"]),
+                    "fin_utc": formatear(ventana["fin"]),
+                    "inicio_local": formatear(ventana["inicio"], desfase),
+                    "fin_local": formatear(ventana["fin"], desfase),
+                    "duracion_minutos": round((ventana["fin"] - ventana["inicio"]) * 1440),
+                    "puntaje_minimo": ventana["puntaje_minimo"],
+                    "puntaje_maximo": ventana["puntaje_maximo"]
+                }
+                for ventana in ventanas
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/consultar")
+def consultar(expresion: str, desde: str, hasta: str,
+              latitud: float = -12.0464, longitud: float = -77.0428):
+    """
+    Intervalos en que se cumple una consulta booleana de predicados.
+    
+    PARÁMETROS:
+    - expresion: Predicados con Y/O/NO (AND/OR/NOT) y paréntesis, ej:
+      "luna_creciente Y NO luna_vacia_curso Y mercurio_directo Y hora_jupiter Y laborable"
+    - desde: Fecha de inicio (YYYY-MM-DD, 00:00 local)
+    - hasta: Fecha de fin incluida (YYYY-MM-DD), máximo 10 años
+    - latitud/longitud: Lugar (horas planetarias y día local)
+    
+    Predicados: ids de /reglas, hora_<planeta>, hora_favorable, lunes ... domingo,
+    laborable y fin_de_semana.
+    """
+    try:
+        fecha_desde = datetime.strptime(desde, "%Y-%m-%d")
+        fecha_hasta = datetime.strptime(hasta, "%Y-%m-%d")
+        consulta = ConsultaRestricciones(expresion)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not 0 <= (fecha_hasta - fecha_desde).days <= DIAS_MAXIMOS_RANGO:
+        raise HTTPException(status_code=400, detail=f"El rango debe ser de 0 a {DIAS_MAXIMOS_RANGO} días")
+    
+    try:
+        desfase = desfase_horario(longitud)
+        jd_inicio = obtener_dia_juliano(fecha_desde.year, fecha_desde.month, fecha_desde.day, 0.0) - desfase / 24
+        jd_fin = obtener_dia_juliano(fecha_hasta.year, fecha_hasta.month, fecha_hasta.day, 24.0) - desfase / 24
+        intervalos = consulta.evaluar(jd_inicio, jd_fin, latitud, longitud)
+        
+        def formatear(t, horas=0):
+            return (dia_juliano_a_datetime(t) + timedelta(hours=horas)).isoformat()
+        
+        return {
+            "expresion": expresion,
+            "desde": desde,
+            "hasta": hasta,
+            "total_intervalos": len(intervalos),
+            "duracion_total_horas": round(intervalos.duracion() * 24, 2),
+            "intervalos": [
+                {
+                    "inicio_utc": formatear(inicio),
+                    "fin_utc": formatear(fin),
+                    "inicio_local": formatear(inicio, desfase),
+                    "fin_local": formatear(fin, desfase),
+                    "duracion_minutos": round((fin - inicio) * 1440)
+                }
+                for inicio, fin, _ in intervalos
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/vacio-de-curso/{anio}/{mes}")
+def obtener_vacio_de_curso_mes(anio: int, mes: int):
+    """
+    Obtiene todos los períodos de Luna vacía de curso de un mes.
+    
+    PARÁMETROS:
+    - anio: Año (ej: 2026)
+    - mes: Mes (1-12)
+    
+    Los horarios están en UT.
+    """
+    if not 1 <= mes <= 12:
+        raise HTTPException(status_code=400, detail="El mes debe estar entre 1 y 12")
+    try:
+        inicio_mes = obtener_dia_juliano(anio, mes, 1, 0.0)
+        siguiente = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+        fin_mes = obtener_dia_juliano(siguiente[0], siguiente[1], 1, 0.0)
+        
+        return {
+            "anio": anio,
+            "mes": MESES[mes],
+            "periodos": [
+                formatear_periodo_vacio(periodo)
+                for periodo in indice_vacio_de_curso_mes(anio, mes).en_rango(inicio_mes, fin_mes)
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # EJECUCIÓN PRINCIPAL
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Uso:
+#     python main.py                     -> inicia el servidor
+#     python main.py construir-tabla     -> genera la tabla de efemérides (ver RUTA_TABLA_EFEMERIDES)
+#     python main.py verificar-paridad   -> compara el motor de puntaje escalar con el vectorizado
+
 if __name__ == "__main__":
-    import uvicorn
-    print("=" * 60)
-    print("ASTROLOGÍA ELECTIVA EMPRESARIAL API v1.0")
-    print("Metodología: Vivian E. Robson")
-    print("=" * 60)
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Astrología Electiva Empresarial API")
+    subcomandos = parser.add_subparsers(dest="comando")
+    
+    construir = subcomandos.add_parser("construir-tabla", help="Genera la tabla precalculada de efemérides")
+    construir.add_argument("--desde", type=int, default=1900, help="Primer año (default: 1900)")
+    construir.add_argument("--hasta", type=int, default=2100, help="Último año (default: 2100)")
+    construir.add_argument("--paso-horas", type=float, default=1.0, help="Horas entre muestras (default: 1)")
+    construir.add_argument("--salida", default=RUTA_TABLA_EFEMERIDES, help="Archivo de salida")
+    
+    paridad = subcomandos.add_parser("verificar-paridad", help="Compara el motor escalar con el vectorizado")
+    paridad.add_argument("--desde", default=datetime.utcnow().strftime("%Y-%m-%d"), help="Fecha inicial YYYY-MM-DD")
+    paridad.add_argument("--dias", type=int, default=366, help="Cantidad de días (default: 366)")
+    paridad.add_argument("--tipo", default="negocio", help="Tipo de proyecto (default: negocio)")
+    
+    amaneceres = subcomandos.add_parser("verificar-amaneceres",
+                                        help="Compara el amanecer/ocaso vectorizado con swe.rise_trans")
+    amaneceres.add_argument("--desde", default=datetime.utcnow().strftime("%Y-%m-%d"), help="Fecha inicial YYYY-MM-DD")
+    amaneceres.add_argument("--dias", type=int, default=366, help="Cantidad de días (default: 366)")
+    amaneceres.add_argument("--lugar", action="append", default=None, metavar="LAT,LON",
+                            help="Lugar a comparar (repetible; default: LUGARES_VERIFICACION_SOL)")
+    
+    argumentos = parser.parse_args()
+    
+    if argumentos.comando == "construir-tabla":
+        print(f"Construyendo tabla {argumentos.desde}-{argumentos.hasta} "
+              f"cada {argumentos.paso_horas} h en {argumentos.salida} ...")
+        n_pasos = construir_tabla_efemerides(
+            argumentos.salida, argumentos.desde, argumentos.hasta, argumentos.paso_horas
+        )
+        print(f"Listo: {n_pasos} pasos x {len(PLANETAS)} cuerpos")
+    elif argumentos.comando == "verificar-paridad":
+        inicio = datetime.strptime(argumentos.desde, "%Y-%m-%d")
+        diferencias = verificar_paridad_puntajes(
+            obtener_dia_juliano(inicio.year, inicio.month, inicio.day, 12.0),
+            argumentos.dias, argumentos.tipo
+        )
+        for diferencia in diferencias:
+            print(diferencia)
+        print(f"{argumentos.dias - len(diferencias)}/{argumentos.dias} días idénticos")
+        raise SystemExit(1 if diferencias else 0)
+    elif argumentos.comando == "verificar-amaneceres":
+        lugares = [
+            tuple(float(valor) for valor in lugar.split(","))
+            for lugar in argumentos.lugar or [f"{lat},{lon}" for lat, lon in LUGARES_VERIFICACION_SOL]
+        ]
+        resumen = verificar_salidas_sol(datetime.strptime(argumentos.desde, "%Y-%m-%d"), argumentos.dias, lugares)
+        for peor in resumen["peores"]:
+            print(f"{peor['fecha']} ({peor['latitud']}, {peor['longitud']}): {peor['segundos']} s")
+        print(f"{resumen['comparados']} días-lugar: diferencia máxima {resumen['diferencia_maxima_segundos']} s, "
+              f"media {resumen['diferencia_media_segundos']} s")
+        raise SystemExit(1 if resumen["diferencia_maxima_segundos"] > TOLERANCIA_SALIDAS_SOL_SEGUNDOS else 0)
+    else:
+        import uvicorn
+        print("=" * 60)
+        print("ASTROLOGÍA ELECTIVA EMPRESARIAL API v1.0")
+        print("Metodología: Vivian E. Robson")
+        print("=" * 60)
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,35 @@
+"""Búsqueda subdiaria de grueso a fino contra un barrido exhaustivo"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("swisseph")
+
+import main
+
+
+def mejores_exhaustivos(jd_inicio, n_dias, minutos, vector_pesos):
+    """Mejor instante de cada día evaluando todos los instantes de la grilla (el más temprano a igual puntaje)"""
+    por_dia = 1440 // minutos
+    instantes = jd_inicio + np.arange(n_dias * por_dia) * minutos / 1440
+    matriz = main.MatrizFactores(main.calcular_efemerides_instantes(instantes, usar_cache=False))
+    puntajes = matriz.puntajes(vector_pesos).reshape(n_dias, por_dia)
+    mejores = puntajes.argmax(axis=1)  # argmax devuelve el primero entre iguales
+    return puntajes[np.arange(n_dias), mejores], instantes.reshape(n_dias, por_dia)[np.arange(n_dias), mejores]
+
+
+@pytest.mark.parametrize("minutos", [15, 5, 1])
+@pytest.mark.parametrize("tipo_proyecto", ["negocio", "contrato"])
+def test_igual_al_barrido_exhaustivo(minutos, tipo_proyecto):
+    # Una semana con luna nueva (18/03/2026) y cambios de signo lunar, 00:00 de Lima
+    jd_inicio = main.obtener_dia_juliano(2026, 3, 15, 0.0) + 5 / 24
+    n_dias = 7
+    activas = main.MOTOR_REGLAS.activas_tipo(tipo_proyecto)
+    
+    resultado = main.buscar_mejores_instantes(jd_inicio, n_dias, minutos, activas)
+    puntajes, instantes = mejores_exhaustivos(
+        jd_inicio, n_dias, minutos, main.MOTOR_REGLAS.vector_pesos(activas)
+    )
+    
+    assert resultado["puntajes"].tolist() == puntajes.tolist()
+    np.testing.assert_allclose(resultado["dias_julianos"], instantes, rtol=0, atol=1e-7)
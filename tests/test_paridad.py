@@ -0,0 +1,15 @@
+"""Motor de puntaje escalar contra el vectorizado"""
+
+import pytest
+
+pytest.importorskip("swisseph")
+
+import main
+
+
+@pytest.mark.parametrize("tipo_proyecto", sorted(main.TIPOS_PROYECTO))
+def test_escalar_y_vectorizado_coinciden(tipo_proyecto):
+    # Un año completo a las 12:00 UT: mismo puntaje, nivel y factores cada día
+    jd_inicio = main.obtener_dia_juliano(2026, 1, 1, 12.0)
+    
+    assert main.verificar_paridad_puntajes(jd_inicio, 366, tipo_proyecto) == []
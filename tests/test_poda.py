@@ -0,0 +1,36 @@
+"""Modo "rapido" (poda) de /calcular contra el modo completo"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("swisseph")
+
+import main
+
+
+@pytest.mark.parametrize("k", [1, 10, 50])
+@pytest.mark.parametrize("tipo_proyecto", ["negocio", "inversion", "otro"])
+def test_top_k_identico_al_completo(k, tipo_proyecto):
+    jd_inicio = main.obtener_dia_juliano(2026, 1, 1, 12.0)
+    n_dias = 366
+    activas = main.MOTOR_REGLAS.activas_tipo(tipo_proyecto)
+    
+    completo = main.puntuar_matriz(main.matriz_factores_rango(jd_inicio, jd_inicio + n_dias - 1, 1.0), activas)
+    indices = main.seleccionar_mejores(completo["puntajes"], k)
+    rapido = main.buscar_mejores_podando(jd_inicio + np.arange(n_dias, dtype=np.float64), k, activas)
+    
+    assert rapido["indices"].tolist() == indices.tolist()
+    assert rapido["puntajes"].tolist() == completo["puntajes"][indices].tolist()
+    assert [main.factores_rango(rapido, i) for i in range(k)] == \
+        [main.factores_rango(completo, i) for i in indices.tolist()]
+
+
+def test_top_k_identico_con_pesos():
+    # Los pesos del cliente cambian la cota de la poda
+    jd_inicio = main.obtener_dia_juliano(2026, 1, 1, 12.0)
+    pesos = {"luna_creciente": 40, "luna_vacia_curso": -5}
+    
+    completo = main.puntuar_matriz(main.matriz_factores_rango(jd_inicio, jd_inicio + 365, 1.0), None, pesos)
+    rapido = main.buscar_mejores_podando(jd_inicio + np.arange(366, dtype=np.float64), 10, None, pesos)
+    
+    assert rapido["indices"].tolist() == main.seleccionar_mejores(completo["puntajes"], 10).tolist()
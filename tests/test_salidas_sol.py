@@ -0,0 +1,26 @@
+"""Amanecer y ocaso vectorizados (salidas_puestas_sol) contra swe.rise_trans"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+pytest.importorskip("swisseph")
+
+import main
+
+
+@pytest.mark.parametrize("latitud, longitud", main.LUGARES_VERIFICACION_SOL)
+def test_coincide_con_rise_trans(latitud, longitud):
+    resumen = main.verificar_salidas_sol(datetime(2026, 1, 1), 366, [(latitud, longitud)])
+    
+    assert resumen["comparados"] == 366
+    assert resumen["diferencia_maxima_segundos"] <= main.TOLERANCIA_SALIDAS_SOL_SEGUNDOS, resumen["peores"]
+
+
+def test_dia_polar_sin_eventos():
+    # Tromsø (69.6° N) el 21 de junio: el Sol no se pone
+    amaneceres, ocasos = main.salidas_puestas_sol(
+        np.array([main.obtener_dia_juliano(2026, 6, 21, 0.0)]), np.array([69.65]), np.array([18.96])
+    )
+    assert np.isnan(amaneceres[0, 0]) and np.isnan(ocasos[0, 0])